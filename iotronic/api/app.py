@@ -58,6 +58,19 @@ api_opts = [
                default=1000,
                help=('The maximum number of items returned in a single '
                      'response from a collection resource.')),
+    cfg.IntOpt('max_request_wait',
+               default=10,
+               min=0,
+               help=('The maximum number of seconds a client can wait for '
+                     'the completion of a request in a single call.')),
+    cfg.IntOpt('max_request_waiters',
+               default=2,
+               min=0,
+               help=('The maximum number of clients of an API process '
+                     'waiting at once for the completion of a request. '
+                     'Each of them holds a thread of the WSGI server, so '
+                     'this must stay below its number of threads. The '
+                     'other clients get a 503 response.')),
     cfg.StrOpt('public_endpoint',
                help=("Public URL to use when building the links to the API "
                      "resources."
@@ -115,6 +128,9 @@ def setup_app(config=None):
                  hooks.DBHook(),
                  hooks.ContextHook(config.app.acl_public_routes),
                  hooks.RPCHook(),
+                 # the after hooks run in reverse order: the stream is set
+                 # once NoExceptionTracebackHook has read the body
+                 hooks.StreamHook(),
                  hooks.NoExceptionTracebackHook(),
                  hooks.PublicUrlHook()]
 
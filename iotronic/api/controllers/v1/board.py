@@ -40,6 +40,57 @@ _DEFAULT_WEBSERVICE_RETURN_FIELDS = ('name', 'uuid', 'port', 'board_uuid',
 
 cache_agent_ip = {}
 
+# boards converted at a time when streamed
+STREAM_BATCH_SIZE = 100
+
+
+class BoardPrefetch(object):
+    """What the representation of a page of boards needs, loaded at once.
+
+    The sessions, the locations and the wamp agents of all the boards are
+    loaded with a query each instead of a few queries per board, and only
+    when the fields requested need them.
+    """
+
+    def __init__(self, context, rpc_boards, fields=None):
+        self.sessions = {}
+        self.locations = {}
+        self.ragent = None
+        if not rpc_boards:
+            return
+
+        if fields is None or 'session' in fields:
+            for session in objects.SessionWP.list_by_board_uuids(
+                    context, [b.uuid for b in rpc_boards]):
+                self.sessions[session.board_uuid] = session.session_id
+
+        if fields is None or 'location' in fields:
+            for location in objects.Location.list_by_board_ids(
+                    context, [b.id for b in rpc_boards]):
+                self.locations.setdefault(location.board_id,
+                                          []).append(location)
+
+        # the agents are cached, the registration agent is needed by the
+        # boards not configured yet
+        if not any(self._needs_agent(b) or self._needs_ragent(b)
+                   for b in rpc_boards):
+            return
+        for wagent in objects.WampAgent.list(context):
+            cache_agent_ip[wagent.hostname] = (
+                wagent.wsurl.split("//")[1].split(":")[0])
+            if wagent.ragent and wagent.online:
+                self.ragent = wagent
+
+    @staticmethod
+    def _needs_agent(rpc_board):
+        return (rpc_board.obj_attr_is_set('agent') and
+                rpc_board.agent is not None and
+                rpc_board.agent not in cache_agent_ip)
+
+    @staticmethod
+    def _needs_ragent(rpc_board):
+        return rpc_board.obj_attr_is_set('config') and rpc_board.config == {}
+
 
 class Board(base.APIBase):
     """API representation of a board.
@@ -78,19 +129,12 @@ class Board(base.APIBase):
     @staticmethod
     def _convert_with_links(board, url, fields=None):
         board_uuid = board.uuid
+        if board.agent not in (None, wtypes.Unset):
+            board.wstun_ip = cache_agent_ip.get(board.agent)
+
         if fields is not None:
             board.unset_fields_except(fields)
 
-        if (board.agent != None):
-            if board.agent not in cache_agent_ip:
-                wagent = objects.WampAgent.get_by_hostname(
-                    pecan.request.context,
-                    board.agent)
-                wurl = wagent.wsurl
-                cache_agent_ip[board.agent] = wurl.split("//")[1].split(":")[0]
-
-            board.wstun_ip = cache_agent_ip[board.agent]
-
         board.links = [link.Link.make_link('self', url, 'boards',
                                            board_uuid),
                        link.Link.make_link('bookmark', url, 'boards',
@@ -99,31 +143,25 @@ class Board(base.APIBase):
         return board
 
     @classmethod
-    def convert_with_links(cls, rpc_board, fields=None):
-        board = Board(**rpc_board.as_dict())
+    def convert_with_links(cls, rpc_board, fields=None, prefetch=None,
+                           url=None):
+        if prefetch is None:
+            prefetch = BoardPrefetch(pecan.request.context, [rpc_board],
+                                     fields=fields)
 
-        try:
-            session = objects.SessionWP.get_session_by_board_uuid(
-                pecan.request.context, board.uuid)
-            board.session = session.session_id
-        except Exception:
-            board.session = None
+        board = Board(**rpc_board.as_dict())
 
-        try:
-            list_loc = objects.Location.list_by_board_uuid(
-                pecan.request.context, board.uuid)
-            board.location = loc.Location.convert_with_list(list_loc)
-        except Exception:
-            board.location = []
+        board.session = prefetch.sessions.get(board.uuid)
+        board.location = loc.Location.convert_with_list(
+            prefetch.locations.get(rpc_board.id, []))
 
         # to enable as soon as a better session and location management
         # is implemented
         # if fields is not None:
         #    api_utils.check_for_invalid_fields(fields, board_dict)
 
-        if board.config == {}:
-            ragent = objects.WampAgent.get_registration_agent(
-                pecan.request.context)
+        if board.config == {} and prefetch.ragent is not None:
+            ragent = prefetch.ragent
             board.config = {
                 "iotronic": {
                     "board": {
@@ -139,7 +177,7 @@ class Board(base.APIBase):
             }
 
         return cls._convert_with_links(board,
-                                       pecan.request.public_url,
+                                       url or pecan.request.public_url,
                                        fields=fields)
 
 
@@ -152,14 +190,43 @@ class BoardCollection(collection.Collection):
     def __init__(self, **kwargs):
         self._type = 'boards'
 
+    @staticmethod
+    def get_columns(fields, sort_key=None):
+        """Return the columns of the boards the requested fields need."""
+        if fields is None:
+            return None
+
+        fields = list(fields)
+        if 'wstun_ip' in fields:
+            fields.append('agent')
+        if 'config' in fields:
+            fields.append('code')
+        return api_utils.get_columns(fields, objects.Board.fields, sort_key)
+
     @staticmethod
     def convert_with_links(boards, limit, url=None, fields=None, **kwargs):
         collection = BoardCollection()
-        collection.boards = [Board.convert_with_links(n, fields=fields)
+        prefetch = BoardPrefetch(pecan.request.context, boards,
+                                 fields=fields)
+        collection.boards = [Board.convert_with_links(n, fields=fields,
+                                                      prefetch=prefetch)
                              for n in boards]
-        collection.next = collection.get_next(limit, url=url, **kwargs)
+        collection.next = collection.get_next(
+            limit, url=url, last=boards[-1] if boards else None, **kwargs)
         return collection
 
+    @staticmethod
+    def iter_with_links(context, boards, url, fields=None):
+        """Convert an iterator of boards, a batch at a time.
+
+        The boards of each batch are prefetched together, as a page.
+        """
+        for batch in api_utils.batches(boards, STREAM_BATCH_SIZE):
+            prefetch = BoardPrefetch(context, batch, fields=fields)
+            for rpc_board in batch:
+                yield Board.convert_with_links(rpc_board, fields=fields,
+                                               prefetch=prefetch, url=url)
+
 
 class Port(base.APIBase):
     board_uuid = types.uuid
@@ -286,6 +353,7 @@ class Network(base.APIBase):
 class BoardAction(base.APIBase):
     action = wsme.wsattr(wtypes.text)
     parameters = types.jsontype
+    long_running = wsme.wsattr(bool, default=False)
 
 
 class BoardPluginsController(rest.RestController):
@@ -534,10 +602,7 @@ class BoardWebservicesController(rest.RestController):
         limit = api_utils.validate_limit(limit)
         sort_dir = api_utils.validate_sort_dir(sort_dir)
 
-        marker_obj = None
-        if marker:
-            marker_obj = objects.Webservice.get_by_uuid(pecan.request.context,
-                                                        marker)
+        marker_obj = api_utils.get_marker(objects.Webservice, marker, sort_key)
 
         if sort_key in self.invalid_sort_key_list:
             raise exception.InvalidParameterValue(
@@ -558,7 +623,7 @@ class BoardWebservicesController(rest.RestController):
                                                        fields=fields,
                                                        **parameters)
 
-    @expose.expose(WebserviceCollection, types.uuid, int, wtypes.text,
+    @expose.expose(WebserviceCollection, wtypes.text, int, wtypes.text,
                    wtypes.text, types.listtype, types.boolean, types.boolean)
     def get_all(self, marker=None,
                 limit=None, sort_key='id', sort_dir='asc',
@@ -790,6 +855,7 @@ class BoardsController(rest.RestController):
     _custom_actions = {
         'detail': ['GET'],
         'action': ['POST'],
+        'rebalance': ['POST'],
     }
 
     @pecan.expose()
@@ -808,16 +874,11 @@ class BoardsController(rest.RestController):
     def _get_boards_collection(self, status, marker, limit,
                                sort_key, sort_dir,
                                project=None,
-                               resource_url=None, fields=None):
+                               resource_url=None, fields=None,
+                               stream=False):
 
-        limit = api_utils.validate_limit(limit)
         sort_dir = api_utils.validate_sort_dir(sort_dir)
 
-        marker_obj = None
-        if marker:
-            marker_obj = objects.Board.get_by_uuid(pecan.request.context,
-                                                   marker)
-
         if sort_key in self.invalid_sort_key_list:
             raise exception.InvalidParameterValue(
                 ("The sort_key value %(key)s is an invalid field for "
@@ -840,9 +901,25 @@ class BoardsController(rest.RestController):
         if status:
             filters['status'] = status
 
+        columns = BoardCollection.get_columns(fields, sort_key)
+
+        if stream:
+            boards = objects.Board.iterate(pecan.request.context,
+                                           sort_key=sort_key,
+                                           sort_dir=sort_dir,
+                                           filters=filters, fields=columns)
+            # the stream is sent once the request is over
+            api_utils.stream_collection(
+                Board, BoardCollection.iter_with_links(
+                    pecan.request.context, boards,
+                    pecan.request.public_url, fields=fields))
+            return BoardCollection()
+
+        limit = api_utils.validate_limit(limit)
+        marker_obj = api_utils.get_marker(objects.Board, marker, sort_key)
         boards = objects.Board.list(pecan.request.context, limit, marker_obj,
                                     sort_key=sort_key, sort_dir=sort_dir,
-                                    filters=filters)
+                                    filters=filters, fields=columns)
 
         parameters = {'sort_key': sort_key, 'sort_dir': sort_dir}
 
@@ -867,11 +944,11 @@ class BoardsController(rest.RestController):
 
         return Board.convert_with_links(rpc_board, fields=fields)
 
-    @expose.expose(BoardCollection, wtypes.text, types.uuid, int, wtypes.text,
-                   wtypes.text, types.listtype, wtypes.text)
+    @expose.expose(BoardCollection, wtypes.text, wtypes.text, int, wtypes.text,
+                   wtypes.text, types.listtype, wtypes.text, types.boolean)
     def get_all(self, status=None, marker=None,
                 limit=None, sort_key='id', sort_dir='asc',
-                fields=None, project=None):
+                fields=None, project=None, stream=False):
         """Retrieve a list of boards.
 
         :param status: Optional string value to get only board in
@@ -885,6 +962,8 @@ class BoardsController(rest.RestController):
         :param sort_dir: direction to sort. "asc" or "desc". Default: asc.
         :param fields: Optional, a list with a specified set of fields
                        of the resource to be returned.
+        :param stream: Optional boolean to get all the boards as a stream
+                       of JSON lines, ignoring marker and limit.
         """
         cdict = pecan.request.context.to_policy_values()
         policy.authorize('iot:board:get', cdict, cdict)
@@ -893,7 +972,8 @@ class BoardsController(rest.RestController):
             fields = _DEFAULT_RETURN_FIELDS
         return self._get_boards_collection(status, marker,
                                            limit, sort_key, sort_dir,
-                                           fields=fields, project=project)
+                                           fields=fields, project=project,
+                                           stream=api_utils.is_stream(stream))
 
     @expose.expose(Board, body=Board, status_code=201)
     def post(self, Board):
@@ -976,7 +1056,7 @@ class BoardsController(rest.RestController):
             board)
         return Board.convert_with_links(updated_board)
 
-    @expose.expose(BoardCollection, wtypes.text, types.uuid, int, wtypes.text,
+    @expose.expose(BoardCollection, wtypes.text, wtypes.text, int, wtypes.text,
                    wtypes.text, types.listtype, wtypes.text)
     def detail(self, status=None, marker=None,
                limit=None, sort_key='id', sort_dir='asc',
@@ -1029,4 +1109,28 @@ class BoardsController(rest.RestController):
         return pecan.request.rpcapi.action_board(pecan.request.context,
                                                  rpc_board.uuid,
                                                  BoardAction.action,
-                                                 BoardAction.parameters)
+                                                 BoardAction.parameters,
+                                                 BoardAction.long_running)
+
+    @expose.expose(int, float, status_code=200)
+    def rebalance(self, fraction=None):
+        """Move offline boards to the wamp agents chosen by the placement.
+
+        :param fraction: Optional, maximum fraction of the offline boards
+                         to move. Default: [conductor]rebalance_fraction.
+        :returns: the number of boards moved.
+        """
+        cdict = pecan.request.context.to_policy_values()
+        policy.authorize('iot:board:rebalance', cdict, cdict)
+
+        # /rebalance should only work against collections
+        parent = pecan.request.path.split('/')[:-1][-1]
+        if parent != "boards":
+            raise exception.HTTPNotFound()
+
+        if fraction is not None and not 0 <= fraction <= 1:
+            raise exception.InvalidParameterValue(
+                ("The fraction must be between 0 and 1."))
+
+        return pecan.request.rpcapi.rebalance_boards(pecan.request.context,
+                                                     fraction)
@@ -18,6 +18,7 @@ from wsme import types as wtypes
 
 from iotronic.api.controllers import base
 from iotronic.api.controllers import link
+from iotronic.api.controllers.v1 import utils as api_utils
 
 
 class Collection(base.APIBase):
@@ -33,16 +34,26 @@ class Collection(base.APIBase):
         """Return whether collection has more items."""
         return len(self.collection) and len(self.collection) == limit
 
-    def get_next(self, limit, url=None, **kwargs):
-        """Return a link to the next subset of the collection."""
+    def get_next(self, limit, url=None, last=None, **kwargs):
+        """Return a link to the next subset of the collection.
+
+        With the last object of the collection the marker is an opaque
+        cursor, otherwise it is the uuid of the last item.
+        """
         if not self.has_next(limit):
             return wtypes.Unset
 
+        if last is not None:
+            marker = api_utils.encode_cursor(last,
+                                             kwargs.get('sort_key', 'id'))
+        else:
+            marker = self.collection[-1].uuid
+
         resource_url = url or self._type
         q_args = ''.join(['%s=%s&' % (key, kwargs[key]) for key in kwargs])
         next_args = '?%(args)slimit=%(limit)d&marker=%(marker)s' % {
             'args': q_args, 'limit': limit,
-            'marker': self.collection[-1].uuid}
+            'marker': marker}
 
         return link.Link.make_link('next', pecan.request.public_url,
                                    resource_url, next_args).href
@@ -88,7 +88,10 @@ class EnabledWebserviceCollection(collection.Collection):
         collection.EnabledWebservices = [
             EnabledWebservice.convert_with_links(n, fields=fields)
             for n in EnabledWebservices]
-        collection.next = collection.get_next(limit, url=url, **kwargs)
+        collection.next = collection.get_next(
+            limit, url=url,
+            last=EnabledWebservices[-1] if EnabledWebservices else None,
+            **kwargs)
         return collection
 
 
@@ -104,11 +107,8 @@ class EnabledWebservicesController(rest.RestController):
         limit = api_utils.validate_limit(limit)
         sort_dir = api_utils.validate_sort_dir(sort_dir)
 
-        marker_obj = None
-        if marker:
-            marker_obj = objects.EnabledWebservice.get_by_id(
-                pecan.request.context,
-                marker)
+        marker_obj = api_utils.get_marker(objects.EnabledWebservice, marker,
+                                          sort_key)
 
         if sort_key in self.invalid_sort_key_list:
             raise exception.InvalidParameterValue(
@@ -132,7 +132,7 @@ class EnabledWebservicesController(rest.RestController):
             fields=fields,
             **parameters)
 
-    @expose.expose(EnabledWebserviceCollection, types.uuid, int, wtypes.text,
+    @expose.expose(EnabledWebserviceCollection, wtypes.text, int, wtypes.text,
                    wtypes.text, types.listtype)
     def get_all(self, marker=None,
                 limit=None, sort_key='id', sort_dir='asc',
@@ -95,15 +95,21 @@ class FleetCollection(collection.Collection):
         collection = FleetCollection()
         collection.fleets = [Fleet.convert_with_links(n, fields=fields)
                              for n in fleets]
-        collection.next = collection.get_next(limit, url=url, **kwargs)
+        collection.next = collection.get_next(
+            limit, url=url, last=fleets[-1] if fleets else None, **kwargs)
         return collection
 
 
+class FleetAction(base.APIBase):
+    action = wsme.wsattr(wtypes.text)
+    parameters = types.jsontype
+
+
 class FleetBoardsController(rest.RestController):
     def __init__(self, fleet_ident):
         self.fleet_ident = fleet_ident
 
-    @expose.expose(BoardCollection, types.uuid, int, wtypes.text,
+    @expose.expose(BoardCollection, wtypes.text, int, wtypes.text,
                    wtypes.text, types.listtype)
     def get_all(self, marker=None,
                 limit=None, sort_key='id', sort_dir='asc',
@@ -129,9 +135,12 @@ class FleetBoardsController(rest.RestController):
         filters = {}
         filters['fleet'] = self.fleet_ident
 
-        boards = objects.Board.list(pecan.request.context, limit, marker,
+        marker_obj = api_utils.get_marker(objects.Board, marker, sort_key)
+        boards = objects.Board.list(pecan.request.context, limit, marker_obj,
                                     sort_key=sort_key, sort_dir=sort_dir,
-                                    filters=filters)
+                                    filters=filters,
+                                    fields=BoardCollection.get_columns(
+                                        fields, sort_key))
 
         parameters = {'sort_key': sort_key, 'sort_dir': sort_dir}
 
@@ -151,6 +160,7 @@ class FleetsController(rest.RestController):
 
     _custom_actions = {
         'detail': ['GET'],
+        'action': ['POST'],
     }
 
     @pecan.expose()
@@ -174,10 +184,7 @@ class FleetsController(rest.RestController):
         limit = api_utils.validate_limit(limit)
         sort_dir = api_utils.validate_sort_dir(sort_dir)
 
-        marker_obj = None
-        if marker:
-            marker_obj = objects.Fleet.get_by_uuid(pecan.request.context,
-                                                   marker)
+        marker_obj = api_utils.get_marker(objects.Fleet, marker, sort_key)
 
         if sort_key in self.invalid_sort_key_list:
             raise exception.InvalidParameterValue(
@@ -192,7 +199,10 @@ class FleetsController(rest.RestController):
         fleets = objects.Fleet.list(pecan.request.context, limit,
                                     marker_obj,
                                     sort_key=sort_key, sort_dir=sort_dir,
-                                    filters=filters)
+                                    filters=filters,
+                                    fields=api_utils.get_columns(
+                                        fields, objects.Fleet.fields,
+                                        sort_key))
 
         parameters = {'sort_key': sort_key, 'sort_dir': sort_dir}
 
@@ -216,7 +226,7 @@ class FleetsController(rest.RestController):
 
         return Fleet.convert_with_links(rpc_fleet, fields=fields)
 
-    @expose.expose(FleetCollection, types.uuid, int, wtypes.text,
+    @expose.expose(FleetCollection, wtypes.text, int, wtypes.text,
                    wtypes.text, types.listtype, types.boolean, types.boolean)
     def get_all(self, marker=None,
                 limit=None, sort_key='id', sort_dir='asc',
@@ -315,7 +325,7 @@ class FleetsController(rest.RestController):
             pecan.request.context, rpc_fleet)
         return Fleet.convert_with_links(updated_fleet)
 
-    @expose.expose(FleetCollection, types.uuid, int, wtypes.text,
+    @expose.expose(FleetCollection, wtypes.text, int, wtypes.text,
                    wtypes.text, types.listtype, types.boolean, types.boolean)
     def detail(self, marker=None,
                limit=None, sort_key='id', sort_dir='asc',
@@ -349,3 +359,32 @@ class FleetsController(rest.RestController):
                                            with_public=with_public,
                                            all_fleets=all_fleets,
                                            fields=fields)
+
+    @expose.expose(wtypes.text, types.uuid_or_name, body=FleetAction,
+                   status_code=202)
+    def action(self, fleet_ident, FleetAction):
+        """Action on all the online boards of a fleet.
+
+        The action is dispatched asynchronously: the uuid of the request
+        tracking it is returned and its results can be retrieved through
+        the requests API.
+
+        :param fleet_ident: UUID or logical name of a fleet.
+        """
+
+        if not FleetAction.action:
+            raise exception.MissingParameterValue(
+                ("Action is not specified."))
+
+        if not FleetAction.parameters:
+            FleetAction.parameters = {}
+
+        rpc_fleet = api_utils.get_rpc_fleet(fleet_ident)
+        cdict = pecan.request.context.to_policy_values()
+        cdict['project_id'] = rpc_fleet.project
+        policy.authorize('iot:fleet_action:post', cdict, cdict)
+
+        return pecan.request.rpcapi.action_fleet(pecan.request.context,
+                                                 rpc_fleet.uuid,
+                                                 FleetAction.action,
+                                                 FleetAction.parameters)
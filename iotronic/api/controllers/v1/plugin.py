@@ -91,7 +91,8 @@ class PluginCollection(collection.Collection):
         collection = PluginCollection()
         collection.plugins = [Plugin.convert_with_links(n, fields=fields)
                               for n in plugins]
-        collection.next = collection.get_next(limit, url=url, **kwargs)
+        collection.next = collection.get_next(
+            limit, url=url, last=plugins[-1] if plugins else None, **kwargs)
         return collection
 
 
@@ -107,10 +108,7 @@ class PublicPluginsController(rest.RestController):
         limit = api_utils.validate_limit(limit)
         sort_dir = api_utils.validate_sort_dir(sort_dir)
 
-        marker_obj = None
-        if marker:
-            marker_obj = objects.Plugin.get_by_uuid(pecan.request.context,
-                                                    marker)
+        marker_obj = api_utils.get_marker(objects.Plugin, marker, sort_key)
 
         if sort_key in self.invalid_sort_key_list:
             raise exception.InvalidParameterValue(
@@ -122,7 +120,10 @@ class PublicPluginsController(rest.RestController):
 
         plugins = objects.Plugin.list(pecan.request.context, limit, marker_obj,
                                       sort_key=sort_key, sort_dir=sort_dir,
-                                      filters=filters)
+                                      filters=filters,
+                                      fields=api_utils.get_columns(
+                                          fields, objects.Plugin.fields,
+                                          sort_key))
 
         parameters = {'sort_key': sort_key, 'sort_dir': sort_dir}
 
@@ -130,7 +131,7 @@ class PublicPluginsController(rest.RestController):
                                                    fields=fields,
                                                    **parameters)
 
-    @expose.expose(PluginCollection, types.uuid, int, wtypes.text,
+    @expose.expose(PluginCollection, wtypes.text, int, wtypes.text,
                    wtypes.text, types.listtype, types.boolean, types.boolean)
     def get_all(self, marker=None,
                 limit=None, sort_key='id', sort_dir='asc',
@@ -176,10 +177,7 @@ class PluginsController(rest.RestController):
         limit = api_utils.validate_limit(limit)
         sort_dir = api_utils.validate_sort_dir(sort_dir)
 
-        marker_obj = None
-        if marker:
-            marker_obj = objects.Plugin.get_by_uuid(pecan.request.context,
-                                                    marker)
+        marker_obj = api_utils.get_marker(objects.Plugin, marker, sort_key)
 
         if sort_key in self.invalid_sort_key_list:
             raise exception.InvalidParameterValue(
@@ -200,7 +198,10 @@ class PluginsController(rest.RestController):
 
         plugins = objects.Plugin.list(pecan.request.context, limit, marker_obj,
                                       sort_key=sort_key, sort_dir=sort_dir,
-                                      filters=filters)
+                                      filters=filters,
+                                      fields=api_utils.get_columns(
+                                          fields, objects.Plugin.fields,
+                                          sort_key))
 
         parameters = {'sort_key': sort_key, 'sort_dir': sort_dir}
 
@@ -225,7 +226,7 @@ class PluginsController(rest.RestController):
 
         return Plugin.convert_with_links(rpc_plugin, fields=fields)
 
-    @expose.expose(PluginCollection, types.uuid, int, wtypes.text,
+    @expose.expose(PluginCollection, wtypes.text, int, wtypes.text,
                    wtypes.text, types.listtype, types.boolean, types.boolean)
     def get_all(self, marker=None,
                 limit=None, sort_key='id', sort_dir='asc',
@@ -324,7 +325,7 @@ class PluginsController(rest.RestController):
             pecan.request.context, rpc_plugin)
         return Plugin.convert_with_links(updated_plugin)
 
-    @expose.expose(PluginCollection, types.uuid, int, wtypes.text,
+    @expose.expose(PluginCollection, wtypes.text, int, wtypes.text,
                    wtypes.text, types.listtype, types.boolean, types.boolean)
     def detail(self, marker=None,
                limit=None, sort_key='id', sort_dir='asc',
@@ -93,7 +93,8 @@ class PortCollection(collection.Collection):
         collection = PortCollection()
         collection.ports = [Port.convert_with_links(n, fields=fields)
                             for n in ports]
-        collection.next = collection.get_next(limit, url=url, **kwargs)
+        collection.next = collection.get_next(
+            limit, url=url, last=ports[-1] if ports else None, **kwargs)
         return collection
 
 
@@ -112,10 +113,7 @@ class PortsController(rest.RestController):
         limit = api_utils.validate_limit(limit)
         sort_dir = api_utils.validate_sort_dir(sort_dir)
 
-        marker_obj = None
-        if marker:
-            marker_obj = objects.Port.get_by_uuid(pecan.request.context,
-                                                  marker)
+        marker_obj = api_utils.get_marker(objects.Port, marker, sort_key)
 
         if sort_key in self.invalid_sort_key_list:
             raise exception.InvalidParameterValue(
@@ -143,7 +141,7 @@ class PortsController(rest.RestController):
         return PortCollection.convert_with_links(ports, limit,
                                                  fields=fields, **parameters)
 
-    @expose.expose(PortCollection, types.uuid, int, wtypes.text,
+    @expose.expose(PortCollection, wtypes.text, int, wtypes.text,
                    wtypes.text, types.listtype, types.boolean, types.boolean)
     def get_all(self, marker=None,
                 limit=None, sort_key='id', sort_dir='asc',
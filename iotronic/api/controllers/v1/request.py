@@ -11,6 +11,8 @@
 #  under the License.
 
 
+import datetime
+
 import pecan
 from pecan import rest
 import wsme
@@ -19,12 +21,14 @@ from wsme import types as wtypes
 from iotronic.api.controllers import base
 from iotronic.api.controllers import link
 from iotronic.api.controllers.v1 import collection
+from iotronic.api.controllers.v1.result import Result
 from iotronic.api.controllers.v1.result import ResultCollection
 from iotronic.api.controllers.v1 import types
 from iotronic.api.controllers.v1 import utils as api_utils
 from iotronic.api import expose
 from iotronic.common import exception
 from iotronic.common import policy
+from iotronic.common import request_events
 from iotronic import objects
 
 _DEFAULT_RETURN_FIELDS = (
@@ -34,14 +38,16 @@ _DEFAULT_RETURN_FIELDS = (
     'pending_requests',
     'status',
     'type',
-    'action'
+    'action',
+    'deadline'
 )
 
 _DEFAULT_RESULT_RETURN_FIELDS = (
     'board_uuid',
     'request_uuid',
     'result',
-    'message'
+    'message',
+    'message_size'
 )
 
 
@@ -58,6 +64,7 @@ class Request(base.APIBase):
     project = types.uuid
     type = wsme.types.IntegerType()
     action = wsme.wsattr(wtypes.text)
+    deadline = datetime.datetime
 
     links = wsme.wsattr([link.Link], readonly=True)
 
@@ -85,13 +92,14 @@ class Request(base.APIBase):
         return request
 
     @classmethod
-    def convert_with_links(cls, rpc_request, fields=None):
+    def convert_with_links(cls, rpc_request, fields=None, url=None):
         request = Request(**rpc_request.as_dict())
 
         if fields is not None:
             api_utils.check_for_invalid_fields(fields, request.as_dict())
 
-        return cls._convert_with_links(request, pecan.request.public_url,
+        return cls._convert_with_links(request,
+                                       url or pecan.request.public_url,
                                        fields=fields)
 
 
@@ -109,19 +117,76 @@ class RequestCollection(collection.Collection):
         collection = RequestCollection()
         collection.requests = [Request.convert_with_links(n, fields=fields)
                                for n in requests]
-        collection.next = collection.get_next(limit, url=url, **kwargs)
+        collection.next = collection.get_next(
+            limit, url=url, last=requests[-1] if requests else None, **kwargs)
         return collection
 
 
+class ResultPayloadController(rest.RestController):
+    """Serves the message of a result, supporting HTTP ranges.
+
+    The large messages are not returned by the results listings: only
+    their size and digest are.
+    """
+
+    def __init__(self, request_ident, board_ident):
+        self.request_ident = request_ident
+        self.board_ident = board_ident
+
+    @pecan.expose()
+    def get_all(self):
+        cdict = pecan.request.context.to_policy_values()
+        policy.authorize('iot:result:get_one', cdict, cdict)
+
+        result = objects.Result.get(pecan.request.context, self.board_ident,
+                                    self.request_ident)
+        size = result.payload_size
+
+        response = pecan.response
+        response.content_type = 'text/plain'
+        response.charset = 'utf-8'
+        response.headers['Accept-Ranges'] = 'bytes'
+        if result.message_digest:
+            response.etag = result.message_digest
+
+        start, end = 0, size
+        if pecan.request.range is not None:
+            byte_range = pecan.request.range.range_for_length(size)
+            if byte_range is None:
+                response.status = 416
+                response.headers['Content-Range'] = 'bytes */%d' % size
+                response.body = b''
+                return response
+            start, end = byte_range
+            response.status = 206
+            response.content_range = (start, end, size)
+
+        response.app_iter = result.iter_payload(start, end)
+        response.content_length = end - start
+        return response
+
+
 class ResultsRequestController(rest.RestController):
     def __init__(self, request_ident):
         self.request_ident = request_ident
 
-    @expose.expose(ResultCollection, types.uuid, int, wtypes.text,
-                   wtypes.text, types.listtype)
+    @pecan.expose()
+    def _lookup(self, board_ident, *remainder):
+        try:
+            board_ident = types.uuid.validate(board_ident)
+        except exception.InvalidUUID as e:
+            pecan.abort('400', e.args[0])
+
+        if remainder and remainder[0] == 'payload':
+            return ResultPayloadController(
+                request_ident=self.request_ident,
+                board_ident=board_ident), remainder[1:]
+
+    @expose.expose(ResultCollection, wtypes.text, int, wtypes.text,
+                   wtypes.text, types.listtype, types.boolean)
     def get_all(self, marker=None,
                 limit=None, sort_key='id', sort_dir='asc',
-                fields=None):
+                fields=None, stream=False):
         """Retrieve a list of boards.
 
         :param marker: pagination marker for large data sets.
@@ -133,6 +198,8 @@ class ResultsRequestController(rest.RestController):
         :param sort_dir: direction to sort. "asc" or "desc". Default: asc.
         :param fields: Optional, a list with a specified set of fields
                        of the resource to be returned.
+        :param stream: Optional boolean to get all the results as a stream
+                       of JSON lines, ignoring marker and limit.
         """
         cdict = pecan.request.context.to_policy_values()
         policy.authorize('iot:result:get', cdict, cdict)
@@ -143,9 +210,23 @@ class ResultsRequestController(rest.RestController):
         filters = {}
         filters['request_uuid'] = self.request_ident
 
-        results = objects.Result.list(pecan.request.context, limit, marker,
-                                      sort_key=sort_key, sort_dir=sort_dir,
-                                      filters=filters)
+        if api_utils.is_stream(stream):
+            sort_dir = api_utils.validate_sort_dir(sort_dir)
+            results = objects.Result.iterate(pecan.request.context,
+                                             sort_key=sort_key,
+                                             sort_dir=sort_dir,
+                                             filters=filters)
+            api_utils.stream_collection(
+                Result, (Result.convert_with_links(n, fields=fields)
+                         for n in results))
+            return ResultCollection()
+
+        limit = api_utils.validate_limit(limit)
+        sort_dir = api_utils.validate_sort_dir(sort_dir)
+        marker_obj = api_utils.get_marker(objects.Result, marker, sort_key)
+        results = objects.Result.list(pecan.request.context, limit,
+                                      marker_obj, sort_key=sort_key,
+                                      sort_dir=sort_dir, filters=filters)
 
         parameters = {'sort_key': sort_key, 'sort_dir': sort_dir}
 
@@ -183,16 +264,10 @@ class RequestsController(rest.RestController):
     def _get_requests_collection(self, marker, limit,
                                  sort_key, sort_dir,
                                  project=None,
-                                 fields=None):
+                                 fields=None, stream=False):
 
-        limit = api_utils.validate_limit(limit)
         sort_dir = api_utils.validate_sort_dir(sort_dir)
 
-        marker_obj = None
-        if marker:
-            marker_obj = objects.Request.get_by_uuid(pecan.request.context,
-                                                     marker)
-
         if sort_key in self.invalid_sort_key_list:
             raise exception.InvalidParameterValue(
                 ("The sort_key value %(key)s is an invalid field for "
@@ -203,10 +278,29 @@ class RequestsController(rest.RestController):
         if project:
             if pecan.request.context.is_admin:
                 filters['project_id'] = project
+        columns = api_utils.get_columns(fields, objects.Request.fields,
+                                        sort_key)
+
+        if stream:
+            # the stream is sent once the request is over
+            url = pecan.request.public_url
+            requests = objects.Request.iterate(pecan.request.context,
+                                               sort_key=sort_key,
+                                               sort_dir=sort_dir,
+                                               filters=filters,
+                                               fields=columns)
+            api_utils.stream_collection(
+                Request, (Request.convert_with_links(n, fields=fields,
+                                                     url=url)
+                          for n in requests))
+            return RequestCollection()
+
+        limit = api_utils.validate_limit(limit)
+        marker_obj = api_utils.get_marker(objects.Request, marker, sort_key)
         requests = objects.Request.list(pecan.request.context, limit,
                                         marker_obj,
                                         sort_key=sort_key, sort_dir=sort_dir,
-                                        filters=filters)
+                                        filters=filters, fields=columns)
 
         parameters = {'sort_key': sort_key, 'sort_dir': sort_dir}
 
@@ -214,27 +308,44 @@ class RequestsController(rest.RestController):
                                                     fields=fields,
                                                     **parameters)
 
-    @expose.expose(Request, types.uuid_or_name, types.listtype)
-    def get_one(self, request_ident, fields=None):
+    @expose.expose(Request, types.uuid_or_name, types.listtype, int)
+    def get_one(self, request_ident, fields=None, wait=None):
         """Retrieve information about the given request.
 
         :param request_ident: UUID or logical name of a request.
         :param fields: Optional, a list with a specified set of fields
             of the resource to be returned.
+        :param wait: Optional, seconds to wait for the completion of the
+            request before returning it. It cannot be larger than the
+            value of max_request_wait in the [api] section. A 503 response
+            is returned when max_request_waiters clients are waiting.
         """
 
         cdict = pecan.request.context.to_policy_values()
         policy.authorize('iot:request:get_one', cdict, cdict)
 
-        rpc_request = objects.Request.get_by_uuid(pecan.request.context,
-                                                  request_ident)
+        wait = api_utils.validate_wait(wait)
+        if not wait:
+            rpc_request = objects.Request.get_by_uuid(pecan.request.context,
+                                                      request_ident)
+            return Request.convert_with_links(rpc_request, fields=fields)
+
+        # watched before reading it, so a completion is never missed
+        with api_utils.waiter_slot(), \
+                request_events.waiter.watch(request_ident) as completed:
+            rpc_request = objects.Request.get_by_uuid(pecan.request.context,
+                                                      request_ident)
+            if (rpc_request.status != objects.request.COMPLETED and
+                    completed.wait(wait)):
+                rpc_request = objects.Request.get_by_uuid(
+                    pecan.request.context, request_ident)
         return Request.convert_with_links(rpc_request, fields=fields)
 
-    @expose.expose(RequestCollection, types.uuid, int, wtypes.text,
+    @expose.expose(RequestCollection, wtypes.text, int, wtypes.text,
                    wtypes.text, types.listtype, types.boolean, types.boolean)
     def get_all(self, marker=None,
                 limit=None, sort_key='id', sort_dir='asc',
-                fields=None):
+                fields=None, stream=False):
         """Retrieve a list of requests.
 
         :param marker: pagination marker for large data sets.
@@ -249,6 +360,8 @@ class RequestsController(rest.RestController):
                             Only for the admin
         :param fields: Optional, a list with a specified set of fields
                        of the resource to be returned.
+        :param stream: Optional boolean to get all the requests as a stream
+                       of JSON lines, ignoring marker and limit.
         """
         cdict = pecan.request.context.to_policy_values()
         policy.authorize('iot:request:get', cdict, cdict)
@@ -258,9 +371,11 @@ class RequestsController(rest.RestController):
         return self._get_requests_collection(marker,
                                              limit, sort_key, sort_dir,
                                              project=cdict['project_id'],
-                                             fields=fields)
+                                             fields=fields,
+                                             stream=api_utils.is_stream(
+                                                 stream))
 
-    @expose.expose(RequestCollection, types.uuid, int, wtypes.text,
+    @expose.expose(RequestCollection, wtypes.text, int, wtypes.text,
                    wtypes.text, types.listtype, types.boolean, types.boolean)
     def detail(self, marker=None,
                limit=None, sort_key='id', sort_dir='asc',
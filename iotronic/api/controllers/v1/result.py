@@ -41,6 +41,8 @@ class Result(base.APIBase):
     request_uuid = types.uuid
     result = wsme.wsattr(wtypes.text)
     message = wsme.wsattr(wtypes.text)
+    message_size = wsme.types.IntegerType()
+    message_digest = wsme.wsattr(wtypes.text)
 
     links = wsme.wsattr([link.Link], readonly=True)
 
@@ -85,7 +87,8 @@ class ResultCollection(collection.Collection):
         collection = ResultCollection()
         collection.results = [Result.convert_with_links(n, fields=fields)
                               for n in results]
-        collection.next = collection.get_next(limit, url=url, **kwargs)
+        collection.next = collection.get_next(
+            limit, url=url, last=results[-1] if results else None, **kwargs)
         return collection
 
 
@@ -91,7 +91,8 @@ class ServiceCollection(collection.Collection):
         collection = ServiceCollection()
         collection.services = [Service.convert_with_links(n, fields=fields)
                                for n in services]
-        collection.next = collection.get_next(limit, url=url, **kwargs)
+        collection.next = collection.get_next(
+            limit, url=url, last=services[-1] if services else None, **kwargs)
         return collection
 
 
@@ -107,10 +108,7 @@ class PublicServicesController(rest.RestController):
         limit = api_utils.validate_limit(limit)
         sort_dir = api_utils.validate_sort_dir(sort_dir)
 
-        marker_obj = None
-        if marker:
-            marker_obj = objects.Service.get_by_uuid(pecan.request.context,
-                                                     marker)
+        marker_obj = api_utils.get_marker(objects.Service, marker, sort_key)
 
         if sort_key in self.invalid_sort_key_list:
             raise exception.InvalidParameterValue(
@@ -131,7 +129,7 @@ class PublicServicesController(rest.RestController):
                                                     fields=fields,
                                                     **parameters)
 
-    @expose.expose(ServiceCollection, types.uuid, int, wtypes.text,
+    @expose.expose(ServiceCollection, wtypes.text, int, wtypes.text,
                    wtypes.text, types.listtype, types.boolean, types.boolean)
     def get_all(self, marker=None,
                 limit=None, sort_key='id', sort_dir='asc',
@@ -177,10 +175,7 @@ class ServicesController(rest.RestController):
         limit = api_utils.validate_limit(limit)
         sort_dir = api_utils.validate_sort_dir(sort_dir)
 
-        marker_obj = None
-        if marker:
-            marker_obj = objects.Service.get_by_uuid(pecan.request.context,
-                                                     marker)
+        marker_obj = api_utils.get_marker(objects.Service, marker, sort_key)
 
         if sort_key in self.invalid_sort_key_list:
             raise exception.InvalidParameterValue(
@@ -226,7 +221,7 @@ class ServicesController(rest.RestController):
 
         return Service.convert_with_links(rpc_service, fields=fields)
 
-    @expose.expose(ServiceCollection, types.uuid, int, wtypes.text,
+    @expose.expose(ServiceCollection, wtypes.text, int, wtypes.text,
                    wtypes.text, types.listtype, types.boolean, types.boolean)
     def get_all(self, marker=None,
                 limit=None, sort_key='id', sort_dir='asc',
@@ -326,7 +321,7 @@ class ServicesController(rest.RestController):
             pecan.request.context, rpc_service)
         return Service.convert_with_links(updated_service)
 
-    @expose.expose(ServiceCollection, types.uuid, int, wtypes.text,
+    @expose.expose(ServiceCollection, wtypes.text, int, wtypes.text,
                    wtypes.text, types.listtype, types.boolean, types.boolean)
     def detail(self, marker=None,
                limit=None, sort_key='id', sort_dir='asc',
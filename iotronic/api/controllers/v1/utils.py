@@ -13,11 +13,20 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import base64
+import contextlib
+import datetime
+import itertools
+import json
+import threading
+
 import jsonpatch
 from oslo_config import cfg
+from oslo_utils import timeutils
 from oslo_utils import uuidutils
 import pecan
 import wsme
+from wsme.rest import json as wsme_json
 
 from iotronic.common import exception
 from iotronic.common.i18n import _
@@ -41,6 +50,153 @@ def validate_limit(limit):
     return min(CONF.api.max_limit, limit)
 
 
+def validate_wait(wait):
+    if not wait:
+        return 0
+
+    if wait < 0:
+        raise wsme.exc.ClientSideError(_("Wait must be positive"))
+
+    return min(CONF.api.max_request_wait, wait)
+
+
+_waiters_lock = threading.Lock()
+_waiters = None
+
+
+@contextlib.contextmanager
+def waiter_slot():
+    """Hold one of the max_request_waiters slots of the API process.
+
+    A waiting client holds a thread of the WSGI server until the request
+    is completed or the wait is over. When all the slots are taken the
+    client is told to retry, with a 503 response.
+    """
+    global _waiters
+    with _waiters_lock:
+        if _waiters is None:
+            _waiters = threading.BoundedSemaphore(
+                CONF.api.max_request_waiters)
+    if not _waiters.acquire(blocking=False):
+        pecan.response.headers['Retry-After'] = '1'
+        raise exception.TemporaryFailure()
+    try:
+        yield
+    finally:
+        _waiters.release()
+
+
+def get_columns(fields, object_fields, sort_key=None,
+                required=('id', 'uuid')):
+    """Return the columns to load from the DB for the requested fields.
+
+    :param fields: A list of fields requested by the user, None for all.
+    :param object_fields: A list of fields supported by the object.
+    :param sort_key: The sort key, needed by the cursor of the next page.
+    :param required: The fields always needed to build the response.
+    :returns: The list of columns to load, None to load all of them.
+    """
+    if fields is None:
+        return None
+
+    columns = set(required)
+    columns.update(f for f in fields if f in object_fields)
+    if sort_key in object_fields:
+        columns.add(sort_key)
+    return sorted(columns)
+
+
+def _cursor_value(value):
+    if isinstance(value, datetime.datetime):
+        return {'datetime': value.isoformat()}
+    return value
+
+
+def _cursor_datetime(value):
+    if isinstance(value, dict):
+        return timeutils.normalize_time(
+            timeutils.parse_isotime(value['datetime']))
+    return value
+
+
+def encode_cursor(rpc_obj, sort_key):
+    """Return the opaque cursor of the page following an object.
+
+    The cursor carries the sort key value and the id of the object, so
+    the next page is read without looking up the marker first.
+    """
+    cursor = json.dumps([sort_key, _cursor_value(rpc_obj[sort_key]),
+                         rpc_obj.id])
+    return base64.urlsafe_b64encode(
+        cursor.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def get_marker(obj_cls, marker, sort_key):
+    """Return the marker of a page.
+
+    :param obj_cls: The class of the objects listed.
+    :param marker: The cursor of the page, or the uuid of the last object
+                   of the previous page.
+    :param sort_key: The sort key of the listing.
+    :returns: None for the first page, the values of the marker otherwise.
+    :raises: ClientSideError if the cursor is not valid.
+    """
+    if not marker:
+        return None
+
+    # the objects without uuid are only paginated with cursors
+    if uuidutils.is_uuid_like(marker) and hasattr(obj_cls, 'get_by_uuid'):
+        return obj_cls.get_by_uuid(pecan.request.context, marker)
+
+    try:
+        padding = '=' * (-len(marker) % 4)
+        key, value, id = json.loads(base64.urlsafe_b64decode(
+            (marker + padding).encode('ascii')).decode('utf-8'))
+    except (TypeError, ValueError):
+        raise wsme.exc.ClientSideError(_("Invalid marker: %s") % marker)
+
+    if key != sort_key:
+        raise wsme.exc.ClientSideError(
+            _("The marker does not match the sort key %s") % sort_key)
+
+    return {key: _cursor_datetime(value), 'id': id}
+
+
+def is_stream(stream):
+    """Return whether a collection is requested as a stream.
+
+    :param stream: the stream parameter of the request.
+    """
+    return bool(stream) or pecan.request.environ.get('iotronic.stream', False)
+
+
+def stream_collection(datatype, items):
+    """Send the items of a collection as a stream, a JSON line each.
+
+    The items are iterated while the response is sent, after the
+    controller has returned: they cannot use pecan.request.
+
+    :param datatype: the API type of the items.
+    :param items: an iterator of the items.
+    """
+    def lines():
+        for item in items:
+            yield (json.dumps(wsme_json.tojson(datatype, item)) +
+                   '\n').encode('utf-8')
+
+    pecan.request.environ['iotronic.stream_lines'] = lines()
+
+
+def batches(items, size):
+    """Split an iterator in lists of size items at most."""
+    items = iter(items)
+    while True:
+        batch = list(itertools.islice(items, size))
+        if not batch:
+            return
+        yield batch
+
+
 def validate_sort_dir(sort_dir):
     if sort_dir not in ['asc', 'desc']:
         raise wsme.exc.ClientSideError(_("Invalid sort direction: %s. "
@@ -91,7 +91,9 @@ class WebserviceCollection(collection.Collection):
         collection.webservices = [Webservice.convert_with_links(n,
                                                                 fields=fields)
                                   for n in webservices]
-        collection.next = collection.get_next(limit, url=url, **kwargs)
+        collection.next = collection.get_next(
+            limit, url=url, last=webservices[-1] if webservices else None,
+            **kwargs)
         return collection
 
 
@@ -129,10 +131,7 @@ class WebservicesController(rest.RestController):
         limit = api_utils.validate_limit(limit)
         sort_dir = api_utils.validate_sort_dir(sort_dir)
 
-        marker_obj = None
-        if marker:
-            marker_obj = objects.Webservice.get_by_uuid(pecan.request.context,
-                                                        marker)
+        marker_obj = api_utils.get_marker(objects.Webservice, marker, sort_key)
 
         if sort_key in self.invalid_sort_key_list:
             raise exception.InvalidParameterValue(
@@ -169,7 +168,7 @@ class WebservicesController(rest.RestController):
 
         return Webservice.convert_with_links(rpc_webservice, fields=fields)
 
-    @expose.expose(WebserviceCollection, types.uuid, int, wtypes.text,
+    @expose.expose(WebserviceCollection, wtypes.text, int, wtypes.text,
                    wtypes.text, types.listtype, types.boolean, types.boolean)
     def get_all(self, marker=None,
                 limit=None, sort_key='id', sort_dir='asc',
@@ -241,7 +240,7 @@ class WebservicesController(rest.RestController):
     #         pecan.request.context, rpc_webservice)
     #     return Webservice.convert_with_links(updated_webservice)
 
-    @expose.expose(WebserviceCollection, types.uuid, int, wtypes.text,
+    @expose.expose(WebserviceCollection, wtypes.text, int, wtypes.text,
                    wtypes.text, types.listtype, types.boolean, types.boolean)
     def detail(self, marker=None,
                limit=None, sort_key='id', sort_dir='asc',
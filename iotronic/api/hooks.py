@@ -28,6 +28,8 @@ LOG = log.getLogger(__name__)
 
 CHECKED_DEPRECATED_POLICY_ARGS = False
 
+NDJSON = 'application/x-ndjson'
+
 
 class ConfigHook(hooks.PecanHook):
     """Attach the config object to the request so controllers can get to it."""
@@ -143,3 +145,34 @@ class PublicUrlHook(hooks.PecanHook):
     def before(self, state):
         state.request.public_url = (cfg.CONF.api.public_endpoint or
                                     state.request.host_url)
+
+
+class StreamHook(hooks.PecanHook):
+    """Stream the collections as newline delimited JSON.
+
+    wsme renders the whole value returned by a controller at once, so a
+    controller streaming a collection leaves the iterator of the lines on
+    the request and returns an empty collection, whose body is replaced
+    by the iterator. The lines are serialized while the response is sent,
+    a few items at a time.
+
+    The clients ask for a stream with the stream parameter, or with an
+    Accept header preferring application/x-ndjson.
+    """
+
+    def on_route(self, state):
+        accept = state.request.accept
+        if accept and accept.best_match(['application/json',
+                                         NDJSON]) == NDJSON:
+            state.request.environ['iotronic.stream'] = True
+            # the controllers only produce json
+            state.request.environ['HTTP_ACCEPT'] = 'application/json'
+
+    def after(self, state):
+        lines = state.request.environ.get('iotronic.stream_lines')
+        if lines is None or state.response.status_int != http_client.OK:
+            return
+        state.response.content_type = NDJSON
+        state.response.charset = 'utf-8'
+        state.response.app_iter = lines
+        state.response.content_length = None
@@ -26,9 +26,11 @@ from iotronic.common.i18n import _
 from iotronic.common import service
 from iotronic.db import api as db_api
 from iotronic.db import migration
+from iotronic.db import purge
 from oslo_config import cfg
 
 CONF = cfg.CONF
+CONF.import_group('conductor', 'iotronic.conductor.manager')
 dbapi = db_api.get_instance()
 
 # NOTE(rloo): This is a list of functions to perform online data migrations
@@ -59,7 +61,8 @@ dbapi = db_api.get_instance()
 # object, in case it is lazy loaded. The attribute will be accessed when needed
 # by doing getattr on the object
 ONLINE_MIGRATIONS = (
-
+    # one session row per board, the superseded ones go to session_history
+    (dbapi, 'compact_wamp_sessions'),
 )
 
 
@@ -120,6 +123,25 @@ class DBCommand(object):
     def create_schema(self):
         migration.create_schema()
 
+    def purge(self):
+        age_in_days = CONF.command.age_in_days
+        if age_in_days is None:
+            age_in_days = CONF.conductor.request_retention_days or None
+        if age_in_days is None:
+            print(_('"age-in-days" or [conductor]request_retention_days '
+                    'must be set.'), file=sys.stderr)
+            sys.exit(127)
+
+        report = purge.purge_requests(
+            dbapi, age_in_days,
+            CONF.command.batch_size or CONF.conductor.purge_batch_size,
+            archive_dir=(CONF.command.archive_dir or
+                         CONF.conductor.purge_archive_dir),
+            max_batches=CONF.command.max_batches,
+            pause=CONF.command.pause)
+        print(_('Purged %(requests)d requests and %(results)d results, '
+                '%(bytes)d bytes.') % report)
+
     def online_data_migrations(self):
         self._check_versions()
         self._run_online_data_migrations(max_count=CONF.command.max_count,
@@ -307,6 +329,34 @@ def add_command_parsers(subparsers):
                "<migration name>.<option>=<value>"))
     parser.set_defaults(func=command_object.online_data_migrations)
 
+    parser = subparsers.add_parser(
+        'purge',
+        help=_("Delete the completed requests older than --age-in-days, "
+               "with their results, in batches. With --archive-dir they "
+               "are first written to a gzipped NDJSON file."))
+    parser.add_argument(
+        '--age-in-days', metavar='<days>', dest='age_in_days', type=int,
+        help=_("Age of the oldest requests to keep. Defaults to "
+               "[conductor]request_retention_days."))
+    parser.add_argument(
+        '--batch-size', metavar='<number>', dest='batch_size', type=int,
+        help=_("Maximum number of requests, main and sub requests, "
+               "deleted in each transaction. "
+               "Defaults to [conductor]purge_batch_size."))
+    parser.add_argument(
+        '--max-batches', metavar='<number>', dest='max_batches', type=int,
+        help=_("Maximum number of batches to purge. If unspecified, all "
+               "the expired requests are purged."))
+    parser.add_argument(
+        '--archive-dir', metavar='<path>', dest='archive_dir',
+        help=_("Directory where the purged rows are archived. Defaults to "
+               "[conductor]purge_archive_dir."))
+    parser.add_argument(
+        '--pause', metavar='<seconds>', dest='pause', type=float,
+        default=0,
+        help=_("Seconds to wait between two batches."))
+    parser.set_defaults(func=command_object.purge)
+
 
 def main():
     command_opt = cfg.SubCommandOpt('command',
@@ -321,7 +371,7 @@ def main():
     valid_commands = set([
         'upgrade', 'revision',
         'version', 'stamp', 'create_schema',
-        'online_data_migrations',
+        'online_data_migrations', 'purge',
     ])
     if not set(sys.argv) & valid_commands:
         sys.argv.append('upgrade')
@@ -252,10 +252,19 @@ class BoardNotFound(NotFound):
     message = _("Board %(board)s could not be found.")
 
 
+class ResultNotFound(NotFound):
+    message = _("Result could not be found.")
+
+
 class BoardNotConnected(Invalid):
     message = _("Board %(board)s is not connected.")
 
 
+class BoardRedirected(Invalid):
+    message = _("Board %(board)s is placed on the wamp agent %(agent)s, "
+                "connect to %(url)s.")
+
+
 class BoardAssociated(InvalidState):
     message = _("Board %(board)s is associated with instance %(instance)s.")
 
@@ -301,6 +310,10 @@ class WampAgentNotFound(NotFound):
     message = _("WampAgent %(wampagent)s could not be found.")
 
 
+class WampAgentNotActive(TemporaryFailure):
+    message = _("WampAgent %(wampagent)s is not active.")
+
+
 class WampRegistrationAgentNotFound(NotFound):
     message = _("No Wamp Registration Agent could not be found.")
 
@@ -624,6 +637,11 @@ class NotEnoughPortForService(NotFound):
     message = _("No ports available")
 
 
+class PortPoolNotFound(NotFound):
+    message = _("Port pool %(pool)s of WampAgent %(agent)s "
+                "could not be found.")
+
+
 class ExposedServiceNotFound(NotFound):
     message = _("ExposedService %(uuid)s could not be found.")
 
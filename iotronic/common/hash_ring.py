@@ -16,6 +16,7 @@
 import bisect
 import hashlib
 import threading
+import time
 
 from oslo_config import cfg
 import six
@@ -47,6 +48,12 @@ hash_opts = [
                     'conductor services to prepare deployment environments '
                     'and potentially allow the Iotronic cluster to recover '
                     'more quickly if a conductor instance is terminated.'),
+    cfg.IntOpt('hash_ring_reset_interval',
+               default=15,
+               help='Interval (in seconds) between hash ring resets. The '
+                    'ring is rebuilt from the active conductors, so this '
+                    'is the maximum time needed to rebalance the boards '
+                    'when a conductor joins or leaves the cluster.'),
 ]
 
 CONF = cfg.CONF
@@ -161,7 +168,15 @@ class HashRing(object):
 
 
 class HashRingManager(object):
-    _hash_rings = None
+    """Map the boards onto the active conductors.
+
+    The ring is shared by all the instances of the manager in a process
+    and it is rebuilt every hash_ring_reset_interval seconds from the
+    conductors that are heartbeating, so that the boards are rebalanced
+    when a conductor joins, leaves or dies.
+    """
+    _hash_ring = None
+    _hash_ring_updated_at = 0
     _lock = threading.Lock()
 
     def __init__(self):
@@ -169,32 +184,41 @@ class HashRingManager(object):
 
     @property
     def ring(self):
+        interval = CONF.hash_ring_reset_interval
+        limit = time.time() - interval
+
         # Hot path, no lock
-        if self._hash_rings is not None:
-            return self._hash_rings
+        if (self._hash_ring is not None and
+                self._hash_ring_updated_at >= limit):
+            return self._hash_ring
 
         with self._lock:
-            if self._hash_rings is None:
-                rings = self._load_hash_rings()
-                self.__class__._hash_rings = rings
-            return self._hash_rings
-
-    def _load_hash_rings(self):
-        rings = {}
-        d2c = self.dbapi.get_active_driver_dict()
+            if (self.__class__._hash_ring is None or
+                    self.__class__._hash_ring_updated_at < limit):
+                ring = self._load_hash_ring()
+                self.__class__._hash_ring = ring
+                self.__class__._hash_ring_updated_at = time.time()
+            return self.__class__._hash_ring
 
-        for driver_name, hosts in d2c.items():
-            rings[driver_name] = HashRing(hosts)
-        return rings
+    def _load_hash_ring(self):
+        hosts = self.dbapi.get_active_conductor_list()
+        return HashRing(hosts)
 
     @classmethod
     def reset(cls):
         with cls._lock:
-            cls._hash_rings = None
+            cls._hash_ring = None
+            cls._hash_ring_updated_at = 0
 
-    def __getitem__(self, driver_name):
-        try:
-            return self.ring[driver_name]
-        except KeyError:
-            raise exception.DriverNotFound(
-                _("The driver '%s' is unknown.") % driver_name)
+    def get_host_for(self, data):
+        """Get the conductor which the supplied data maps onto.
+
+        :param data: A string identifier, e.g. the uuid of a board.
+        :returns: the hostname of a conductor.
+        :raises: NoValidHost if there are no active conductors.
+        """
+        hosts = self.ring.get_hosts(data)
+        if not hosts:
+            raise exception.NoValidHost(
+                reason=_("no active conductor is available"))
+        return hosts[0]
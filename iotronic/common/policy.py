@@ -88,6 +88,8 @@ board_policies = [
     policy.RuleDefault('iot:board_action:post',
                        'rule:admin_or_owner',
                        description='Action on Board records'),
+    policy.RuleDefault('iot:board:rebalance', 'rule:is_admin',
+                       description='Rebalance Boards across WampAgents'),
 
 ]
 
@@ -181,6 +183,8 @@ fleet_policies = [
                        description='Delete Fleet records'),
     policy.RuleDefault('iot:fleet:update', 'rule:admin_or_owner',
                        description='Update Fleet records'),
+    policy.RuleDefault('iot:fleet_action:post', 'rule:admin_or_owner',
+                       description='Action on the Boards of a Fleet'),
 
 ]
 
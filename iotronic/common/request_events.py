@@ -0,0 +1,136 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Completion notifications of the requests.
+
+The conductors and the wamp agents complete the requests; the API
+services wait for them on behalf of the clients polling a request, and
+the conductors stop tracking their deadline.
+"""
+
+import contextlib
+import os
+import threading
+
+from oslo_config import cfg
+from oslo_log import log as logging
+import oslo_messaging
+
+from iotronic.common import rpc
+
+LOG = logging.getLogger(__name__)
+
+TOPIC = 'iotronic.request_events'
+
+
+class RequestEventsAPI(object):
+    """Client side of the request completion notifications.
+
+    The notifications are casted in fanout to all the API services.
+    """
+
+    RPC_API_VERSION = '1.0'
+
+    def __init__(self, transport=None):
+        if transport is None:
+            transport = oslo_messaging.get_transport(cfg.CONF)
+        target = oslo_messaging.Target(topic=TOPIC, fanout=True,
+                                       version=self.RPC_API_VERSION)
+        self.client = oslo_messaging.RPCClient(
+            transport, target,
+            serializer=rpc.RequestContextSerializer(None))
+
+    def requests_completed(self, context, request_uuids):
+        """Notify the completion of some requests.
+
+        :param context: request context.
+        :param request_uuids: the uuids of the completed requests.
+        """
+        if not request_uuids:
+            return
+        try:
+            self.client.cast(context, 'requests_completed',
+                             request_uuids=list(request_uuids))
+        except Exception as e:
+            # the waiting clients get the request at their timeout
+            LOG.warning('Could not notify the completion of %d requests: %s',
+                        len(request_uuids), e)
+
+
+def get_server(endpoint, transport=None):
+    """Return a server of the notifications for this process.
+
+    :param endpoint: an object with a requests_completed method.
+    :param transport: the transport, the default one if not given.
+    """
+    if transport is None:
+        transport = oslo_messaging.get_transport(cfg.CONF)
+    # a server per process: the API workers are forked
+    target = oslo_messaging.Target(
+        topic=TOPIC, server='%s.%d' % (cfg.CONF.host, os.getpid()))
+    return oslo_messaging.get_rpc_server(
+        transport, target, [endpoint], executor='threading',
+        serializer=rpc.RequestContextSerializer(None))
+
+
+class RequestWaiter(object):
+    """Server side of the request completion notifications.
+
+    Each API process listens for the notifications once a client waits
+    for a request, and wakes up the clients waiting for the completed
+    requests.
+    """
+
+    target = oslo_messaging.Target(version='1.0')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events = {}
+        self._server = None
+
+    def start(self):
+        with self._lock:
+            if self._server is not None:
+                return
+            self._server = get_server(self)
+            self._server.start()
+
+    @contextlib.contextmanager
+    def watch(self, request_uuid):
+        """Return an event set when the request is completed.
+
+        The request has to be read again once watched, it may have been
+        completed before.
+        """
+        self.start()
+        event = threading.Event()
+        with self._lock:
+            self._events.setdefault(request_uuid, set()).add(event)
+        try:
+            yield event
+        finally:
+            with self._lock:
+                events = self._events.get(request_uuid)
+                events.discard(event)
+                if not events:
+                    del self._events[request_uuid]
+
+    def requests_completed(self, ctx, request_uuids):
+        with self._lock:
+            events = [event for request_uuid in request_uuids
+                      for event in self._events.get(request_uuid, ())]
+        for event in events:
+            event.set()
+
+
+waiter = RequestWaiter()
@@ -0,0 +1,99 @@
+# coding=utf-8
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import datetime
+import threading
+
+import oslo_messaging
+from oslo_utils import timeutils
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+
+class TimerWheel(object):
+    """Hashed timing wheel of the deadlines of the requests.
+
+    Each slot holds the requests expiring during a tick, so scheduling a
+    request and collecting the due ones cost O(1) per request whatever
+    the number of requests waiting. The deadlines farther than a
+    revolution of the wheel share the slot and are kept until their tick.
+    """
+
+    def __init__(self, tick=1.0, slots=512):
+        self._lock = threading.Lock()
+        self._tick = tick
+        self._slots = [dict() for i in range(slots)]
+        self._keys = {}
+        self._current = self._ticks(timeutils.utcnow())
+
+    def _ticks(self, when):
+        return int((when - EPOCH).total_seconds() // self._tick)
+
+    def schedule(self, key, deadline):
+        ticks = self._ticks(deadline)
+        with self._lock:
+            self._discard(key)
+            # already overdue: due at the next advance
+            ticks = max(ticks, self._current + 1)
+            slot = ticks % len(self._slots)
+            self._slots[slot][key] = ticks
+            self._keys[key] = slot
+
+    def cancel(self, key):
+        with self._lock:
+            self._discard(key)
+
+    def _discard(self, key):
+        slot = self._keys.pop(key, None)
+        if slot is not None:
+            self._slots[slot].pop(key, None)
+
+    def advance(self, now):
+        """Move the wheel to now and return the keys that are due."""
+        ticks = self._ticks(now)
+        due = []
+        with self._lock:
+            if ticks <= self._current:
+                return due
+            # a late advance visits each slot once at most
+            start = max(self._current + 1, ticks - len(self._slots) + 1)
+            for t in range(start, ticks + 1):
+                slot = self._slots[t % len(self._slots)]
+                for key, expiry in list(slot.items()):
+                    if expiry <= ticks:
+                        del slot[key]
+                        del self._keys[key]
+                        due.append(key)
+            self._current = ticks
+        return due
+
+    def __len__(self):
+        return len(self._keys)
+
+
+class ExpiryCanceller(object):
+    """Take the completed requests out of the wheel.
+
+    It receives the completion notifications of the requests, wherever
+    they are completed.
+    """
+
+    target = oslo_messaging.Target(version='1.0')
+
+    def requests_completed(self, ctx, request_uuids):
+        for request_uuid in request_uuids:
+            wheel.cancel(request_uuid)
+
+
+wheel = TimerWheel()
@@ -21,7 +21,9 @@ except Exception:
     # allow iotronic api to run also with python2.7
     import pickle as cpickle
 
-import random
+from concurrent import futures
+import datetime
+import math
 import socket
 import json
 
@@ -29,11 +31,17 @@ import json
 from oslo_config import cfg
 from oslo_log import log as logging
 import oslo_messaging
+from oslo_utils import timeutils
+from oslo_utils import uuidutils
 
 from iotronic import objects
+from iotronic.common import context
 from iotronic.common import exception, designate
+from iotronic.common import hash_ring
 from iotronic.common import neutron
+from iotronic.common import request_events
 from iotronic.common import states
+from iotronic.conductor import deadlines
 from iotronic.conductor.provisioner import Provisioner
 from iotronic.objects import base as objects_base
 from iotronic.wamp import wampmessage as wm
@@ -42,11 +50,6 @@ LOG = logging.getLogger(__name__)
 
 serializer = objects_base.IotronicObjectSerializer()
 
-Port = list()
-
-SERVICE_PORT_LIST = []
-
-
 
 def versionCompare(v1, v2):
     """Method to compare two versions.
@@ -76,6 +79,19 @@ def versionCompare(v1, v2):
         return 0
 
 
+def request_deadline():
+    """Return the deadline of a new request, None if they do not expire."""
+    timeout = cfg.CONF.conductor.request_timeout
+    if timeout:
+        return timeutils.utcnow() + datetime.timedelta(seconds=timeout)
+
+
+def schedule_expiry(reqs):
+    for req in reqs:
+        if req.deadline and req.status != objects.request.COMPLETED:
+            deadlines.wheel.schedule(req.uuid, req.deadline)
+
+
 def new_req(ctx, board, type, action, main_req=None, pending_requests=0):
     req_data = {
         'destination_uuid': board.uuid,
@@ -83,12 +99,14 @@ def new_req(ctx, board, type, action, main_req=None, pending_requests=0):
         'status': objects.request.PENDING,
         'action': action,
         'project': board.project,
-        'pending_requests': pending_requests
+        'pending_requests': pending_requests,
+        'deadline': request_deadline()
     }
     if main_req:
         req_data['main_request_uuid'] = main_req
     req = objects.Request(ctx, **req_data)
     req.create()
+    schedule_expiry([req])
     return req
 
 
@@ -105,32 +123,142 @@ def new_res(ctx, board, req_uuid):
     return res
 
 
-def get_best_agent(ctx):
-    agents = objects.WampAgent.list(ctx, filters={'online': True})
+def place_board(board_uuid, hosts, load, ring=None):
+    """Choose the agent of a board by consistent hashing with bounded loads.
+
+    The board is mapped onto a ring of the agents and it is assigned to
+    the first agent of the ring whose load is below the capacity, that is
+    placement_load_factor times the average load. The ring of the hosts
+    can be given when placing several boards.
+    """
+    if ring is None:
+        ring = hash_ring.HashRing(hosts, replicas=1)
+    total = sum(load.get(host, 0) for host in hosts) + 1
+    capacity = math.ceil(
+        total * cfg.CONF.conductor.placement_load_factor / len(hosts))
+
+    full = []
+    while len(full) < len(hosts):
+        host = ring.get_hosts(board_uuid, ignore_hosts=full)[0]
+        if load.get(host, 0) < capacity:
+            return host
+        full.append(host)
+    return min(hosts, key=lambda host: load.get(host, 0))
+
+
+def get_best_agent(ctx, board_uuid):
+    agents = objects.WampAgent.list(ctx, filters={'alive': True})
     LOG.debug('found %d Agent(s).', len(agents))
-    agent = random.choice(agents)
-    LOG.debug('Selected agent: %s', agent.hostname)
-    return agent.hostname
-
-
-def random_public_port(ctx=None):
-    global SERVICE_PORT_LIST
-    if not SERVICE_PORT_LIST:
-        # empty, create a cache list
-        min = cfg.CONF.conductor.service_port_min + 1
-        max = cfg.CONF.conductor.service_port_max - 1
-        LOG.debug('recreate service port list cache: min %i max %i', min, max)
-        full_list = (range(min, max))
-        exp_list = objects.ExposedService.get_all_ports(ctx)
-        SERVICE_PORT_LIST = list(set(full_list) - set(exp_list))
-
-    if len(SERVICE_PORT_LIST) == 0:
-        LOG.warning('No more ports available')
-        return None
-    else:
-        num = random.choice(SERVICE_PORT_LIST)
-        SERVICE_PORT_LIST.remove(num)
-    return num
+    if not agents:
+        raise exception.NoValidHost(reason='no active wamp agent')
+    load = objects.WampAgent.get_load(ctx)
+    agent = place_board(board_uuid, [a.hostname for a in agents], load)
+    LOG.debug('Selected agent: %s', agent)
+    return agent
+
+
+def get_active_agent(ctx, hostname):
+    agent = objects.WampAgent.get_by_hostname(ctx, hostname)
+    if not agent.is_alive(cfg.CONF.conductor.agent_heartbeat_timeout):
+        LOG.warning('Agent %s is not heartbeating', hostname)
+        raise exception.WampAgentNotActive(wampagent=hostname)
+    return agent
+
+
+def is_active_agent(ctx, hostname):
+    try:
+        get_active_agent(ctx, hostname)
+    except (exception.WampAgentNotFound, exception.WampAgentNotActive):
+        return False
+    return True
+
+
+def service_port_range(agent):
+    ranges = cfg.CONF.conductor.service_port_ranges
+    if agent in ranges:
+        port_min, port_max = ranges[agent].split('-')
+        return int(port_min), int(port_max)
+    return (cfg.CONF.conductor.service_port_min,
+            cfg.CONF.conductor.service_port_max)
+
+
+def reserve_public_port(ctx, board):
+    pool = objects.portreservation.SERVICE
+    try:
+        return objects.PortReservation.reserve(ctx, board.agent, pool,
+                                               board.uuid)
+    except exception.PortPoolNotFound:
+        port_min, port_max = service_port_range(board.agent)
+        LOG.debug('create service port pool of agent %s: min %i max %i',
+                  board.agent, port_min, port_max)
+        objects.PortReservation.create_pool(
+            ctx, board.agent, pool, range(port_min + 1, port_max - 1),
+            objects.ExposedService.get_all_ports(ctx))
+        return objects.PortReservation.reserve(ctx, board.agent, pool,
+                                               board.uuid)
+
+
+def release_public_port(ctx, board, port):
+    objects.PortReservation.release(ctx, board.agent,
+                                    objects.portreservation.SERVICE, port)
+
+
+def tunnel_ports_in_use(ctx):
+    # the port of the socat tunnel of a VIF is part of its name
+    used = {}
+    for agent, VIF_name in objects.Port.get_vif_list(ctx):
+        if agent and VIF_name and VIF_name[8:].isdigit():
+            used.setdefault(agent, []).append(int(VIF_name[8:]))
+    return used
+
+
+def tunnel_port_range():
+    return range(cfg.CONF.conductor.tunnel_port_min,
+                 cfg.CONF.conductor.tunnel_port_max + 1)
+
+
+def recover_tunnel_ports(ctx):
+    # nothing is released here: another conductor may be creating a port
+    pool = objects.portreservation.TUNNEL
+    for agent, ports in tunnel_ports_in_use(ctx).items():
+        LOG.debug('recovering %d tunnel port(s) of agent %s',
+                  len(ports), agent)
+        objects.PortReservation.create_pool(ctx, agent, pool,
+                                            tunnel_port_range(), ports)
+        objects.PortReservation.reserve_used(ctx, agent, pool, ports)
+
+
+def release_stale_tunnel_ports(ctx, before):
+    """Release the tunnel ports reserved before a time and not in use.
+
+    The agents without VIFs are included, their ports are all unused.
+    """
+    pool = objects.portreservation.TUNNEL
+    used = tunnel_ports_in_use(ctx)
+    agents = set(used) | set(a.hostname for a in objects.WampAgent.list(ctx))
+    released = 0
+    for agent in agents:
+        released += objects.PortReservation.release_stale(
+            ctx, agent, pool, used.get(agent, []), before)
+    return released
+
+
+def reserve_tunnel_port(ctx, board):
+    pool = objects.portreservation.TUNNEL
+    try:
+        return objects.PortReservation.reserve(ctx, board.agent, pool,
+                                               board.uuid)
+    except exception.PortPoolNotFound:
+        used = tunnel_ports_in_use(ctx).get(board.agent, [])
+        objects.PortReservation.create_pool(ctx, board.agent, pool,
+                                            tunnel_port_range(), used)
+        return objects.PortReservation.reserve(ctx, board.agent, pool,
+                                               board.uuid)
+
+
+def release_tunnel_port(ctx, board, port):
+    objects.PortReservation.release(ctx, board.agent,
+                                    objects.portreservation.TUNNEL, port)
 
 
 def manage_result(res, wamp_rpc_call, board_uuid):
@@ -195,6 +323,11 @@ class ConductorEndpoint(object):
         self.wamp_agent_client = self.wamp_agent_client.prepare(timeout=120,
                                                                 topic='s4t')
         self.ragent = ragent
+        self.request_events = request_events.RequestEventsAPI(transport)
+        self.fleet_executor = futures.ThreadPoolExecutor(
+            max_workers=cfg.CONF.conductor.fleet_action_workers)
+
+        recover_tunnel_ports(context.get_admin_context())
 
     def echo(self, ctx, data):
         LOG.info("ECHO: %s" % data)
@@ -211,21 +344,12 @@ class ConductorEndpoint(object):
             LOG.error(msg)
             return wm.WampError(msg).serialize()
 
-        try:
-            old_ses = objects.SessionWP(ctx)
-            old_ses = old_ses.get_session_by_board_uuid(ctx, board.uuid,
-                                                        valid=True)
-            old_ses.valid = False
-            old_ses.save()
-
-        except Exception:
-            LOG.debug('valid session for %s not found', board.uuid)
-
-        session_data = {'board_id': board.id,
-                        'board_uuid': board.uuid,
-                        'session_id': session_num}
-        session = objects.SessionWP(ctx, **session_data)
-        session.create()
+        # the session row of the board is replaced, as on its connections;
+        # the history is kept by the wamp agents
+        objects.SessionWP.register_list(ctx, [{'board_id': board.id,
+                                               'board_uuid': board.uuid,
+                                               'session_id': str(session_num),
+                                               'board': {}}])
 
         if not board.status == states.REGISTERED:
             msg = "board with code %(board)s " \
@@ -237,7 +361,7 @@ class ConductorEndpoint(object):
             wmessage = wm.WampSuccess(board.config)
             return wmessage.serialize()
 
-        board.agent = get_best_agent(ctx)
+        board.agent = get_best_agent(ctx, board.uuid)
         agent = objects.WampAgent.get_by_hostname(ctx, board.agent)
 
         prov = Provisioner(board)
@@ -256,13 +380,58 @@ class ConductorEndpoint(object):
         wmessage = wm.WampSuccess(board.config)
         return wmessage.serialize()
 
+    def rebalance_boards(self, ctx, fraction=None):
+        if fraction is None:
+            fraction = cfg.CONF.conductor.rebalance_fraction
+        LOG.info('Rebalancing up to %s of the offline boards', fraction)
+
+        agents = objects.WampAgent.list(ctx, filters={'alive': True})
+        if not agents:
+            raise exception.NoValidHost(reason='no active wamp agent')
+        wsurls = dict((a.hostname, a.wsurl) for a in agents)
+        ring = hash_ring.HashRing(list(wsurls), replicas=1)
+
+        # connected boards are not moved: the main agent of a board is
+        # updated while it is offline, and a board connecting again to its
+        # previous agent is sent to the new one
+        boards = objects.Board.list(ctx, filters={'status': states.OFFLINE})
+        max_moves = int(len(boards) * fraction)
+
+        # the load of the agents once the offline boards are back
+        load = objects.WampAgent.get_load(ctx)
+        for board in boards:
+            load[board.agent] = load.get(board.agent, 0) + 1
+
+        moved = 0
+        for board in boards:
+            if moved >= max_moves:
+                break
+            # placed as a new board: its current agent does not count
+            load[board.agent] -= 1
+            agent = place_board(board.uuid, list(wsurls), load, ring=ring)
+            load[agent] = load.get(agent, 0) + 1
+            if agent == board.agent:
+                continue
+            LOG.debug('Moving board %s from agent %s to %s',
+                      board.uuid, board.agent, agent)
+            board.agent = agent
+            prov = Provisioner(board)
+            prov.conf_main_agent(wsurls[agent])
+            board.config = prov.get_config()
+            board.save()
+            moved += 1
+
+        LOG.info('%d board(s) moved', moved)
+        return moved
+
     def destroy_board(self, ctx, board_id):
         LOG.info('Destroying board with id %s',
                  board_id)
         board = objects.Board.get_by_uuid(ctx, board_id)
         result = None
-        
-        if board.is_online():
+        agent_active = is_active_agent(ctx, board.agent)
+
+        if board.is_online() and agent_active:
 
             try:
                 result = self.execute_on_board(ctx,
@@ -275,18 +444,25 @@ class ConductorEndpoint(object):
         exposed_list = objects.ExposedService.get_by_board_uuid(ctx,
                                                                 board_id)
 
-        LOG.debug('starting the wamp client')
-        cctx = self.wamp_agent_client.prepare(server=board.agent)
+        if agent_active:
+            LOG.debug('starting the wamp client')
+            cctx = self.wamp_agent_client.prepare(server=board.agent)
+
+            LOG.debug('Service to remove from allowlist:')
+            LOG.debug(exposed_list)
 
-        LOG.debug('Service to remove from allowlist:')
-        LOG.debug(exposed_list)                                                        
+            for exposed in exposed_list:
+                LOG.debug(exposed.public_port)
+                cctx.call(ctx, 'remove_from_allowlist',
+                          device=board_id,
+                          port=exposed.public_port)
+        elif exposed_list:
+            LOG.warning('Agent %s is not active: allowlist not updated '
+                        'for board %s', board.agent, board_id)
 
         for exposed in exposed_list:
-            LOG.debug(exposed.public_port)  
-            cctx.call(ctx, 'remove_from_allowlist',
-                            device=board_id,
-                            port=exposed.public_port)
-        
+            release_public_port(ctx, board, exposed.public_port)
+
         board.destroy()
 
         if result:
@@ -320,61 +496,75 @@ class ConductorEndpoint(object):
             return serializer.serialize_entity(ctx, new_board)
 
     def execute_on_board(self, ctx, board_uuid, wamp_rpc_call, wamp_rpc_args,
-                         main_req=None):
+                         main_req=None, wait=True, request=None):
+        """Execute a wamp rpc on the board.
+
+        With wait=False the call is casted to the wamp agent and a RUNNING
+        message carrying the request uuid is returned right away; the
+        request and its result stay RUNNING until the board (or the agent
+        on its behalf) notifies the result. The boards older than LR 0.4.9
+        cannot notify it, so they are always waited for.
+
+        The request and its result are created unless an already created
+        request is given.
+        """
         LOG.debug('Executing \"%s\" on the board: %s (main_req %s)',
                   wamp_rpc_call, board_uuid, main_req)
 
+        # the board is still needed to route the call and for its lr_version,
+        # its wamp session is resolved by the agent it is connected to
         board = objects.Board.get_by_uuid(ctx, board_uuid)
-        # session should be taken from board, not from the object
-
-        session = objects.SessionWP.get_session_by_board_uuid(ctx, board_uuid)
-        full_wamp_call = 'iotronic.' + \
-                         session.session_id + "." + \
-                         board.uuid + "." + wamp_rpc_call
 
         if not board.is_online():
             raise exception.BoardNotConnected(board=board.uuid)
 
-        req = new_req(ctx, board, objects.request.BOARD, wamp_rpc_call,
-                      main_req)
+        if request is None:
+            req = new_req(ctx, board, objects.request.BOARD, wamp_rpc_call,
+                          main_req)
+            new_res(ctx, board, req.uuid)
+        else:
+            req = request
         LOG.info(" - exec_request: " + str(req.uuid))
 
-        res = new_res(ctx, board, req.uuid)
-
         cctx = self.wamp_agent_client.prepare(server=board.agent)
 
+        call_args = {'board_uuid': board.uuid,
+                     'action': wamp_rpc_call,
+                     'data': wamp_rpc_args}
+
         # for previous LR version (to be removed asap)
+        legacy = versionCompare(board.lr_version, "0.4.9") == -1
+        if not legacy:
+            call_args['req'] = req
+
+        # the previous LR versions do not get the request, so they cannot
+        # notify its result: they are called and waited for
+        # routed by the agent of the board: the agent is only looked up to
+        # tell why a call could not be delivered
+        try:
+            if not wait and not legacy:
+                cctx.cast(ctx, 's4t_invoke_wamp_async', req_uuid=req.uuid,
+                          **call_args)
+                return wm.WampRunning(req.uuid, req_id=req.uuid)
 
-        if (versionCompare(board.lr_version, "0.4.9") == -1):
-
-            response = cctx.call(ctx, 's4t_invoke_wamp',
-                                 wamp_rpc_call=full_wamp_call,
-                                 data=wamp_rpc_args)
-        else:
-            response = cctx.call(ctx, 's4t_invoke_wamp',
-                                 wamp_rpc_call=full_wamp_call,
-                                 req=req,
-                                 data=wamp_rpc_args)
+            response = cctx.call(ctx, 's4t_invoke_wamp', **call_args)
+        except (oslo_messaging.MessageDeliveryFailure,
+                oslo_messaging.MessagingTimeout):
+            get_active_agent(ctx, board.agent)
+            raise
 
         response = wm.deserialize(response)
 
         if (response.result != wm.RUNNING):
-            res.result = response.result
-            res.message = response.message
-            res.save()
-            req.status = objects.request.COMPLETED
-            req.save()
-
-            if req.main_request_uuid:
-                mreq = objects.Request.get_by_uuid(ctx, req.main_request_uuid)
-                mreq.pending_requests = mreq.pending_requests - 1
-                if mreq.pending_requests == 0:
-                    mreq.status = objects.request.COMPLETED
-                mreq.save()
+            completed = objects.Result.complete(ctx, board.uuid, req.uuid,
+                                                response.result,
+                                                response.message)
+            self.request_events.requests_completed(ctx, completed)
 
         return response
 
-    def action_board(self, ctx, board_uuid, action, params):
+    def action_board(self, ctx, board_uuid, action, params,
+                     long_running=False):
 
         LOG.info('Calling action %s, into the board %s with params %s',
                  action, board_uuid, params)
@@ -387,7 +577,8 @@ class ConductorEndpoint(object):
 
         try:
             result = self.execute_on_board(ctx, board_uuid, action,
-                                           (params,))
+                                           (params,),
+                                           wait=not long_running)
         except exception:
             return exception
 
@@ -395,6 +586,76 @@ class ConductorEndpoint(object):
         LOG.debug(result)
         return result
 
+    def _action_on_fleet_board(self, ctx, board_uuid, action, params,
+                               req):
+        try:
+            self.execute_on_board(ctx, board_uuid, action, (params,),
+                                  wait=False, request=req)
+        except Exception as e:
+            LOG.error('Action %s on board %s of request %s failed: %s',
+                      action, board_uuid, req.main_request_uuid, e)
+            completed = objects.Result.complete(ctx, board_uuid, req.uuid,
+                                                objects.result.ERROR, str(e))
+            self.request_events.requests_completed(ctx, completed)
+
+    def action_fleet(self, ctx, fleet_uuid, action, params):
+
+        LOG.info('Calling action %s, into the fleet %s with params %s',
+                 action, fleet_uuid, params)
+
+        fleet = objects.Fleet.get_by_uuid(ctx, fleet_uuid)
+        objects.board.is_valid_action(action)
+
+        boards = objects.Board.list(ctx, filters={'fleet': fleet.uuid,
+                                                  'status': states.ONLINE})
+        LOG.debug('found %d online board(s) in fleet %s',
+                  len(boards), fleet.uuid)
+
+        deadline = request_deadline()
+        mreq_data = {
+            'uuid': uuidutils.generate_uuid(),
+            'destination_uuid': fleet.uuid,
+            'type': objects.request.FLEET,
+            'status': objects.request.PENDING,
+            'action': action,
+            'project': fleet.project,
+            'pending_requests': len(boards),
+            'deadline': deadline
+        }
+        if not boards:
+            mreq_data['status'] = objects.request.COMPLETED
+
+        # the main request, the requests and the results of all the boards
+        # are created with two statements before dispatching any call
+        reqs_data = [mreq_data]
+        for board in boards:
+            reqs_data.append({
+                'uuid': uuidutils.generate_uuid(),
+                'main_request_uuid': mreq_data['uuid'],
+                'destination_uuid': board.uuid,
+                'type': objects.request.BOARD,
+                'status': objects.request.PENDING,
+                'action': action,
+                'project': board.project,
+                'pending_requests': 0,
+                'deadline': deadline
+            })
+        reqs = objects.Request.create_list(ctx, reqs_data)
+        schedule_expiry(reqs)
+        objects.Result.create_list(ctx, [
+            {'board_uuid': req.destination_uuid,
+             'request_uuid': req.uuid,
+             'result': objects.result.RUNNING,
+             'message': ""}
+            for req in reqs[1:]])
+
+        for req in reqs[1:]:
+            self.fleet_executor.submit(self._action_on_fleet_board, ctx,
+                                       req.destination_uuid, action, params,
+                                       req)
+
+        return mreq_data['uuid']
+
     def destroy_plugin(self, ctx, plugin_id):
         LOG.info('Destroying plugin with id %s',
                  plugin_id)
@@ -518,6 +779,7 @@ class ConductorEndpoint(object):
         board = objects.Board.get_by_uuid(ctx, board_uuid)
         if not board.is_online():
             raise exception.BoardNotConnected(board=board.uuid)
+        get_active_agent(ctx, board.agent)
 
         if action == "ServiceEnable":
             LOG.info('Enabling service with id %s into the board %s',
@@ -529,9 +791,9 @@ class ConductorEndpoint(object):
                 return exception.ServiceAlreadyExposed(uuid=service_uuid)
             except Exception:
 
-                public_port = random_public_port()
-
-                if not public_port:
+                try:
+                    public_port = reserve_public_port(ctx, board)
+                except exception.NotEnoughPortForService:
                     return exception.NotEnoughPortForService()
 
                 # Add into service allow list
@@ -539,15 +801,29 @@ class ConductorEndpoint(object):
                 #    addin_allowlist(board_uuid, public_port)
                 LOG.debug('starting the wamp client')
                 cctx = self.wamp_agent_client.prepare(server=board.agent)
-                cctx.call(ctx, 'addin_allowlist',
-                            device=board_uuid,
-                            port=public_port)
-
-
-
-                res = self.execute_on_board(ctx, board_uuid, action,
-                                            (service, public_port))
-                result = manage_result(res, action, board_uuid)
+                allowed = False
+                try:
+                    cctx.call(ctx, 'addin_allowlist',
+                              device=board_uuid,
+                              port=public_port)
+                    allowed = True
+
+                    res = self.execute_on_board(ctx, board_uuid, action,
+                                                (service, public_port))
+                    result = manage_result(res, action, board_uuid)
+                except Exception:
+                    # the port is not exposed: neither allowed nor reserved
+                    if allowed:
+                        try:
+                            cctx.call(ctx, 'remove_from_allowlist',
+                                      device=board_uuid,
+                                      port=public_port)
+                        except Exception as e:
+                            LOG.warning('Could not remove the port %s of '
+                                        'board %s from the allowlist: %s',
+                                        public_port, board_uuid, e)
+                    release_public_port(ctx, board, public_port)
+                    raise
 
                 exp_data = {
                     'board_uuid': board_uuid,
@@ -572,11 +848,7 @@ class ConductorEndpoint(object):
 
             result = manage_result(res, action, board_uuid)
             LOG.debug(res.message)
-            global SERVICE_PORT_LIST
-            try:
-                SERVICE_PORT_LIST.append(exposed.public_port)
-            except exception:
-                pass
+            release_public_port(ctx, board, exposed.public_port)
             exposed.destroy()
 
 
@@ -657,16 +929,7 @@ class ConductorEndpoint(object):
                                                subnet_uuid, security_groups)
             p = str(port['port']['id'])
 
-            port_socat = random.randint(10000, 20000)
-
-            i = 0
-            while i < len(Port):
-                if Port[i] == port_socat:
-                    i = 0
-                    port_socat = random.randint(10000, 20000)
-                i += 1
-
-            Port.insert(0, port_socat)
+            port_socat = reserve_tunnel_port(ctx, board)
             r_tcp_port = str(port_socat)
 
             try:
@@ -706,12 +969,15 @@ class ConductorEndpoint(object):
 
                     except Exception as e:
                         LOG.error('Error while updating the DB :' + str(e))
+                        release_tunnel_port(ctx, board, port_socat)
 
                 except Exception:
                     LOG.error('wamp client error')
+                    release_tunnel_port(ctx, board, port_socat)
 
             except Exception:
                 LOG.error('Error while creating the VIF')
+                release_tunnel_port(ctx, board, port_socat)
 
         except Exception as e:
             LOG.error(str(e))
@@ -729,8 +995,7 @@ class ConductorEndpoint(object):
 
             self.execute_on_board(ctx, board_uuid, "Remove_VIF", (VIF_name,))
             port_num = int(VIF_name[8:])
-            global Port
-            Port.remove(port_num)
+            release_tunnel_port(ctx, board, port_num)
             try:
                 LOG.info("Removing the port from Neutron "
                          "and Iotronic databases")
@@ -859,6 +1124,7 @@ class ConductorEndpoint(object):
 
             mreq.status = objects.request.COMPLETED
             mreq.save()
+            self.request_events.requests_completed(ctx, [mreq.uuid])
 
             result = manage_result(w_msg, "ExposeWebservice", board.uuid)
 
@@ -966,6 +1232,7 @@ class ConductorEndpoint(object):
 
                 mreq.status = objects.request.COMPLETED
                 mreq.save()
+                self.request_events.requests_completed(ctx, [mreq.uuid])
 
                 result = manage_result(w_msg, "EnableWebservice", board.uuid)
 
@@ -998,9 +1265,14 @@ class ConductorEndpoint(object):
 
                 except Exception:
 
-                    https_port = random_public_port()
-                    http_port = random_public_port()
-                    if not https_port or not http_port:
+                    try:
+                        https_port = reserve_public_port(ctx, board)
+                    except exception.NotEnoughPortForService:
+                        return exception.NotEnoughPortForService()
+                    try:
+                        http_port = reserve_public_port(ctx, board)
+                    except exception.NotEnoughPortForService:
+                        release_public_port(ctx, board, https_port)
                         return exception.NotEnoughPortForService()
 
                     en_webservice = {
@@ -1105,6 +1377,7 @@ class ConductorEndpoint(object):
 
             mreq.status = objects.request.COMPLETED
             mreq.save()
+            self.request_events.requests_completed(ctx, [mreq.uuid])
 
             result = manage_result(w_msg, "EnableWebservice", board.uuid)
 
@@ -1149,6 +1422,7 @@ class ConductorEndpoint(object):
                                     (service,), main_req=mreq.uuid)
             LOG.debug(res.message)
 
+        release_public_port(ctx, board, exposed.public_port)
         exposed.destroy()
 
         service = objects.Service.get_by_name(ctx, 'webservice_ssl')
@@ -1162,12 +1436,7 @@ class ConductorEndpoint(object):
                                     (service,), main_req=mreq.uuid)
             LOG.debug(res.message)
 
-
-        global SERVICE_PORT_LIST
-        try:
-            SERVICE_PORT_LIST.append(exposed.public_port)
-        except exception:
-            pass
+        release_public_port(ctx, board, exposed.public_port)
         exposed.destroy()
 
         if board.is_online():
@@ -1250,6 +1519,7 @@ class ConductorEndpoint(object):
 
             mreq.status = objects.request.COMPLETED
             mreq.save()
+            self.request_events.requests_completed(ctx, [mreq.uuid])
 
             raise exception.EnabledWebserviceNotFound(enabled_webservice=board.uuid)
             
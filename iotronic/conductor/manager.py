@@ -12,17 +12,25 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from iotronic.common import context
 from iotronic.common import exception
+from iotronic.common import hash_ring
 from iotronic.common.i18n import _LI
 from iotronic.common.i18n import _LW
+from iotronic.common import request_events
+from iotronic.conductor import deadlines
 from iotronic.conductor import endpoints as endp
 from iotronic.db import api as dbapi
+from iotronic.db import purge
+import datetime
 import os
 from oslo_config import cfg
 from oslo_log import log as logging
 import oslo_messaging
 from oslo_messaging.rpc import dispatcher
+from oslo_utils import timeutils
 import signal
+import threading
 import time
 
 LOG = logging.getLogger(__name__)
@@ -40,12 +48,103 @@ conductor_opts = [
                help='Maximum time (in seconds) since the last check-in '
                     'of a conductor. A conductor is considered inactive '
                     'when this time has been exceeded.'),
+    cfg.IntOpt('heartbeat_interval',
+               default=10,
+               help='Seconds between conductor heart beats.'),
+    cfg.IntOpt('agent_heartbeat_timeout',
+               default=60,
+               help='Maximum time (in seconds) since the last check-in '
+                    'of a wamp agent. A wamp agent is considered inactive '
+                    'when this time has been exceeded.'),
     cfg.IntOpt('service_port_min',
                default=50000,
                help='Min value for genereting random ports for services'),
     cfg.IntOpt('service_port_max',
                default=60000,
                help='Max value for genereting random ports for services'),
+    cfg.IntOpt('tunnel_port_min',
+               default=10000,
+               help='Min value of the ports of the VIF tunnels on the '
+                    'wamp agents'),
+    cfg.IntOpt('tunnel_port_max',
+               default=20000,
+               help='Max value of the ports of the VIF tunnels on the '
+                    'wamp agents'),
+    cfg.DictOpt('service_port_ranges',
+                default={},
+                help='Ranges of the ports for services of specific wamp '
+                     'agents, e.g. agent1:50000-55000,agent2:55000-60000. '
+                     'The other agents use service_port_min and '
+                     'service_port_max.'),
+    cfg.FloatOpt('placement_load_factor',
+                 default=1.25,
+                 min=1.0,
+                 help='Maximum load of a wamp agent, relative to the '
+                      'average load, when placing boards by consistent '
+                      'hashing.'),
+    cfg.FloatOpt('rebalance_fraction',
+                 default=0.1,
+                 min=0.0,
+                 max=1.0,
+                 help='Default fraction of the offline boards that can be '
+                      'moved to another wamp agent by a rebalance.'),
+    cfg.IntOpt('fleet_action_workers',
+               default=16,
+               help='Number of workers used to dispatch an action to the '
+                    'boards of a fleet in parallel.'),
+    cfg.IntOpt('request_retention_days',
+               default=0,
+               min=0,
+               help='Days after which the completed requests and their '
+                    'results are purged by the conductors. 0 disables the '
+                    'purge.'),
+    cfg.IntOpt('session_history_retention_days',
+               default=0,
+               min=0,
+               help='Days after which the past wamp sessions of the '
+                    'boards are purged from the session history by the '
+                    'conductors. 0 disables the purge.'),
+    cfg.IntOpt('purge_interval',
+               default=3600,
+               help='Seconds between two purges of the expired requests '
+                    'and sessions.'),
+    cfg.IntOpt('purge_batch_size',
+               default=5000,
+               help='Maximum number of requests, main and sub requests, '
+                    'deleted along with their results in each transaction '
+                    'of a purge.'),
+    cfg.StrOpt('purge_archive_dir',
+               help='Directory where the purged requests and results are '
+                    'archived as gzipped NDJSON files. If not set they are '
+                    'not archived.'),
+    cfg.IntOpt('request_timeout',
+               default=3600,
+               min=0,
+               help='Seconds after which a request still running is '
+                    'expired: its running results become TIMEOUT and it is '
+                    'completed. 0 disables the deadline of the new '
+                    'requests.'),
+    cfg.FloatOpt('expire_interval',
+                 default=1.0,
+                 help='Seconds between two expirations of the overdue '
+                      'requests created by the conductor.'),
+    cfg.IntOpt('expire_sweep_interval',
+               default=300,
+               help='Seconds between two searches in the database of the '
+                    'overdue requests, e.g. those of a conductor that has '
+                    'been stopped.'),
+    cfg.IntOpt('expire_batch_size',
+               default=500,
+               help='Number of requests expired in each transaction.'),
+    cfg.IntOpt('port_sweep_interval',
+               default=3600,
+               help='Seconds between two releases of the tunnel ports '
+                    'reserved but no longer used by a VIF.'),
+    cfg.IntOpt('port_reservation_grace',
+               default=3600,
+               help='Seconds a tunnel port reservation is kept without a '
+                    'VIF using it, so the VIFs being created keep their '
+                    'port.'),
 
 ]
 
@@ -69,19 +168,10 @@ class ConductorManager(object):
         self.topic = MANAGER_TOPIC
         self.dbapi = dbapi.get_instance()
 
-        try:
-            cdr = self.dbapi.register_conductor(
-                {'hostname': self.host})
-        except exception.ConductorAlreadyRegistered:
-            LOG.warn(_LW("A conductor with hostname %(hostname)s "
-                         "was previously registered. Updating registration"),
-                     {'hostname': self.host})
-
-            cdr = self.dbapi.register_conductor({'hostname': self.host},
-                                                update_existing=True)
-        self.conductor = cdr
-
         transport = oslo_messaging.get_transport(cfg.CONF)
+        # the server also listens on the per-host topic (topic.host) used
+        # by the API to route the requests of the boards mapped onto this
+        # conductor by the hash ring
         target = oslo_messaging.Target(topic=self.topic, server=self.host,
                                        version=self.RPC_API_VERSION)
 
@@ -106,14 +196,133 @@ class ConductorManager(object):
 
         self.server.start()
 
+        # the completed requests are not expired: out of the wheel
+        self.events_server = request_events.get_server(
+            deadlines.ExpiryCanceller(), transport)
+        self.events_server.start()
+
+        # register only when the server is listening: from now on the
+        # hash rings will map boards onto this conductor
+        try:
+            cdr = self.dbapi.register_conductor(
+                {'hostname': self.host})
+        except exception.ConductorAlreadyRegistered:
+            LOG.warn(_LW("A conductor with hostname %(hostname)s "
+                         "was previously registered. Updating registration"),
+                     {'hostname': self.host})
+
+            cdr = self.dbapi.register_conductor({'hostname': self.host},
+                                                update_existing=True)
+        self.conductor = cdr
+
+        if (CONF.conductor.request_retention_days or
+                CONF.conductor.session_history_retention_days):
+            purge_thread = threading.Thread(target=self._purge_requests)
+            purge_thread.daemon = True
+            purge_thread.start()
+
+        expire_thread = threading.Thread(target=self._expire_requests)
+        expire_thread.daemon = True
+        expire_thread.start()
+
+        ports_thread = threading.Thread(target=self._release_stale_ports)
+        ports_thread.daemon = True
+        ports_thread.start()
+
+        self._conductor_service_record_keepalive()
+
+    def _expire_requests(self):
+        ring = hash_ring.HashRingManager()
+        events = request_events.RequestEventsAPI()
+        ctx = context.get_admin_context()
+        batch_size = CONF.conductor.expire_batch_size
+        sweep_at = 0
+        while True:
+            time.sleep(CONF.conductor.expire_interval)
+            now = timeutils.utcnow()
+            try:
+                # the requests created by this conductor
+                due = deadlines.wheel.advance(now)
+                for i in range(0, len(due), batch_size):
+                    completed = self.dbapi.expire_requests(
+                        now, request_uuids=due[i:i + batch_size])
+                    events.requests_completed(ctx, completed)
+
+                # the requests left behind by the other conductors, by a
+                # single conductor at a time
+                if time.time() < sweep_at:
+                    continue
+                sweep_at = time.time() + CONF.conductor.expire_sweep_interval
+                if ring.get_host_for('expire_requests') != self.host:
+                    continue
+                while True:
+                    completed = self.dbapi.expire_requests(now,
+                                                           limit=batch_size)
+                    events.requests_completed(ctx, completed)
+                    # the main requests completed are counted as well
+                    if len(completed) < batch_size:
+                        break
+            except Exception as e:
+                LOG.warning('Conductor %s could not expire the requests: %s',
+                            self.host, e)
+
+    def _release_stale_ports(self):
+        ring = hash_ring.HashRingManager()
+        ctx = context.get_admin_context()
+        while True:
+            time.sleep(CONF.conductor.port_sweep_interval)
+            try:
+                # a single conductor releases at a time
+                if ring.get_host_for('release_ports') != self.host:
+                    continue
+                before = timeutils.utcnow() - datetime.timedelta(
+                    seconds=CONF.conductor.port_reservation_grace)
+                released = endp.release_stale_tunnel_ports(ctx, before)
+                if released:
+                    LOG.info('Released %d stale tunnel port(s)', released)
+            except Exception as e:
+                LOG.warning('Conductor %s could not release the stale '
+                            'tunnel ports: %s', self.host, e)
+
+    def _purge_requests(self):
+        ring = hash_ring.HashRingManager()
         while True:
-            time.sleep(1)
+            time.sleep(CONF.conductor.purge_interval)
+            try:
+                # a single conductor purges at a time
+                if ring.get_host_for('purge_requests') != self.host:
+                    continue
+                if CONF.conductor.request_retention_days:
+                    purge.purge_requests(
+                        self.dbapi,
+                        CONF.conductor.request_retention_days,
+                        CONF.conductor.purge_batch_size,
+                        archive_dir=CONF.conductor.purge_archive_dir)
+                if CONF.conductor.session_history_retention_days:
+                    before = timeutils.utcnow() - datetime.timedelta(
+                        days=CONF.conductor.session_history_retention_days)
+                    deleted = self.dbapi.purge_session_history(before)
+                    LOG.info('Purged %d sessions from the history', deleted)
+            except Exception as e:
+                LOG.warning('Conductor %s could not purge the requests: %s',
+                            self.host, e)
+
+    def _conductor_service_record_keepalive(self):
+        while True:
+            try:
+                self.dbapi.touch_conductor(self.host)
+            except Exception as e:
+                LOG.warning('Conductor %s could not heartbeat: %s',
+                            self.host, e)
+            time.sleep(CONF.conductor.heartbeat_interval)
 
     def stop_handler(self, signum, frame):
         LOG.info("Stopping server")
+        # leave the hash rings before stopping to serve requests
+        self.del_host()
         self.server.stop()
         self.server.wait()
-        self.del_host()
+        self.events_server.stop()
         os._exit(0)
 
     def del_host(self, deregister=True):
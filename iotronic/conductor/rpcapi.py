@@ -14,6 +14,7 @@
 """
 Client side of the conductor RPC API.
 """
+from iotronic.common import hash_ring
 from iotronic.common import rpc
 from iotronic.conductor import manager
 from iotronic.objects import base
@@ -41,6 +42,17 @@ class ConductorAPI(object):
         self.client = rpc.get_client(target,
                                      version_cap=self.RPC_API_VERSION,
                                      serializer=serializer)
+        self.ring_manager = hash_ring.HashRingManager()
+
+    def get_topic_for(self, board_uuid):
+        """Get the RPC topic of the conductor the board is mapped to.
+
+        :param board_uuid: board uuid.
+        :raises: NoValidHost if there are no active conductors.
+        :returns: an RPC topic string.
+        """
+        host = self.ring_manager.get_host_for(board_uuid)
+        return '%s.%s' % (self.topic, host)
 
     def echo(self, context, data, topic=None):
         """Test
@@ -104,7 +116,9 @@ class ConductorAPI(object):
         :returns: updated board object, including all fields.
 
         """
-        cctxt = self.client.prepare(topic=topic or self.topic, version='1.0')
+        cctxt = self.client.prepare(
+            topic=topic or self.get_topic_for(board_obj.uuid),
+            version='1.0')
         return cctxt.call(context, 'update_board', board_obj=board_obj)
 
     def destroy_board(self, context, board_id, topic=None):
@@ -118,29 +132,51 @@ class ConductorAPI(object):
         :raises: InvalidState if the board is in the wrong provision
             state to perform deletion.
         """
-        cctxt = self.client.prepare(topic=topic or self.topic, version='1.0')
+        cctxt = self.client.prepare(
+            topic=topic or self.get_topic_for(board_id),
+            version='1.0')
         return cctxt.call(context, 'destroy_board', board_id=board_id)
 
+    def rebalance_boards(self, context, fraction=None, topic=None):
+        """Move offline boards to the wamp agents chosen by the placement.
+
+        :param context: request context.
+        :param fraction: maximum fraction of the offline boards to move.
+                         Defaults to CONF.conductor.rebalance_fraction.
+        :param topic: RPC topic. Defaults to self.topic.
+        :returns: number of boards moved.
+        """
+        cctxt = self.client.prepare(topic=topic or self.topic, version='1.0')
+        return cctxt.call(context, 'rebalance_boards', fraction=fraction)
+
     def execute_on_board(self, context, board_uuid, wamp_rpc_call,
                          wamp_rpc_args=None, topic=None):
-        cctxt = self.client.prepare(topic=topic or self.topic, version='1.0')
+        cctxt = self.client.prepare(
+            topic=topic or self.get_topic_for(board_uuid),
+            version='1.0')
         return cctxt.call(context, 'execute_on_board', board_uuid=board_uuid,
                           wamp_rpc_call=wamp_rpc_call,
                           wamp_rpc_args=wamp_rpc_args)
 
-    def action_board(self, context, board_uuid, action, params, topic=None):
+    def action_board(self, context, board_uuid, action, params,
+                     long_running=False, topic=None):
         """Action on a board
 
         :param context: request context.
         :param board_uuid: board id or uuid.
-'       :param action: action.
-ì       :param paramas: parameters of the action
-ì       :param long_running: boolean if a response need to be waited.
+        :param action: action.
+        :param params: parameters of the action
+        :param long_running: if True the response of the board is not
+                             waited and the uuid of the request is returned.
+        :param topic: RPC topic. Defaults to self.topic.
 
         """
-        cctxt = self.client.prepare(topic=topic or self.topic, version='1.0')
+        cctxt = self.client.prepare(
+            topic=topic or self.get_topic_for(board_uuid),
+            version='1.0')
         return cctxt.call(context, 'action_board', board_uuid=board_uuid,
-                          action=action, params=params)
+                          action=action, params=params,
+                          long_running=long_running)
 
     def create_plugin(self, context, plugin_obj, topic=None):
         """Add a plugin on the cloud
@@ -193,7 +229,9 @@ class ConductorAPI(object):
         :param board_uuid: board id or uuid.
 
         """
-        cctxt = self.client.prepare(topic=topic or self.topic, version='1.0')
+        cctxt = self.client.prepare(
+            topic=topic or self.get_topic_for(board_uuid),
+            version='1.0')
         return cctxt.call(context, 'inject_plugin', plugin_uuid=plugin_uuid,
                           board_uuid=board_uuid, onboot=onboot)
 
@@ -205,7 +243,9 @@ class ConductorAPI(object):
         :param board_uuid: board id or uuid.
 
         """
-        cctxt = self.client.prepare(topic=topic or self.topic, version='1.0')
+        cctxt = self.client.prepare(
+            topic=topic or self.get_topic_for(board_uuid),
+            version='1.0')
         return cctxt.call(context, 'remove_plugin', plugin_uuid=plugin_uuid,
                           board_uuid=board_uuid)
 
@@ -218,7 +258,9 @@ class ConductorAPI(object):
         :param board_uuid: board id or uuid.
 
         """
-        cctxt = self.client.prepare(topic=topic or self.topic, version='1.0')
+        cctxt = self.client.prepare(
+            topic=topic or self.get_topic_for(board_uuid),
+            version='1.0')
         return cctxt.call(context, 'action_plugin', plugin_uuid=plugin_uuid,
                           board_uuid=board_uuid, action=action, params=params)
 
@@ -273,7 +315,9 @@ class ConductorAPI(object):
         :param board_uuid: board id or uuid.
 
         """
-        cctxt = self.client.prepare(topic=topic or self.topic, version='1.0')
+        cctxt = self.client.prepare(
+            topic=topic or self.get_topic_for(board_uuid),
+            version='1.0')
 
         return cctxt.call(context, 'action_service', service_uuid=service_uuid,
                           board_uuid=board_uuid, action=action)
@@ -286,7 +330,9 @@ class ConductorAPI(object):
         :param board_uuid: board id or uuid.
 
         """
-        cctxt = self.client.prepare(topic=topic or self.topic, version='1.0')
+        cctxt = self.client.prepare(
+            topic=topic or self.get_topic_for(board_uuid),
+            version='1.0')
 
         return cctxt.call(context, 'restore_services_on_board',
                           board_uuid=board_uuid)
@@ -300,7 +346,9 @@ class ConductorAPI(object):
         :param board_uuid: board id or uuid.
 
         """
-        cctxt = self.client.prepare(topic=topic or self.topic, version='1.0')
+        cctxt = self.client.prepare(
+            topic=topic or self.get_topic_for(board_uuid),
+            version='1.0')
         return cctxt.call(context, 'status_services_on_board',
                           board_uuid=board_uuid)
 
@@ -318,7 +366,9 @@ class ConductorAPI(object):
         :returns: created port object
 
         """
-        cctxt = self.client.prepare(topic=topic or self.topic, version='1.0')
+        cctxt = self.client.prepare(
+            topic=topic or self.get_topic_for(board_uuid),
+            version='1.0')
         return cctxt.call(context, 'create_port_on_board',
                           board_uuid=board_uuid, network_uuid=network,
                           subnet_uuid=subnet, security_groups=sec_groups)
@@ -333,7 +383,9 @@ class ConductorAPI(object):
                 :returns: delete port object
 
                 """
-        cctxt = self.client.prepare(topic=topic or self.topic, version='1.0')
+        cctxt = self.client.prepare(
+            topic=topic or self.get_topic_for(board_uuid),
+            version='1.0')
         return cctxt.call(context, 'remove_VIF_from_board',
                           board_uuid=board_uuid,
                           port_uuid=port_uuid)
@@ -380,6 +432,21 @@ class ConductorAPI(object):
         cctxt = self.client.prepare(topic=topic or self.topic, version='1.0')
         return cctxt.call(context, 'update_fleet', fleet_obj=fleet_obj)
 
+    def action_fleet(self, context, fleet_uuid, action, params, topic=None):
+        """Action on all the online boards of a fleet
+
+        :param context: request context.
+        :param fleet_uuid: fleet id or uuid.
+        :param action: action.
+        :param params: parameters of the action
+        :param topic: RPC topic. Defaults to self.topic.
+        :returns: uuid of the main request tracking the action.
+
+        """
+        cctxt = self.client.prepare(topic=topic or self.topic, version='1.0')
+        return cctxt.call(context, 'action_fleet', fleet_uuid=fleet_uuid,
+                          action=action, params=params)
+
     def create_webservice(self, context, webservice_obj, topic=None):
         """Add a webservice on the cloud
 
@@ -389,7 +456,9 @@ class ConductorAPI(object):
         :returns: created webservice object
 
         """
-        cctxt = self.client.prepare(topic=topic or self.topic, version='1.0')
+        cctxt = self.client.prepare(
+            topic=topic or self.get_topic_for(webservice_obj.board_uuid),
+            version='1.0')
         return cctxt.call(context, 'create_webservice',
                           webservice_obj=webservice_obj)
 
@@ -412,7 +481,9 @@ class ConductorAPI(object):
         """Eneble a webservice on the board
 
         """
-        cctxt = self.client.prepare(topic=topic or self.topic, version='1.0')
+        cctxt = self.client.prepare(
+            topic=topic or self.get_topic_for(board),
+            version='1.0')
         return cctxt.call(context, 'enable_webservice',
                           dns=dns, zone=zone, email=email, board_uuid=board)
 
@@ -420,7 +491,9 @@ class ConductorAPI(object):
         """Disable webservice manager.
 
         """
-        cctxt = self.client.prepare(topic=topic or self.topic, version='1.0')
+        cctxt = self.client.prepare(
+            topic=topic or self.get_topic_for(board_uuid),
+            version='1.0')
         return cctxt.call(context, 'disable_webservice',
                           board_uuid=board_uuid)
 
@@ -428,6 +501,8 @@ class ConductorAPI(object):
         """Renew webservice certificate.
 
         """
-        cctxt = self.client.prepare(topic=topic or self.topic, version='1.0')
+        cctxt = self.client.prepare(
+            topic=topic or self.get_topic_for(board_uuid),
+            version='1.0')
         return cctxt.call(context, 'renew_webservice',
                           board_uuid=board_uuid)
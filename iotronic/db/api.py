@@ -72,7 +72,7 @@ class Connection(object):
 
     @abc.abstractmethod
     def get_board_list(self, filters=None, limit=None, marker=None,
-                       sort_key=None, sort_dir=None):
+                       sort_key=None, sort_dir=None, columns=None):
         """Return a list of boards.
 
         :param filters: Filters to apply. Defaults to None.
@@ -85,11 +85,28 @@ class Connection(object):
                             boards with provision_updated_at field before this
                             interval in seconds
         :param limit: Maximum number of boards to return.
-        :param marker: the last item of the previous page; we return the next
+        :param marker: the last item of the previous page, or a dict with its
+                       sort key value and its id; we return the next
                        result set.
         :param sort_key: Attribute by which results should be sorted.
         :param sort_dir: direction in which results should be sorted.
                          (asc, desc)
+        :param columns: the columns to load, all of them by default; the
+                        others are left unloaded.
+        """
+
+    @abc.abstractmethod
+    def iter_board_list(self, filters=None, sort_key=None, sort_dir=None,
+                        columns=None):
+        """Iterate over the boards, fetched in batches from the database.
+
+        :param filters: Filters to apply, as for get_board_list.
+        :param sort_key: Attribute by which results should be sorted.
+        :param sort_dir: direction in which results should be sorted.
+                         (asc, desc)
+        :param columns: the columns to load, all of them by default; the
+                        others are left unloaded.
+        :returns: An iterator of boards.
         """
 
     @abc.abstractmethod
@@ -160,6 +177,15 @@ class Connection(object):
         :param board_id: The id or uuid of a board.
         """
 
+    @abc.abstractmethod
+    def update_boards_status(self, board_uuids, status):
+        """Set the status of a set of boards.
+
+        :param board_uuids: The uuids of the boards.
+        :param status: The new status.
+        :returns: The number of boards updated.
+        """
+
     @abc.abstractmethod
     def update_board(self, board_id, values):
         """Update properties of a board.
@@ -196,6 +222,18 @@ class Connection(object):
         :raises: ConductorNotFound
         """
 
+    @abc.abstractmethod
+    def get_active_conductor_list(self, interval=None):
+        """Retrieve the hostnames of the active conductors.
+
+        A conductor is active when it is online and it has checked in
+        within the last interval seconds.
+
+        :param interval: Seconds since the last check-in of a conductor.
+                         Defaults to CONF.conductor.heartbeat_timeout.
+        :returns: A list of conductor hostnames.
+        """
+
     @abc.abstractmethod
     def create_session(self, values):
         """Create a new location.
@@ -221,6 +259,15 @@ class Connection(object):
         :returns: A session.
         """
 
+    @abc.abstractmethod
+    def get_sessions_by_board_uuids(self, board_uuids, valid=True):
+        """Return the Wamp sessions of a set of Boards.
+
+        :param board_uuids: the uuids of the boards.
+        :param valid: is valid
+        :returns: A list of sessions.
+        """
+
     @abc.abstractmethod
     def get_session_by_id(self, session_id):
         """Return a Wamp session
@@ -267,10 +314,66 @@ class Connection(object):
         :returns: A list of locations.
         """
 
+    @abc.abstractmethod
+    def get_locations_by_board_ids(self, board_ids):
+        """List all the locations of a set of boards.
+
+        :param board_ids: The integer board IDs.
+        :returns: A list of locations, sorted by id.
+        """
+
     @abc.abstractmethod
     def get_valid_wpsessions_list(self, agent):
         """Return a list of wpsession."""
 
+    @abc.abstractmethod
+    def register_sessions(self, sessions, history=False):
+        """Record the new wamp sessions of a set of boards.
+
+        Each board has a single session row, replaced by its new session;
+        the boards are updated in the same transaction.
+
+        :param sessions: A list of dicts with the board_id, board_uuid and
+                         session_id of a session, and the 'board' values
+                         to update on its board, possibly empty.
+        :param history: Whether to also record the sessions in the session
+                        history.
+        """
+
+    @abc.abstractmethod
+    def purge_session_history(self, before):
+        """Delete the session history older than a date.
+
+        :param before: A datetime.
+        :returns: The number of deleted sessions.
+        """
+
+    @abc.abstractmethod
+    def compact_wamp_sessions(self, context, max_count, pause=0):
+        """Move the superseded sessions of the boards to the history.
+
+        Releases before this one added a session row on every connection
+        of a board, only the last one is kept now. Running it before the
+        upgrade keeps short the migration making the board unique.
+
+        :param context: an admin context
+        :param max_count: The maximum number of sessions to migrate. If
+                          zero, all the sessions will be migrated.
+        :param pause: Seconds to wait between two batches.
+        :returns: A 2-tuple -- the total number of sessions that need to be
+                  migrated (at the beginning of this call) and the number
+                  of migrated sessions.
+        """
+
+    @abc.abstractmethod
+    def invalidate_sessions(self, session_ids):
+        """Mark a set of wamp sessions as not valid.
+
+        :param session_ids: The ids of the sessions.
+        :returns: The uuids of the boards whose valid session has been
+                  invalidated.
+        """
+
     @abc.abstractmethod
     def get_wampagent(self, hostname):
         """Retrieve a wampagent's service record from the database.
@@ -318,6 +421,13 @@ class Connection(object):
                          (asc, desc)
         """
 
+    @abc.abstractmethod
+    def get_wampagent_load(self):
+        """Return the number of valid sessions carried by each wampagent.
+
+        :returns: A dict mapping wampagent hostnames to session counts.
+        """
+
     @abc.abstractmethod
     def get_plugin_by_id(self, plugin_id):
         """Return a plugin.
@@ -552,6 +662,13 @@ class Connection(object):
         :returns: A port
         """
 
+    @abc.abstractmethod
+    def get_vif_list(self):
+        """Return the VIFs of the ports with the wampagent of their board.
+
+        :returns: A list of (wampagent hostname, VIF name) tuples.
+        """
+
     @abc.abstractmethod
     def get_ports_by_board_uuid(self, board_uuid):
         """Return a list of port on a board
@@ -719,6 +836,45 @@ class Connection(object):
         :returns: A request.
         """
 
+    @abc.abstractmethod
+    def purge_requests(self, before, limit, callback=None):
+        """Delete a batch of completed requests along with their results.
+
+        :param before: Only the requests completed before this datetime
+                       are deleted.
+        :param limit: Maximum number of requests, main and sub requests,
+                      to delete. A main request with more sub requests is
+                      deleted over several batches, its sub requests
+                      first.
+        :param callback: A function called with the lists of the requests
+                         and of the results, as dicts, before they are
+                         deleted in the same transaction. It may be called
+                         several times for a batch. The message of a
+                         result stored in the result_payloads table is
+                         given in full.
+        :returns: A 2-tuple -- the number of deleted requests and the
+                  number of deleted results.
+        """
+
+    @abc.abstractmethod
+    def create_requests(self, values_list):
+        """Create a set of requests with a single statement.
+
+        A main request can be created along with its sub requests, as long
+        as it comes first.
+
+        :param values_list: A list of dicts of request values. A uuid is
+                            generated for those not having one.
+        :returns: The requests, in the same order.
+        """
+
+    @abc.abstractmethod
+    def create_results(self, values_list):
+        """Create a set of results with a single statement.
+
+        :param values_list: A list of dicts of result values.
+        """
+
     @abc.abstractmethod
     def create_result(self, values):
         """Create a new webservice.
@@ -737,6 +893,15 @@ class Connection(object):
         :returns: A result.
         """
 
+    @abc.abstractmethod
+    def get_result_payload(self, digest):
+        """Return the payload storing a large result message.
+
+        :param digest: the sha256 hex digest of the message.
+        :returns: A result payload, with the zlib compressed message.
+        :raises: ResultNotFound
+        """
+
     @abc.abstractmethod
     def get_result_list(self, filters=None, limit=None, marker=None,
                         sort_key=None, sort_dir=None):
@@ -759,6 +924,17 @@ class Connection(object):
                          (asc, desc)
         """
 
+    @abc.abstractmethod
+    def iter_result_list(self, filters=None, sort_key=None, sort_dir=None):
+        """Iterate over the results, fetched in batches from the database.
+
+        :param filters: Filters to apply, as for get_result_list.
+        :param sort_key: Attribute by which results should be sorted.
+        :param sort_dir: direction in which results should be sorted.
+                         (asc, desc)
+        :returns: An iterator of results.
+        """
+
     @abc.abstractmethod
     def update_result(self, result_id, values):
         """Update properties of a result.
@@ -768,6 +944,37 @@ class Connection(object):
         :returns: A result.
         """
 
+    @abc.abstractmethod
+    def complete_result(self, board_uuid, request_uuid, result, message):
+        """Record the result of a board and complete its request.
+
+        In a single transaction the RUNNING result is updated, its request
+        is completed when none of its results is running anymore and the
+        pending requests of its main request are decremented, completing
+        it at zero.
+
+        :param board_uuid: the board uuid result.
+        :param request_uuid: the request_uuid.
+        :param result: the outcome of the request on the board.
+        :param message: the message of the board.
+        :returns: None if the result was not RUNNING, otherwise the uuids
+                  of the requests completed, main request included.
+        """
+
+    @abc.abstractmethod
+    def expire_requests(self, now, request_uuids=None, limit=None):
+        """Complete the requests whose deadline is over.
+
+        Their RUNNING results become TIMEOUT and their main requests are
+        completed when no sub request is pending anymore.
+
+        :param now: the requests with a deadline before now are expired.
+        :param request_uuids: only consider these requests.
+        :param limit: maximum number of requests to consider.
+        :returns: the uuids of the requests completed, main requests
+                  included.
+        """
+
     @abc.abstractmethod
     def update_request(self, request_id, values):
         """Update properties of a result.
@@ -777,6 +984,79 @@ class Connection(object):
         :returns: A request.
         """
 
+    @abc.abstractmethod
+    def iter_request_list(self, filters=None, sort_key=None, sort_dir=None,
+                          columns=None):
+        """Iterate over the requests, fetched in batches from the database.
+
+        :param filters: Filters to apply, as for get_request_list.
+        :param sort_key: Attribute by which results should be sorted.
+        :param sort_dir: direction in which results should be sorted.
+                         (asc, desc)
+        :param columns: the columns to load, all of them by default; the
+                        others are left unloaded.
+        :returns: An iterator of requests.
+        """
+
+    @abc.abstractmethod
+    def create_port_pool(self, agent, pool, ports, used_ports=None):
+        """Create a pool of ports managed on a wampagent.
+
+        Nothing is done if the pool has already been created.
+
+        :param agent: the hostname of the wampagent.
+        :param pool: the name of the pool.
+        :param ports: the ports of the pool.
+        :param used_ports: ports of the pool already in use, they are
+                           created as reserved.
+        """
+
+    @abc.abstractmethod
+    def reserve_used_ports(self, agent, pool, used_ports):
+        """Reserve the ports of a pool found in use.
+
+        The other reservations are kept: they may be held by a port being
+        created.
+
+        :param agent: the hostname of the wampagent.
+        :param pool: the name of the pool.
+        :param used_ports: the ports of the pool in use.
+        """
+
+    @abc.abstractmethod
+    def release_stale_ports(self, agent, pool, used_ports, before):
+        """Release the reserved ports of a pool no longer in use.
+
+        :param agent: the hostname of the wampagent.
+        :param pool: the name of the pool.
+        :param used_ports: the ports of the pool in use.
+        :param before: only the ports reserved before this datetime are
+                       released, the others may be held by a port being
+                       created.
+        :returns: the number of ports released.
+        """
+
+    @abc.abstractmethod
+    def reserve_port(self, agent, pool, board_uuid):
+        """Reserve a free port of a pool for a board.
+
+        :param agent: the hostname of the wampagent.
+        :param pool: the name of the pool.
+        :param board_uuid: the uuid of the board using the port.
+        :returns: the reserved port.
+        :raises: PortPoolNotFound if the pool has not been created.
+        :raises: NotEnoughPortForService if all the ports are reserved.
+        """
+
+    @abc.abstractmethod
+    def release_port(self, agent, pool, port):
+        """Release a port of a pool.
+
+        :param agent: the hostname of the wampagent.
+        :param pool: the name of the pool.
+        :param port: the port to release.
+        """
+
     # @abc.abstractmethod
     # def get_results(self, request_uuid):
     #     """get results of a request.
@@ -0,0 +1,90 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Retention of the requests and of their results."""
+
+import datetime
+import gzip
+import json
+import os
+import time
+
+from oslo_log import log as logging
+from oslo_utils import timeutils
+
+LOG = logging.getLogger(__name__)
+
+
+def _to_json(table, row):
+    row = dict((key, value.isoformat()
+                if isinstance(value, datetime.datetime) else value)
+               for key, value in row.items())
+    row['table'] = table
+    return json.dumps(row, sort_keys=True) + '\n'
+
+
+def purge_requests(dbapi, age_in_days, batch_size, archive_dir=None,
+                   max_batches=None, pause=0):
+    """Delete the completed requests older than age_in_days.
+
+    The requests are deleted in batches of at most batch_size requests,
+    counting the sub requests, along with their results. With archive_dir
+    they are first written to a gzipped NDJSON file in that directory, one
+    row per line with the name of its table. The large messages of the results,
+    stored apart, are written in full in their result.
+
+    :returns: a dict with the number of purged 'requests' and 'results'
+              and the size in 'bytes' of their JSON rows.
+    """
+    before = timeutils.utcnow() - datetime.timedelta(days=age_in_days)
+    report = {'requests': 0, 'results': 0, 'bytes': 0}
+
+    archive = None
+    if archive_dir:
+        path = os.path.join(archive_dir, 'iotronic-requests-%s.ndjson.gz' %
+                            timeutils.utcnow().strftime('%Y%m%dT%H%M%S'))
+        archive = gzip.open(path, 'wt')
+        LOG.info('Archiving the purged requests to %s', path)
+
+    batches = 0
+    try:
+        while max_batches is None or batches < max_batches:
+            size = []
+
+            def write(requests, results):
+                lines = [_to_json('requests', r) for r in requests]
+                lines.extend(_to_json('results', r) for r in results)
+                if archive:
+                    archive.writelines(lines)
+                    archive.flush()
+                size.append(sum(len(line) for line in lines))
+
+            requests, results = dbapi.purge_requests(before, batch_size,
+                                                     callback=write)
+            if not requests:
+                break
+
+            report['requests'] += requests
+            report['results'] += results
+            report['bytes'] += sum(size)
+            batches += 1
+
+            # leave room to the other transactions on these tables
+            if pause:
+                time.sleep(pause)
+    finally:
+        if archive:
+            archive.close()
+
+    LOG.info('Purged %(requests)d requests and %(results)d results '
+             '(%(bytes)d bytes)', report)
+    return report
@@ -0,0 +1,47 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""add port reservations
+
+Revision ID: 3c1f8a2d6b71
+Revises: 10460765f337
+Create Date: 2026-10-17 10:12:41.218305
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '3c1f8a2d6b71'
+down_revision = '10460765f337'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table('port_reservations',
+                    sa.Column('created_at', sa.DateTime(), nullable=True),
+                    sa.Column('updated_at', sa.DateTime(), nullable=True),
+                    sa.Column('id', sa.Integer(), nullable=False),
+                    sa.Column('agent', sa.String(length=255),
+                              nullable=False),
+                    sa.Column('pool', sa.String(length=20), nullable=False),
+                    sa.Column('port', sa.Integer(), nullable=False),
+                    sa.Column('reserved', sa.Boolean(), nullable=False,
+                              default=False),
+                    sa.Column('board_uuid', sa.String(length=36),
+                              nullable=True),
+                    sa.PrimaryKeyConstraint('id'),
+                    sa.UniqueConstraint('agent', 'pool', 'port',
+                                        name='uniq_port_reservations0port')
+                    )
+    op.create_index('port_reservations_free_idx', 'port_reservations',
+                    ['agent', 'pool', 'reserved'], unique=False)
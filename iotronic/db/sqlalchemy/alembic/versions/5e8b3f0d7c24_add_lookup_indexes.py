@@ -0,0 +1,47 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""add lookup indexes
+
+Revision ID: 5e8b3f0d7c24
+Revises: 7d2e4b9c1a05
+Create Date: 2026-10-17 15:21:09.442710
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '5e8b3f0d7c24'
+down_revision = '7d2e4b9c1a05'
+
+from alembic import op
+
+# webservices.board_uuid and the lookups of the results of a board are
+# already served by the uniq_webservices_on_board and uniq_request_on_board
+# constraints, sessions.session_id by uniq_board_session_id0session_id
+INDEXES = [
+    ('boards_project_status_idx', 'boards', ['project', 'status']),
+    ('boards_fleet_status_idx', 'boards', ['fleet', 'status']),
+    ('boards_agent_status_idx', 'boards', ['agent', 'status']),
+    ('boards_status_idx', 'boards', ['status']),
+    ('sessions_board_uuid_valid_idx', 'sessions', ['board_uuid', 'valid']),
+    ('sessions_board_id_valid_idx', 'sessions', ['board_id', 'valid']),
+    ('exposed_services_board_uuid_idx', 'exposed_services', ['board_uuid']),
+    ('requests_main_request_uuid_idx', 'requests', ['main_request_uuid']),
+    ('requests_destination_uuid_idx', 'requests', ['destination_uuid']),
+    ('results_request_uuid_result_idx', 'results',
+     ['request_uuid', 'result']),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
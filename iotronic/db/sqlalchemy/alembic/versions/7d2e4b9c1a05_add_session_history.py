@@ -0,0 +1,43 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""add session history
+
+Revision ID: 7d2e4b9c1a05
+Revises: 3c1f8a2d6b71
+Create Date: 2026-10-17 14:03:27.581940
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '7d2e4b9c1a05'
+down_revision = '3c1f8a2d6b71'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table('session_history',
+                    sa.Column('created_at', sa.DateTime(), nullable=True),
+                    sa.Column('updated_at', sa.DateTime(), nullable=True),
+                    sa.Column('id', sa.Integer(), nullable=False),
+                    sa.Column('session_id', sa.String(length=20),
+                              nullable=True),
+                    sa.Column('board_uuid', sa.String(length=36),
+                              nullable=True),
+                    sa.PrimaryKeyConstraint('id')
+                    )
+    op.create_index('session_history_board_uuid_idx', 'session_history',
+                    ['board_uuid'], unique=False)
+    op.create_index('session_history_created_at_idx', 'session_history',
+                    ['created_at'], unique=False)
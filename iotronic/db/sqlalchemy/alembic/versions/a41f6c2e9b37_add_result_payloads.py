@@ -0,0 +1,49 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""add result payloads
+
+Revision ID: a41f6c2e9b37
+Revises: 5e8b3f0d7c24
+Create Date: 2026-10-17 17:38:52.106384
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'a41f6c2e9b37'
+down_revision = '5e8b3f0d7c24'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.add_column('results', sa.Column('message_size', sa.Integer(),
+                                       nullable=True))
+    op.add_column('results', sa.Column('message_digest', sa.String(length=64),
+                                       nullable=True))
+    # the purge looks for the results still using a payload
+    op.create_index('results_message_digest_idx', 'results',
+                    ['message_digest'], unique=False)
+    op.create_table('result_payloads',
+                    sa.Column('created_at', sa.DateTime(), nullable=True),
+                    sa.Column('updated_at', sa.DateTime(), nullable=True),
+                    sa.Column('id', sa.Integer(), nullable=False),
+                    sa.Column('digest', sa.String(length=64),
+                              nullable=False),
+                    sa.Column('size', sa.Integer(), nullable=False),
+                    sa.Column('data', sa.LargeBinary(length=2 ** 32 - 1),
+                              nullable=False),
+                    sa.PrimaryKeyConstraint('id'),
+                    sa.UniqueConstraint('digest',
+                                        name='uniq_result_payloads0digest')
+                    )
@@ -0,0 +1,33 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""add request deadline
+
+Revision ID: b8c3e1f7a264
+Revises: a41f6c2e9b37
+Create Date: 2026-10-17 18:12:40.517203
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'b8c3e1f7a264'
+down_revision = 'a41f6c2e9b37'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.add_column('requests', sa.Column('deadline', sa.DateTime(),
+                                        nullable=True))
+    op.create_index('requests_status_deadline_idx', 'requests',
+                    ['status', 'deadline'])
@@ -0,0 +1,44 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""unique board session
+
+Revision ID: e4a9d2c7f813
+Revises: b8c3e1f7a264
+Create Date: 2026-10-17 21:26:05.390417
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'e4a9d2c7f813'
+down_revision = 'b8c3e1f7a264'
+
+from alembic import op
+
+# the session rows superseded by a newer one of the same board; nested
+# twice so that MySQL accepts it in a DELETE on the same table
+SUPERSEDED = ('SELECT id FROM ('
+              'SELECT s.id FROM sessions s JOIN '
+              '(SELECT board_id, MAX(id) AS id FROM sessions '
+              'GROUP BY board_id) c ON s.board_id = c.board_id '
+              'WHERE s.id < c.id) superseded')
+
+
+def upgrade():
+    # what compact_wamp_sessions has not moved to session_history yet
+    op.execute('INSERT INTO session_history '
+               '(created_at, board_uuid, session_id) '
+               'SELECT created_at, board_uuid, session_id FROM sessions '
+               'WHERE id IN (%s)' % SUPERSEDED)
+    op.execute('DELETE FROM sessions WHERE id IN (%s)' % SUPERSEDED)
+    op.create_unique_constraint('uniq_sessions0board_id', 'sessions',
+                                ['board_id'])
@@ -16,14 +16,25 @@
 
 """SQLAlchemy storage backend."""
 
+import collections
+import datetime
+import hashlib
+import time
+import zlib
+
 from oslo_config import cfg
+from oslo_db import api as oslo_db_api
 from oslo_db import exception as db_exc
 from oslo_db.sqlalchemy import session as db_session
 from oslo_db.sqlalchemy import utils as db_utils
 from oslo_utils import strutils
 from oslo_utils import timeutils
 from oslo_utils import uuidutils
+from sqlalchemy import and_
+from sqlalchemy import exists
+from sqlalchemy import func
 from sqlalchemy import or_
+from sqlalchemy.orm import load_only
 from sqlalchemy.orm.exc import NoResultFound
 
 from iotronic.common import exception
@@ -36,9 +47,23 @@ CONF = cfg.CONF
 CONF.import_opt('heartbeat_timeout',
                 'iotronic.conductor.manager',
                 group='conductor')
+CONF.import_opt('agent_heartbeat_timeout',
+                'iotronic.conductor.manager',
+                group='conductor')
 
 _FACADE = None
 
+# see iotronic.objects.request and iotronic.objects.result
+REQUEST_COMPLETED = 'COMPLETED'
+RESULT_RUNNING = 'RUNNING'
+RESULT_TIMEOUT = 'TIMEOUT'
+
+# rows touched by a single bulk statement, to stay within the DB limits
+# on the number of IN (...) parameters
+BULK_CHUNK_SIZE = 500
+# rows fetched at a time from a server side cursor
+STREAM_BATCH_SIZE = 100
+
 
 def _create_facade_lazily():
     global _FACADE
@@ -91,10 +116,91 @@ def add_identity_filter(query, value):
         raise exception.InvalidIdentity(identity=value)
 
 
-def _paginate_query(model, limit=None, marker=None, sort_key=None,
-                    sort_dir=None, query=None):
+def _chunks(values, size=BULK_CHUNK_SIZE):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def _as_dict(row):
+    return dict((column.name, getattr(row, column.name))
+                for column in row.__table__.columns)
+
+
+def _result_message_values(message, session):
+    """Return the values storing the message of a result.
+
+    A message larger than result_inline_max_size is stored compressed in
+    the result_payloads table, addressed by its digest, and only its size
+    and digest are kept in the result.
+    """
+    data = message.encode('utf-8') if message else b''
+    if len(data) <= CONF.database.result_inline_max_size:
+        return {'message': message,
+                'message_size': None,
+                'message_digest': None}
+
+    digest = hashlib.sha256(data).hexdigest()
+    query = model_query(models.ResultPayload.id, session=session)
+    if not query.filter_by(digest=digest).first():
+        payload = models.ResultPayload()
+        payload.update({'digest': digest,
+                        'size': len(data),
+                        'data': zlib.compress(data)})
+        try:
+            with session.begin_nested():
+                session.add(payload)
+        except db_exc.DBDuplicateEntry:
+            # stored meanwhile by another transaction
+            pass
+
+    return {'message': None,
+            'message_size': len(data),
+            'message_digest': digest}
+
+
+def _load_columns(query, columns):
+    """Load only some columns of the rows, leaving the others unloaded.
+
+    The rows are meant to be read, only the loaded columns can be
+    accessed without a further query.
+    """
+    if columns:
+        query = query.options(load_only(*columns))
+    return query
+
+
+def _supports_skip_locked():
+    """Whether the database server accepts FOR UPDATE SKIP LOCKED.
+
+    MySQL accepts it since 8.0, MariaDB since 10.6 and PostgreSQL
+    since 9.5.
+    """
+    dialect = get_engine().dialect
+    version = dialect.server_version_info or ()
+    if dialect.name == 'postgresql':
+        return version >= (9, 5)
+    if dialect.name == 'mysql':
+        if getattr(dialect, '_is_mariadb', False):
+            return version >= (10, 6)
+        return version >= (8, 0)
+    return False
+
+
+class _Marker(object):
+    """The sort key value and the id of the last row of a page."""
+
+    def __init__(self, values):
+        self.__dict__.update(values)
+
+
+def _sorted_query(model, limit=None, marker=None, sort_key=None,
+                  sort_dir=None, query=None):
     if not query:
         query = model_query(model)
+    # a marker decoded from a cursor, instead of a row
+    if isinstance(marker, dict):
+        marker = _Marker(marker)
     sort_keys = ['id']
     if sort_key and sort_key not in sort_keys:
         sort_keys.insert(0, sort_key)
@@ -105,10 +211,26 @@ def _paginate_query(model, limit=None, marker=None, sort_key=None,
         raise exception.InvalidParameterValue(
             _('The sort_key value "%(key)s" is an invalid field for sorting')
             % {'key': sort_key})
+    return query
+
 
+def _paginate_query(model, limit=None, marker=None, sort_key=None,
+                    sort_dir=None, query=None):
+    query = _sorted_query(model, limit, marker, sort_key, sort_dir, query)
     return query.all()
 
 
+def _iterate_query(model, sort_key=None, sort_dir=None, query=None):
+    """Iterate over the rows of a query in the order of the pages.
+
+    The rows are fetched from a server side cursor STREAM_BATCH_SIZE at a
+    time, so the memory used does not grow with the number of rows.
+    """
+    query = _sorted_query(model, None, None, sort_key, sort_dir, query)
+    query = query.execution_options(stream_results=True)
+    return query.yield_per(STREAM_BATCH_SIZE)
+
+
 class Connection(api.Connection):
     """SqlAlchemy connection."""
 
@@ -226,6 +348,12 @@ class Connection(api.Connection):
             else:
                 query = query.filter(models.WampAgent.ragent == 1)
 
+        if 'alive' in filters and filters['alive']:
+            limit = timeutils.utcnow() - datetime.timedelta(
+                seconds=CONF.conductor.agent_heartbeat_timeout)
+            query = query.filter(models.WampAgent.online == 1,
+                                 models.WampAgent.updated_at > limit)
+
         return query
 
     def _add_ports_filters(self, query, filters):
@@ -236,6 +364,8 @@ class Connection(api.Connection):
             query = query. \
                 filter(models.Port.board_uuid == filters['board_uuid'])
 
+        return query
+
     def _add_result_filters(self, query, filters):
 
         if filters is None:
@@ -315,12 +445,20 @@ class Connection(api.Connection):
                                sort_key, sort_dir, query)
 
     def get_board_list(self, filters=None, limit=None, marker=None,
-                       sort_key=None, sort_dir=None):
+                       sort_key=None, sort_dir=None, columns=None):
         query = model_query(models.Board)
+        query = _load_columns(query, columns)
         query = self._add_boards_filters(query, filters)
         return _paginate_query(models.Board, limit, marker,
                                sort_key, sort_dir, query)
 
+    def iter_board_list(self, filters=None, sort_key=None, sort_dir=None,
+                        columns=None):
+        query = model_query(models.Board)
+        query = _load_columns(query, columns)
+        query = self._add_boards_filters(query, filters)
+        return _iterate_query(models.Board, sort_key, sort_dir, query)
+
     def create_board(self, values):
         # ensure defaults are present for new boards
         if 'uuid' not in values:
@@ -398,6 +536,18 @@ class Connection(api.Connection):
 
             query.delete()
 
+    def update_boards_status(self, board_uuids, status):
+        count = 0
+        session = get_session()
+        for chunk in _chunks(board_uuids):
+            with session.begin():
+                query = model_query(models.Board, session=session)
+                query = query.filter(models.Board.uuid.in_(chunk))
+                query = query.filter(models.Board.status != status)
+                count += query.update({'status': status},
+                                      synchronize_session=False)
+        return count
+
     def update_board(self, board_id, values):
         # NOTE(dtantsur): this can lead to very strange errors
         if 'uuid' in values:
@@ -465,6 +615,16 @@ class Connection(api.Connection):
             if count == 0:
                 raise exception.ConductorNotFound(conductor=hostname)
 
+    def get_active_conductor_list(self, interval=None):
+        if interval is None:
+            interval = CONF.conductor.heartbeat_timeout
+        limit = timeutils.utcnow() - datetime.timedelta(seconds=interval)
+
+        query = (model_query(models.Conductor.hostname)
+                 .filter_by(online=True)
+                 .filter(models.Conductor.updated_at > limit))
+        return [row.hostname for row in query.all()]
+
     # LOCATION api
 
     def create_location(self, values):
@@ -502,6 +662,14 @@ class Connection(api.Connection):
         return _paginate_query(models.Location, limit, marker,
                                sort_key, sort_dir, query)
 
+    def get_locations_by_board_ids(self, board_ids):
+        locations = []
+        for chunk in _chunks(board_ids):
+            query = model_query(models.Location)
+            query = query.filter(models.Location.board_id.in_(chunk))
+            locations.extend(query.all())
+        return sorted(locations, key=lambda l: l.id)
+
     # SESSION api
 
     def create_session(self, values):
@@ -533,6 +701,15 @@ class Connection(api.Connection):
         except NoResultFound:
             raise exception.BoardNotConnected(board=board_uuid)
 
+    def get_sessions_by_board_uuids(self, board_uuids, valid=True):
+        sessions = []
+        for chunk in _chunks(board_uuids):
+            query = model_query(models.SessionWP)
+            query = query.filter(models.SessionWP.board_uuid.in_(chunk))
+            query = query.filter_by(valid=valid)
+            sessions.extend(query.all())
+        return sessions
+
     def get_session_by_id(self, session_id):
         query = model_query(models.SessionWP).filter_by(session_id=session_id)
         try:
@@ -549,6 +726,143 @@ class Connection(api.Connection):
 
         return query.all()
 
+    def _current_session_ids(self, board_ids, session):
+        """Return the id of the current session row of each board."""
+        query = model_query(models.SessionWP.board_id,
+                            func.max(models.SessionWP.id),
+                            session=session)
+        query = query.filter(models.SessionWP.board_id.in_(board_ids))
+        query = query.group_by(models.SessionWP.board_id)
+        return dict(query.all())
+
+    # a connection of the same board written meanwhile by another agent
+    # breaks the unique board_id, the retry updates its row instead
+    @oslo_db_api.wrap_db_retry(
+        max_retries=3,
+        exception_checker=lambda e: isinstance(e, db_exc.DBDuplicateEntry))
+    def register_sessions(self, sessions, history=False):
+        # a board connecting twice in the same batch keeps its last session
+        latest = dict((values['board_id'], values) for values in sessions)
+
+        session = get_session()
+        with session.begin():
+            current = self._current_session_ids(list(latest), session)
+
+            # rows left over from the time a row was added per session,
+            # on the databases not upgraded yet
+            query = model_query(models.SessionWP, session=session)
+            query = query.filter(models.SessionWP.board_id.in_(list(latest)))
+            query = query.filter(
+                ~models.SessionWP.id.in_(list(current.values())))
+            query = query.filter_by(valid=True)
+            query.update({'valid': False}, synchronize_session=False)
+
+            new_rows = []
+            for board_id, values in latest.items():
+                row = {'board_id': board_id,
+                       'board_uuid': values['board_uuid'],
+                       'session_id': values['session_id'],
+                       'valid': True}
+                if board_id in current:
+                    query = model_query(models.SessionWP, session=session)
+                    query = query.filter_by(id=current[board_id])
+                    query.update(row, synchronize_session=False)
+                else:
+                    new_rows.append(row)
+            if new_rows:
+                session.bulk_insert_mappings(models.SessionWP, new_rows)
+
+            if history:
+                session.bulk_insert_mappings(models.SessionHistory, [
+                    {'board_uuid': values['board_uuid'],
+                     'session_id': values['session_id']}
+                    for values in sessions])
+
+            for board_id, values in latest.items():
+                if not values['board']:
+                    continue
+                query = model_query(models.Board, session=session)
+                query = query.filter_by(id=board_id)
+                query.update(values['board'], synchronize_session=False)
+
+    def purge_session_history(self, before):
+        deleted = 0
+        session = get_session()
+        while True:
+            # in batches, not to lock the table for long
+            with session.begin():
+                query = model_query(models.SessionHistory.id,
+                                    session=session)
+                query = query.filter(
+                    models.SessionHistory.created_at < before)
+                ids = [row.id for row in query.limit(BULK_CHUNK_SIZE)]
+                if not ids:
+                    return deleted
+                query = model_query(models.SessionHistory, session=session)
+                query = query.filter(models.SessionHistory.id.in_(ids))
+                deleted += query.delete(synchronize_session=False)
+
+    def _superseded_sessions_query(self, session=None):
+        current = model_query(models.SessionWP.board_id,
+                              func.max(models.SessionWP.id).label('id'),
+                              session=session)
+        current = current.group_by(models.SessionWP.board_id).subquery()
+
+        query = model_query(models.SessionWP, session=session)
+        query = query.join(current,
+                           models.SessionWP.board_id == current.c.board_id)
+        return query.filter(models.SessionWP.id < current.c.id)
+
+    def compact_wamp_sessions(self, context, max_count, pause=0):
+        total = self._superseded_sessions_query().count()
+        if not total:
+            return 0, 0
+
+        todo = max_count or total
+        done = 0
+        session = get_session()
+        while done < todo:
+            with session.begin():
+                query = self._superseded_sessions_query(session=session)
+                rows = query.limit(min(BULK_CHUNK_SIZE, todo - done)).all()
+                if not rows:
+                    break
+
+                session.bulk_insert_mappings(models.SessionHistory, [
+                    {'board_uuid': row.board_uuid,
+                     'session_id': row.session_id,
+                     'created_at': row.created_at}
+                    for row in rows])
+
+                query = model_query(models.SessionWP, session=session)
+                query = query.filter(
+                    models.SessionWP.id.in_([row.id for row in rows]))
+                query.delete(synchronize_session=False)
+            done += len(rows)
+
+            # leave room to the wamp agents writing the sessions
+            if pause and done < todo:
+                time.sleep(float(pause))
+
+        return total, done
+
+    def invalidate_sessions(self, session_ids):
+        board_uuids = []
+        session = get_session()
+        for chunk in _chunks(str(s) for s in session_ids):
+            with session.begin():
+                query = model_query(models.SessionWP.board_uuid,
+                                    session=session)
+                query = query.filter(models.SessionWP.session_id.in_(chunk))
+                query = query.filter_by(valid=True)
+                board_uuids.extend(x[0] for x in query.all())
+
+                query = model_query(models.SessionWP, session=session)
+                query = query.filter(models.SessionWP.session_id.in_(chunk))
+                query = query.filter_by(valid=True)
+                query.update({'valid': False}, synchronize_session=False)
+        return board_uuids
+
     # WAMPAGENT api
 
     def register_wampagent(self, values, update_existing=False):
@@ -615,6 +929,15 @@ class Connection(api.Connection):
         return _paginate_query(models.WampAgent, limit, marker,
                                sort_key, sort_dir, query)
 
+    def get_wampagent_load(self):
+        query = model_query(models.Board.agent,
+                            func.count(models.SessionWP.id))
+        query = query.join(models.SessionWP,
+                           models.SessionWP.board_id == models.Board.id)
+        query = query.filter(models.SessionWP.valid == 1)
+        query = query.group_by(models.Board.agent)
+        return dict(query.all())
+
     # PLUGIN api
 
     def get_plugin_by_id(self, plugin_id):
@@ -685,8 +1008,9 @@ class Connection(api.Connection):
         return plugin
 
     def get_plugin_list(self, filters=None, limit=None, marker=None,
-                        sort_key=None, sort_dir=None):
+                        sort_key=None, sort_dir=None, columns=None):
         query = model_query(models.Plugin)
+        query = _load_columns(query, columns)
         query = self._add_plugins_filters(query, filters)
         return _paginate_query(models.Plugin, limit, marker,
                                sort_key, sort_dir, query)
@@ -972,6 +1296,12 @@ class Connection(api.Connection):
         except NoResultFound:
             raise exception.NoPortsManaged(wamp_agent_id=wamp_agent_id)
 
+    def get_vif_list(self):
+        query = model_query(models.Board.agent, models.Port.VIF_name)
+        query = query.join(models.Board,
+                           models.Port.board_uuid == models.Board.uuid)
+        return query.all()
+
     def get_port_list(
             self, filters=None, limit=None, marker=None,
             sort_key=None, sort_dir=None):
@@ -1065,8 +1395,9 @@ class Connection(api.Connection):
         return fleet
 
     def get_fleet_list(self, filters=None, limit=None, marker=None,
-                       sort_key=None, sort_dir=None):
+                       sort_key=None, sort_dir=None, columns=None):
         query = model_query(models.Fleet)
+        query = _load_columns(query, columns)
         query = self._add_fleets_filters(query, filters)
         return _paginate_query(models.Fleet, limit, marker,
                                sort_key, sort_dir, query)
@@ -1279,6 +1610,144 @@ class Connection(api.Connection):
         request.save()
         return request
 
+    def _purge_batch(self, before, limit, session):
+        """Return the uuids of the next batch of requests to purge.
+
+        These are whole main requests, as many as fit in limit with their
+        sub requests, or else the first limit sub requests of a main
+        request larger than that, which is purged over several batches.
+        """
+        query = model_query(models.Request.uuid, session=session)
+        query = query.filter(models.Request.main_request_uuid.is_(None))
+        query = query.filter(models.Request.status == REQUEST_COMPLETED)
+        query = query.filter(func.coalesce(models.Request.updated_at,
+                                           models.Request.created_at)
+                             < before)
+        mains = [r[0] for r in query.limit(limit).all()]
+        if not mains:
+            return []
+
+        sizes = {}
+        for chunk in _chunks(mains):
+            query = model_query(models.Request.main_request_uuid,
+                                func.count(models.Request.id),
+                                session=session)
+            query = query.filter(models.Request.main_request_uuid.in_(chunk))
+            query = query.group_by(models.Request.main_request_uuid)
+            sizes.update(query.all())
+
+        uuids = []
+        total = 0
+        for uuid in mains:
+            total += 1 + sizes.get(uuid, 0)
+            if total > limit:
+                break
+            uuids.append(uuid)
+        if uuids:
+            return uuids
+
+        query = model_query(models.Request.uuid, session=session)
+        query = query.filter(models.Request.main_request_uuid == mains[0])
+        return [r[0] for r in query.limit(limit).all()]
+
+    def purge_requests(self, before, limit, callback=None):
+        requests = results = 0
+        session = get_session()
+        with session.begin():
+            uuids = self._purge_batch(before, limit, session)
+
+            for chunk in _chunks(uuids):
+                # the requests of the chunk: main requests along with
+                # their sub requests, or sub requests alone
+                purged = model_query(models.Request.uuid, session=session)
+                purged = purged.filter(
+                    or_(models.Request.uuid.in_(chunk),
+                        models.Request.main_request_uuid.in_(chunk)))
+
+                if callback:
+                    self._purge_callback(purged, callback, session)
+
+                # the payloads are shared by the results with the same
+                # message
+                query = model_query(models.Result.message_digest,
+                                    session=session)
+                query = query.filter(models.Result.request_uuid.in_(purged))
+                query = query.filter(models.Result.message_digest.isnot(None))
+                digests = [r[0] for r in query.distinct()]
+
+                query = model_query(models.Result, session=session)
+                query = query.filter(models.Result.request_uuid.in_(purged))
+                results += query.delete(synchronize_session=False)
+
+                for digests_chunk in _chunks(digests):
+                    used = exists().where(
+                        models.Result.message_digest ==
+                        models.ResultPayload.digest)
+                    query = model_query(models.ResultPayload,
+                                        session=session)
+                    query = query.filter(
+                        models.ResultPayload.digest.in_(digests_chunk))
+                    query = query.filter(~used)
+                    query.delete(synchronize_session=False)
+
+                # the sub requests first, they refer to their main request
+                query = model_query(models.Request, session=session)
+                query = query.filter(
+                    models.Request.main_request_uuid.in_(chunk))
+                requests += query.delete(synchronize_session=False)
+
+                query = model_query(models.Request, session=session)
+                query = query.filter(models.Request.uuid.in_(chunk))
+                requests += query.delete(synchronize_session=False)
+
+        return requests, results
+
+    def _purge_callback(self, purged, callback, session):
+        query = model_query(models.Request, session=session)
+        query = query.filter(models.Request.uuid.in_(purged))
+        requests = [_as_dict(r) for r in query.all()]
+
+        query = model_query(models.Result, session=session)
+        query = query.filter(models.Result.request_uuid.in_(purged))
+        results = query.all()
+
+        # the payloads may be deleted next: their message is given along
+        # with the results
+        messages = {}
+        digests = set(r.message_digest for r in results if r.message_digest)
+        for chunk in _chunks(digests):
+            query = model_query(models.ResultPayload, session=session)
+            query = query.filter(models.ResultPayload.digest.in_(chunk))
+            messages.update(
+                (p.digest, zlib.decompress(p.data).decode('utf-8'))
+                for p in query.all())
+        rows = []
+        for result in results:
+            row = _as_dict(result)
+            if result.message_digest in messages:
+                row['message'] = messages[result.message_digest]
+            rows.append(row)
+        callback(requests, rows)
+
+    def create_requests(self, values_list):
+        rows = []
+        for values in values_list:
+            row = dict(values)
+            if 'uuid' not in row:
+                row['uuid'] = uuidutils.generate_uuid()
+            rows.append(row)
+
+        session = get_session()
+        with session.begin():
+            session.bulk_insert_mappings(models.Request, rows)
+
+            requests = {}
+            for chunk in _chunks(row['uuid'] for row in rows):
+                query = model_query(models.Request, session=session)
+                query = query.filter(models.Request.uuid.in_(chunk))
+                requests.update((r.uuid, r) for r in query.all())
+        return [requests[row['uuid']] for row in rows]
+
     def update_request(self, request_id, values):
         if 'uuid' in values:
             msg = _("Cannot overwrite UUID for an existing Request.")
@@ -1286,12 +1755,83 @@ class Connection(api.Connection):
         return self._do_update_request(request_id, values)
 
     def get_request_list(self, filters=None, limit=None, marker=None,
-                         sort_key=None, sort_dir=None):
+                         sort_key=None, sort_dir=None, columns=None):
         query = model_query(models.Request)
+        query = _load_columns(query, columns)
         query = self._add_requests_filters(query, filters)
         return _paginate_query(models.Request, limit, marker,
                                sort_key, sort_dir, query)
 
+    def iter_request_list(self, filters=None, sort_key=None, sort_dir=None,
+                          columns=None):
+        query = model_query(models.Request)
+        query = _load_columns(query, columns)
+        query = self._add_requests_filters(query, filters)
+        return _iterate_query(models.Request, sort_key, sort_dir, query)
+
+    def _complete_sub_request(self, main_request_uuid, session, count=1):
+        query = model_query(models.Request, session=session)
+        query = query.filter_by(uuid=main_request_uuid)
+        query.update(
+            {'pending_requests': models.Request.pending_requests - count},
+            synchronize_session=False)
+
+        query = model_query(models.Request, session=session)
+        query = query.filter_by(uuid=main_request_uuid)
+        query = query.filter(models.Request.pending_requests <= 0)
+        query = query.filter(models.Request.status != REQUEST_COMPLETED)
+        return query.update({'pending_requests': 0,
+                             'status': REQUEST_COMPLETED},
+                            synchronize_session=False) == 1
+
+    def expire_requests(self, now, request_uuids=None, limit=None):
+        session = get_session()
+        with session.begin():
+            query = model_query(models.Request.uuid, session=session)
+            query = query.filter(models.Request.status != REQUEST_COMPLETED)
+            query = query.filter(models.Request.deadline < now)
+            if request_uuids is not None:
+                query = query.filter(models.Request.uuid.in_(request_uuids))
+            if limit:
+                query = query.limit(limit)
+            uuids = [r[0] for r in query.all()]
+            if not uuids:
+                return []
+
+            # the results first and then the requests, as complete_result
+            # does: a result completed meanwhile is not overwritten
+            query = model_query(models.Result, session=session)
+            query = query.filter(models.Result.request_uuid.in_(uuids))
+            query = query.filter(models.Result.result == RESULT_RUNNING)
+            query.update({'result': RESULT_TIMEOUT,
+                          'message': 'Request timed out',
+                          'message_size': None,
+                          'message_digest': None},
+                         synchronize_session=False)
+
+            query = model_query(models.Request.uuid,
+                                models.Request.main_request_uuid,
+                                session=session)
+            query = query.filter(models.Request.uuid.in_(uuids))
+            query = query.filter(models.Request.status != REQUEST_COMPLETED)
+            expired = query.with_lockmode('update').all()
+            if not expired:
+                return []
+
+            query = model_query(models.Request, session=session)
+            query = query.filter(
+                models.Request.uuid.in_([r[0] for r in expired]))
+            query.update({'status': REQUEST_COMPLETED},
+                         synchronize_session=False)
+
+            completed = [r[0] for r in expired]
+            mains = collections.Counter(r[1] for r in expired if r[1])
+            for main_request_uuid, count in mains.items():
+                if self._complete_sub_request(main_request_uuid, session,
+                                              count):
+                    completed.append(main_request_uuid)
+        return completed
+
     # RESULT
 
     def _do_update_result(self, update_id, values):
@@ -1303,16 +1843,30 @@ class Connection(api.Connection):
                 ref = query.with_lockmode('update').one()
             except NoResultFound:
                 raise exception.ResultNotFound(result=update_id)
+            if 'message' in values:
+                values = dict(values)
+                values.update(_result_message_values(values['message'],
+                                                     session))
             ref.update(values)
         return ref
 
     def create_result(self, values):
         # ensure defaults are present for new results
-        result = models.Result()
-        result.update(values)
-        result.save()
+        session = get_session()
+        with session.begin():
+            result = models.Result()
+            result.update(values)
+            if 'message' in values:
+                result.update(_result_message_values(values['message'],
+                                                     session))
+            session.add(result)
         return result
 
+    def create_results(self, values_list):
+        session = get_session()
+        with session.begin():
+            session.bulk_insert_mappings(models.Result, values_list)
+
     def get_result(self, board_uuid, request_uuid):
         query = model_query(models.Result).filter_by(
             board_uuid=board_uuid).filter_by(request_uuid=request_uuid)
@@ -1324,6 +1878,47 @@ class Connection(api.Connection):
     def update_result(self, result_id, values):
         return self._do_update_result(result_id, values)
 
+    def get_result_payload(self, digest):
+        query = model_query(models.ResultPayload).filter_by(digest=digest)
+        try:
+            return query.one()
+        except NoResultFound:
+            raise exception.ResultNotFound()
+
+    def complete_result(self, board_uuid, request_uuid, result, message):
+        session = get_session()
+        with session.begin():
+            values = _result_message_values(message, session)
+            values['result'] = result
+
+            query = model_query(models.Result, session=session)
+            query = query.filter_by(board_uuid=board_uuid,
+                                    request_uuid=request_uuid,
+                                    result=RESULT_RUNNING)
+            if not query.update(values, synchronize_session=False):
+                return None
+
+            completed = []
+            running = exists().where(
+                and_(models.Result.request_uuid == request_uuid,
+                     models.Result.result == RESULT_RUNNING))
+            query = model_query(models.Request, session=session)
+            query = query.filter_by(uuid=request_uuid)
+            query = query.filter(models.Request.status != REQUEST_COMPLETED)
+            query = query.filter(~running)
+            if not query.update({'status': REQUEST_COMPLETED},
+                                synchronize_session=False):
+                return completed
+            completed.append(request_uuid)
+
+            query = model_query(models.Request.main_request_uuid,
+                                session=session)
+            main_request_uuid = query.filter_by(uuid=request_uuid).scalar()
+            if (main_request_uuid and
+                    self._complete_sub_request(main_request_uuid, session)):
+                completed.append(main_request_uuid)
+        return completed
+
     def get_result_list(self, filters=None, limit=None, marker=None,
                         sort_key=None, sort_dir=None):
         query = model_query(models.Result)
@@ -1331,6 +1926,11 @@ class Connection(api.Connection):
         return _paginate_query(models.Result, limit, marker,
                                sort_key, sort_dir, query)
 
+    def iter_result_list(self, filters=None, sort_key=None, sort_dir=None):
+        query = model_query(models.Result)
+        query = self._add_result_filters(query, filters)
+        return _iterate_query(models.Result, sort_key, sort_dir, query)
+
     # def get_results(self, request_uuid, filters=None):
     #     query = model_query(models.Result).filter_by(
     #         request_uuid=request_uuid)
@@ -1339,3 +1939,77 @@ class Connection(api.Connection):
     #         return query.all()
     #     except NoResultFound:
     #         raise exception.ResultNotFound()
+
+    # PORT RESERVATION api
+
+    def create_port_pool(self, agent, pool, ports, used_ports=None):
+        used_ports = set(used_ports or [])
+        rows = [{'agent': agent,
+                 'pool': pool,
+                 'port': port,
+                 'reserved': port in used_ports,
+                 'created_at': timeutils.utcnow()} for port in ports]
+        session = get_session()
+        try:
+            with session.begin():
+                session.execute(models.PortReservation.__table__.insert(),
+                                rows)
+        except db_exc.DBDuplicateEntry:
+            # created in the meantime by another conductor
+            pass
+
+    def reserve_used_ports(self, agent, pool, used_ports):
+        used_ports = list(used_ports)
+        if not used_ports:
+            return
+        session = get_session()
+        with session.begin():
+            query = (model_query(models.PortReservation, session=session)
+                     .filter_by(agent=agent, pool=pool, reserved=False)
+                     .filter(models.PortReservation.port.in_(used_ports)))
+            query.update({'reserved': True,
+                          'updated_at': timeutils.utcnow()},
+                         synchronize_session=False)
+
+    def release_stale_ports(self, agent, pool, used_ports, before):
+        session = get_session()
+        with session.begin():
+            query = (model_query(models.PortReservation, session=session)
+                     .filter_by(agent=agent, pool=pool, reserved=True)
+                     .filter(models.PortReservation.updated_at < before))
+            used_ports = list(used_ports)
+            if used_ports:
+                query = query.filter(
+                    ~models.PortReservation.port.in_(used_ports))
+            return query.update({'reserved': False, 'board_uuid': None,
+                                 'updated_at': timeutils.utcnow()},
+                                synchronize_session=False)
+
+    def reserve_port(self, agent, pool, board_uuid):
+        session = get_session()
+        with session.begin():
+            query = (model_query(models.PortReservation, session=session)
+                     .filter_by(agent=agent, pool=pool, reserved=False))
+            if _supports_skip_locked():
+                # the concurrent reservations take different ports
+                query = query.with_for_update(skip_locked=True)
+            else:
+                query = query.with_lockmode('update')
+            ref = query.first()
+            if ref is None:
+                query = (model_query(models.PortReservation.id,
+                                     session=session)
+                         .filter_by(agent=agent, pool=pool))
+                if query.first() is None:
+                    raise exception.PortPoolNotFound(agent=agent, pool=pool)
+                raise exception.NotEnoughPortForService()
+            ref.update({'reserved': True, 'board_uuid': board_uuid})
+        return ref.port
+
+    def release_port(self, agent, pool, port):
+        session = get_session()
+        with session.begin():
+            query = (model_query(models.PortReservation, session=session)
+                     .filter_by(agent=agent, pool=pool, port=port))
+            query.update({'reserved': False, 'board_uuid': None,
+                          'updated_at': timeutils.utcnow()})
@@ -21,8 +21,10 @@ from oslo_config import cfg
 from oslo_db.sqlalchemy import models
 from sqlalchemy import Boolean
 from sqlalchemy import Column
+from sqlalchemy import DateTime
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy import ForeignKey, Integer
+from sqlalchemy import LargeBinary
 from sqlalchemy import schema
 from sqlalchemy import String
 from sqlalchemy.types import TypeDecorator, TEXT
@@ -32,7 +34,12 @@ import six.moves.urllib.parse as urlparse
 sql_opts = [
     cfg.StrOpt('mysql_engine',
                default='InnoDB',
-               help='MySQL engine to use.')
+               help='MySQL engine to use.'),
+    cfg.IntOpt('result_inline_max_size',
+               default=4096,
+               help='Maximum size in bytes of the message of a result kept '
+                    'in the results table. Larger messages are stored '
+                    'compressed in the result_payloads table.'),
 ]
 
 _DEFAULT_SQL_CONNECTION = 'sqlite:///' + \
@@ -141,6 +148,10 @@ class Board(Base):
     __table_args__ = (
         schema.UniqueConstraint('uuid', name='uniq_boards0uuid'),
         schema.UniqueConstraint('code', name='uniq_boards0code'),
+        schema.Index('boards_project_status_idx', 'project', 'status'),
+        schema.Index('boards_fleet_status_idx', 'fleet', 'status'),
+        schema.Index('boards_agent_status_idx', 'agent', 'status'),
+        schema.Index('boards_status_idx', 'status'),
         table_args())
     id = Column(Integer, primary_key=True)
     uuid = Column(String(36))
@@ -180,6 +191,9 @@ class SessionWP(Base):
         schema.UniqueConstraint(
             'session_id', 'board_uuid',
             name='uniq_board_session_id0session_id'),
+        schema.UniqueConstraint('board_id', name='uniq_sessions0board_id'),
+        schema.Index('sessions_board_uuid_valid_idx', 'board_uuid', 'valid'),
+        schema.Index('sessions_board_id_valid_idx', 'board_id', 'valid'),
         table_args())
     id = Column(Integer, primary_key=True)
     valid = Column(Boolean, default=True)
@@ -188,6 +202,19 @@ class SessionWP(Base):
     board_id = Column(Integer, ForeignKey('boards.id', ondelete="CASCADE"))
 
 
+class SessionHistory(Base):
+    """Represents a past session of a board."""
+
+    __tablename__ = 'session_history'
+    __table_args__ = (
+        schema.Index('session_history_board_uuid_idx', 'board_uuid'),
+        schema.Index('session_history_created_at_idx', 'created_at'),
+        table_args())
+    id = Column(Integer, primary_key=True)
+    session_id = Column(String(20))
+    board_uuid = Column(String(36))
+
+
 class Plugin(Base):
     """Represents a plugin."""
 
@@ -240,6 +267,7 @@ class ExposedService(Base):
 
     __tablename__ = 'exposed_services'
     __table_args__ = (
+        schema.Index('exposed_services_board_uuid_idx', 'board_uuid'),
         table_args())
     id = Column(Integer, primary_key=True)
     board_uuid = Column(String(36), ForeignKey('boards.uuid', ondelete="CASCADE"))
@@ -322,7 +350,9 @@ class Request(Base):
     __tablename__ = 'requests'
     __table_args__ = (
         schema.UniqueConstraint('uuid', name='uniq_requests0uuid'),
-
+        schema.Index('requests_main_request_uuid_idx', 'main_request_uuid'),
+        schema.Index('requests_destination_uuid_idx', 'destination_uuid'),
+        schema.Index('requests_status_deadline_idx', 'status', 'deadline'),
         table_args())
     id = Column(Integer, primary_key=True)
     uuid = Column(String(36))
@@ -335,6 +365,7 @@ class Request(Base):
     status = Column(String(10))
     type = Column(Integer)
     action = Column(String(20))
+    deadline = Column(DateTime, nullable=True)
 
 
 class Result(Base):
@@ -344,9 +375,45 @@ class Result(Base):
     __table_args__ = (
         schema.UniqueConstraint('board_uuid', 'request_uuid',
                                 name='uniq_request_on_board'),
+        schema.Index('results_request_uuid_result_idx',
+                     'request_uuid', 'result'),
+        schema.Index('results_message_digest_idx', 'message_digest'),
         table_args())
     id = Column(Integer, primary_key=True)
     board_uuid = Column(String(36))
     request_uuid = Column(String(36))
     result = Column(String(10))
     message = Column(TEXT)
+    message_size = Column(Integer, nullable=True)
+    message_digest = Column(String(64), nullable=True)
+
+
+class ResultPayload(Base):
+    """Represents the compressed message of a result, by content."""
+
+    __tablename__ = 'result_payloads'
+    __table_args__ = (
+        schema.UniqueConstraint('digest', name='uniq_result_payloads0digest'),
+        table_args())
+    id = Column(Integer, primary_key=True)
+    digest = Column(String(64), nullable=False)
+    size = Column(Integer, nullable=False)
+    data = Column(LargeBinary(length=2 ** 32 - 1), nullable=False)
+
+
+class PortReservation(Base):
+    """Represents a port of the pools managed on the wamp agents."""
+
+    __tablename__ = 'port_reservations'
+    __table_args__ = (
+        schema.UniqueConstraint('agent', 'pool', 'port',
+                                name='uniq_port_reservations0port'),
+        schema.Index('port_reservations_free_idx',
+                     'agent', 'pool', 'reserved'),
+        table_args())
+    id = Column(Integer, primary_key=True)
+    agent = Column(String(255))
+    pool = Column(String(20))
+    port = Column(Integer)
+    reserved = Column(Boolean, default=False)
+    board_uuid = Column(String(36), nullable=True)
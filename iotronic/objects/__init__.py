@@ -21,6 +21,7 @@ from iotronic.objects import injectionplugin
 from iotronic.objects import location
 from iotronic.objects import plugin
 from iotronic.objects import port
+from iotronic.objects import portreservation
 from iotronic.objects import request
 from iotronic.objects import result
 from iotronic.objects import service
@@ -41,6 +42,7 @@ Webservice = webservice.Webservice
 Request = request.Request
 Result = result.Result
 Port = port.Port
+PortReservation = portreservation.PortReservation
 Fleet = fleet.Fleet
 EnabledWebservice = enabledwebservice.EnabledWebservice
 
@@ -55,6 +57,7 @@ __all__ = (
     InjectionPlugin,
     ExposedService,
     Port,
+    PortReservation,
     Fleet,
     Webservice,
     EnabledWebservice,
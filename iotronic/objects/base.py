@@ -456,7 +456,7 @@ class IotronicObject(object):
     def as_dict(self):
         return dict((k, getattr(self, k))
                     for k in self.fields
-                    if hasattr(self, k))
+                    if hasattr(self, get_attrname(k)))
 
 
 class ObjectListBase(object):
@@ -67,9 +67,9 @@ class Board(base.IotronicObject):
         return False
 
     @staticmethod
-    def _from_db_object(board, db_board):
+    def _from_db_object(board, db_board, fields=None):
         """Converts a database entity to a formal object."""
-        for field in board.fields:
+        for field in fields or board.fields:
             board[field] = db_board[field]
         board.obj_reset_changes()
         return board
@@ -150,7 +150,7 @@ class Board(base.IotronicObject):
 
     @base.remotable_classmethod
     def list(cls, context, limit=None, marker=None, sort_key=None,
-             sort_dir=None, filters=None):
+             sort_dir=None, filters=None, fields=None):
         """Return a list of Board objects.
 
         :param context: Security context.
@@ -159,13 +159,49 @@ class Board(base.IotronicObject):
         :param sort_key: column to sort results by.
         :param sort_dir: direction to sort. "asc" or "desc".
         :param filters: Filters to apply.
+        :param fields: the fields to load, all of them by default.
         :returns: a list of :class:`Board` object.
 
         """
         db_boards = cls.dbapi.get_board_list(filters=filters, limit=limit,
                                              marker=marker, sort_key=sort_key,
-                                             sort_dir=sort_dir)
-        return [Board._from_db_object(cls(context), obj) for obj in db_boards]
+                                             sort_dir=sort_dir,
+                                             columns=fields)
+        return [Board._from_db_object(cls(context), obj, fields)
+                for obj in db_boards]
+
+    # NOTE: not remotable, an iterator cannot be sent over RPC.
+    @classmethod
+    def iterate(cls, context, sort_key=None, sort_dir=None, filters=None,
+                fields=None):
+        """Iterate over the Board objects, read in batches.
+
+        :param context: Security context.
+        :param sort_key: column to sort results by.
+        :param sort_dir: direction to sort. "asc" or "desc".
+        :param filters: Filters to apply.
+        :param fields: the fields to load, all of them by default.
+        :returns: an iterator of :class:`Board` object.
+
+        """
+        db_boards = cls.dbapi.iter_board_list(filters=filters,
+                                              sort_key=sort_key,
+                                              sort_dir=sort_dir,
+                                              columns=fields)
+        return (Board._from_db_object(cls(context), obj, fields)
+                for obj in db_boards)
+
+    @base.remotable_classmethod
+    def set_status_list(cls, context, board_uuids, status):
+        """Set the status of a set of boards.
+
+        :param context: Security context.
+        :param board_uuids: the uuids of the boards.
+        :param status: the new status.
+        :returns: the number of boards updated.
+
+        """
+        return cls.dbapi.update_boards_status(board_uuids, status)
 
     @base.remotable_classmethod
     def reserve(cls, context, tag, board_id):
@@ -60,9 +60,9 @@ class Plugin(base.IotronicObject):
     }
 
     @staticmethod
-    def _from_db_object(plugin, db_plugin):
+    def _from_db_object(plugin, db_plugin, fields=None):
         """Converts a database entity to a formal object."""
-        for field in plugin.fields:
+        for field in fields or plugin.fields:
             plugin[field] = db_plugin[field]
         plugin.obj_reset_changes()
         return plugin
@@ -116,7 +116,7 @@ class Plugin(base.IotronicObject):
 
     @base.remotable_classmethod
     def list(cls, context, limit=None, marker=None, sort_key=None,
-             sort_dir=None, filters=None):
+             sort_dir=None, filters=None, fields=None):
         """Return a list of Plugin objects.
 
         :param context: Security context.
@@ -125,6 +125,7 @@ class Plugin(base.IotronicObject):
         :param sort_key: column to sort results by.
         :param sort_dir: direction to sort. "asc" or "desc".
         :param filters: Filters to apply.
+        :param fields: the fields to load, all of them by default.
         :returns: a list of :class:`Plugin` object.
 
         """
@@ -132,8 +133,9 @@ class Plugin(base.IotronicObject):
                                                limit=limit,
                                                marker=marker,
                                                sort_key=sort_key,
-                                               sort_dir=sort_dir)
-        return [Plugin._from_db_object(cls(context), obj)
+                                               sort_dir=sort_dir,
+                                               columns=fields)
+        return [Plugin._from_db_object(cls(context), obj, fields)
                 for obj in db_plugins]
 
     @base.remotable
@@ -105,6 +105,15 @@ class Port(base.IotronicObject):
         return [Port._from_db_object(cls(context), obj)
                 for obj in db_port]
 
+    @base.remotable_classmethod
+    def get_vif_list(cls, context):
+        """Return the VIFs of all the ports with the agent of their board.
+
+        :param context: Security context.
+        :returns: a list of (agent hostname, VIF name) tuples.
+        """
+        return [tuple(row) for row in cls.dbapi.get_vif_list()]
+
     @base.remotable_classmethod
     def list(cls, context, limit=None, marker=None, sort_key=None,
              sort_dir=None, filters=None):
@@ -0,0 +1,96 @@
+# coding=utf-8
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from iotronic.db import api as db_api
+from iotronic.objects import base
+
+# public ports of the services exposed on the wamp agents
+SERVICE = 'service'
+# local ports of the socat tunnels of the VIFs on the wamp agents
+TUNNEL = 'tunnel'
+
+
+class PortReservation(base.IotronicObject):
+    # Version 1.0: Initial version
+    VERSION = '1.0'
+
+    dbapi = db_api.get_instance()
+
+    fields = {
+        'id': int,
+        'agent': str,
+        'pool': str,
+        'port': int,
+        'reserved': bool,
+        'board_uuid': str,
+    }
+
+    @base.remotable_classmethod
+    def create_pool(cls, context, agent, pool, ports, used_ports=None):
+        """Create a pool of ports on a WampAgent, if it does not exist.
+
+        :param context: Security context.
+        :param agent: the hostname of the WampAgent.
+        :param pool: the name of the pool.
+        :param ports: the ports of the pool.
+        :param used_ports: ports of the pool already in use.
+        """
+        cls.dbapi.create_port_pool(agent, pool, ports, used_ports)
+
+    @base.remotable_classmethod
+    def reserve_used(cls, context, agent, pool, used_ports):
+        """Reserve the ports of a pool found in use.
+
+        :param context: Security context.
+        :param agent: the hostname of the WampAgent.
+        :param pool: the name of the pool.
+        :param used_ports: the ports of the pool in use.
+        """
+        cls.dbapi.reserve_used_ports(agent, pool, used_ports)
+
+    @base.remotable_classmethod
+    def release_stale(cls, context, agent, pool, used_ports, before):
+        """Release the ports of a pool reserved before a time and not in use.
+
+        :param context: Security context.
+        :param agent: the hostname of the WampAgent.
+        :param pool: the name of the pool.
+        :param used_ports: the ports of the pool in use.
+        :param before: the ports reserved since then are kept.
+        :returns: the number of ports released.
+        """
+        return cls.dbapi.release_stale_ports(agent, pool, used_ports, before)
+
+    @base.remotable_classmethod
+    def reserve(cls, context, agent, pool, board_uuid):
+        """Reserve a free port of a pool for a board.
+
+        :param context: Security context.
+        :param agent: the hostname of the WampAgent.
+        :param pool: the name of the pool.
+        :param board_uuid: the uuid of the board using the port.
+        :returns: the reserved port.
+        """
+        return cls.dbapi.reserve_port(agent, pool, board_uuid)
+
+    @base.remotable_classmethod
+    def release(cls, context, agent, pool, port):
+        """Release a port of a pool.
+
+        :param context: Security context.
+        :param agent: the hostname of the WampAgent.
+        :param pool: the name of the pool.
+        :param port: the port to release.
+        """
+        cls.dbapi.release_port(agent, pool, port)
@@ -23,6 +23,7 @@ from iotronic.objects import utils as obj_utils
 
 BOARD = 0
 FLOAT = 1
+FLEET = 2
 
 COMPLETED = "COMPLETED"
 PENDING = "PENDING"
@@ -30,7 +31,8 @@ PENDING = "PENDING"
 
 class Request(base.IotronicObject):
     # Version 1.0: Initial version
-    VERSION = '1.0'
+    # Version 1.1: Add deadline
+    VERSION = '1.1'
 
     dbapi = db_api.get_instance()
 
@@ -44,12 +46,13 @@ class Request(base.IotronicObject):
         'project': obj_utils.str_or_none,
         'type': int,
         'action': obj_utils.str_or_none,
+        'deadline': obj_utils.datetime_or_str_or_none,
     }
 
     @staticmethod
-    def _from_db_object(request, db_request):
+    def _from_db_object(request, db_request, fields=None):
         """Converts a database entity to a formal object."""
-        for field in request.fields:
+        for field in fields or request.fields:
             request[field] = db_request[field]
         request.obj_reset_changes()
         return request
@@ -90,6 +93,19 @@ class Request(base.IotronicObject):
         request = Request._from_db_object(cls(context), db_request)
         return request
 
+    @base.remotable_classmethod
+    def create_list(cls, context, requests):
+        """Create a set of Request records in the DB at once.
+
+        :param context: Security context.
+        :param requests: a list of dicts of request values, the uuids are
+                         generated when missing.
+        :returns: a list of :class:`Request` objects.
+        """
+        db_requests = cls.dbapi.create_requests(requests)
+        return [Request._from_db_object(cls(context), obj)
+                for obj in db_requests]
+
     # @base.remotable_classmethod
     # def get_results(cls, context, filters=None):
     #     """Find a request based on uuid and return a Board object.
@@ -119,7 +135,7 @@ class Request(base.IotronicObject):
 
     @base.remotable_classmethod
     def list(cls, context, limit=None, marker=None, sort_key=None,
-             sort_dir=None, filters=None):
+             sort_dir=None, filters=None, fields=None):
         """Return a list of Request objects.
 
         :param context: Security context.
@@ -129,6 +145,7 @@ class Request(base.IotronicObject):
         :param sort_key: column to sort results by.
         :param sort_dir: direction to sort. "asc" or "desc".
         :param filters: Filters to apply.
+        :param fields: the fields to load, all of them by default.
         :returns: a list of :class:`Request` object.
 
         """
@@ -136,11 +153,33 @@ class Request(base.IotronicObject):
                                                  limit=limit,
                                                  marker=marker,
                                                  sort_key=sort_key,
-                                                 sort_dir=sort_dir)
+                                                 sort_dir=sort_dir,
+                                                 columns=fields)
 
-        return [Request._from_db_object(cls(context), obj)
+        return [Request._from_db_object(cls(context), obj, fields)
                 for obj in db_requests]
 
+    # NOTE: not remotable, an iterator cannot be sent over RPC.
+    @classmethod
+    def iterate(cls, context, sort_key=None, sort_dir=None, filters=None,
+                fields=None):
+        """Iterate over the Request objects, read in batches.
+
+        :param context: Security context.
+        :param sort_key: column to sort results by.
+        :param sort_dir: direction to sort. "asc" or "desc".
+        :param filters: Filters to apply.
+        :param fields: the fields to load, all of them by default.
+        :returns: an iterator of :class:`Request` object.
+
+        """
+        db_requests = cls.dbapi.iter_request_list(filters=filters,
+                                                  sort_key=sort_key,
+                                                  sort_dir=sort_dir,
+                                                  columns=fields)
+        return (Request._from_db_object(cls(context), obj, fields)
+                for obj in db_requests)
+
     @base.remotable
     def create(self, context=None):
         """Create a Request record in the DB.
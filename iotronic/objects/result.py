@@ -21,15 +21,19 @@ from iotronic.db import api as db_api
 from iotronic.objects import base
 from iotronic.objects import utils as obj_utils
 
+import zlib
+
 SUCCESS = "SUCCESS"
 ERROR = "ERROR"
 WARNING = "WARNING"
 RUNNING = "RUNNING"
+TIMEOUT = "TIMEOUT"
 
 
 class Result(base.IotronicObject):
     # Version 1.0: Initial version
-    VERSION = '1.0'
+    # Version 1.1: Add message_size and message_digest
+    VERSION = '1.1'
 
     dbapi = db_api.get_instance()
 
@@ -39,6 +43,8 @@ class Result(base.IotronicObject):
         'request_uuid': obj_utils.str_or_none,
         'result': obj_utils.str_or_none,
         'message': obj_utils.str_or_none,
+        'message_size': obj_utils.int_or_none,
+        'message_digest': obj_utils.str_or_none,
     }
 
     @staticmethod
@@ -61,6 +67,29 @@ class Result(base.IotronicObject):
         result = Result._from_db_object(cls(context), db_result)
         return result
 
+    @base.remotable_classmethod
+    def create_list(cls, context, results):
+        """Create a set of Result records in the DB at once.
+
+        :param context: Security context.
+        :param results: a list of dicts of result values.
+        """
+        cls.dbapi.create_results(results)
+
+    @base.remotable_classmethod
+    def complete(cls, context, board_uuid, request_uuid, result, message):
+        """Record the result of a board and complete its request.
+
+        :param board_uuid: the board uuid result.
+        :param request_uuid: the request_uuid.
+        :param result: the outcome of the request on the board.
+        :param message: the message of the board.
+        :returns: None if the result was already completed, otherwise the
+                  uuids of the requests completed, main request included.
+        """
+        return cls.dbapi.complete_result(board_uuid, request_uuid, result,
+                                         message)
+
     @base.remotable_classmethod
     def get_results_list(cls, context, filters=None):
         """Find a result based on name and return a Board object.
@@ -98,6 +127,63 @@ class Result(base.IotronicObject):
         return [Result._from_db_object(cls(context), obj)
                 for obj in db_results]
 
+    # NOTE: not remotable, an iterator cannot be sent over RPC.
+    @classmethod
+    def iterate(cls, context, sort_key=None, sort_dir=None, filters=None):
+        """Iterate over the Result objects, read in batches.
+
+        :param context: Security context.
+        :param sort_key: column to sort results by.
+        :param sort_dir: direction to sort. "asc" or "desc".
+        :param filters: Filters to apply.
+        :returns: an iterator of :class:`Result` object.
+
+        """
+        db_results = cls.dbapi.iter_result_list(filters=filters,
+                                                sort_key=sort_key,
+                                                sort_dir=sort_dir)
+        return (Result._from_db_object(cls(context), obj)
+                for obj in db_results)
+
+    @property
+    def payload_size(self):
+        """Size in bytes of the message, wherever it is stored."""
+        if self.message_digest:
+            return self.message_size
+        return len((self.message or '').encode('utf-8'))
+
+    def iter_payload(self, start=0, end=None, chunk_size=65536):
+        """Iterate over the bytes of the message from start to end.
+
+        A message offloaded to the result payloads is decompressed on the
+        fly, one chunk at a time.
+
+        :param start: offset of the first byte.
+        :param end: offset after the last byte, the end of the message if
+                    None.
+        :param chunk_size: size of the compressed chunks.
+        """
+        if not self.message_digest:
+            yield (self.message or '').encode('utf-8')[start:end]
+            return
+
+        payload = self.dbapi.get_result_payload(self.message_digest)
+        if end is None:
+            end = payload.size
+
+        decompressor = zlib.decompressobj()
+        offset = 0
+        for i in range(0, len(payload.data), chunk_size):
+            data = decompressor.decompress(payload.data[i:i + chunk_size])
+            if offset + len(data) > start:
+                yield data[max(start - offset, 0):end - offset]
+            offset += len(data)
+            if offset >= end:
+                return
+        data = decompressor.flush()
+        if data and offset < end:
+            yield data[max(start - offset, 0):end - offset]
+
     @base.remotable
     def create(self, context=None):
         """Create a Result record in the DB.
@@ -81,6 +81,19 @@ class SessionWP(base.IotronicObject):
         session = SessionWP._from_db_object(cls(context), db_session)
         return session
 
+    @base.remotable_classmethod
+    def list_by_board_uuids(cls, context, board_uuids, valid=True):
+        """Return the sessions of a set of boards.
+
+        :param context: Security context
+        :param board_uuids: the uuids of the boards.
+        :param valid: whether to return the valid sessions or the others.
+        :returns: a list of :class:`SessionWP` objects.
+
+        """
+        db_list = cls.dbapi.get_sessions_by_board_uuids(board_uuids, valid)
+        return [SessionWP._from_db_object(cls(context), x) for x in db_list]
+
     @base.remotable_classmethod
     def valid_list(cls, context, agent):
         """Return a list of SessionWP objects.
@@ -92,6 +105,29 @@ class SessionWP(base.IotronicObject):
         db_list = cls.dbapi.get_valid_wpsessions_list(agent)
         return [SessionWP._from_db_object(cls(context), x) for x in db_list]
 
+    @base.remotable_classmethod
+    def register_list(cls, context, sessions, history=False):
+        """Record the new sessions of a set of boards.
+
+        :param context: Security context
+        :param sessions: a list of dicts with the board_id, board_uuid,
+                         session_id and the 'board' values to update.
+        :param history: whether to keep the sessions in the history.
+
+        """
+        cls.dbapi.register_sessions(sessions, history=history)
+
+    @base.remotable_classmethod
+    def invalidate_list(cls, context, session_ids):
+        """Mark a set of sessions as not valid.
+
+        :param context: Security context
+        :param session_ids: the ids of the sessions.
+        :returns: the uuids of the boards of the invalidated sessions.
+
+        """
+        return cls.dbapi.invalidate_sessions(session_ids)
+
     @base.remotable
     def create(self, context=None):
         """Create a SessionWP record in the DB.
@@ -12,6 +12,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from oslo_utils import timeutils
+
 from iotronic.common.i18n import _
 from iotronic.db import api as db_api
 from iotronic.objects import base
@@ -91,6 +93,16 @@ class WampAgent(base.IotronicObject):
         """Touch this wampagent's DB record, marking it as up-to-date."""
         self.dbapi.touch_wampagent(self.hostname)
 
+    def is_alive(self, timeout):
+        """Check if this wampagent is online and heartbeating.
+
+        :param timeout: maximum time (in seconds) since the last heartbeat.
+        :returns: True if the wampagent checked in within timeout seconds.
+        """
+        if not self.online or not self.updated_at:
+            return False
+        return not timeutils.is_older_than(self.updated_at, timeout)
+
     @base.remotable_classmethod
     def list(cls, context, limit=None, marker=None, sort_key=None,
              sort_dir=None, filters=None):
@@ -112,3 +124,12 @@ class WampAgent(base.IotronicObject):
                                                      sort_dir=sort_dir)
         return [WampAgent._from_db_object(cls(context),
                                           obj) for obj in db_wampagents]
+
+    @base.remotable_classmethod
+    def get_load(cls, context):
+        """Return the number of boards connected to each WampAgent.
+
+        :param context: Security context.
+        :returns: a dict mapping WampAgent hostnames to session counts.
+        """
+        return cls.dbapi.get_wampagent_load()
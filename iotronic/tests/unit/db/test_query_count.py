@@ -0,0 +1,152 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""The statements of a page must not grow with the size of the page."""
+
+import contextlib
+import unittest
+
+from oslo_config import cfg
+from oslo_db import options as db_options
+from oslo_utils import uuidutils
+from sqlalchemy import event
+
+from iotronic.api.controllers.v1 import board as board_api
+from iotronic.common import context
+from iotronic.db.sqlalchemy import api as sqlalchemy_api
+from iotronic.db.sqlalchemy import models
+from iotronic import objects
+from iotronic.objects import request as request_obj
+from iotronic.objects import result as result_obj
+
+CONF = cfg.CONF
+
+BOARDS = 40
+URL = 'http://127.0.0.1:8812'
+
+
+class QueryCountTestCase(unittest.TestCase):
+
+    def setUp(self):
+        super(QueryCountTestCase, self).setUp()
+        CONF([], project='iotronic')
+        db_options.set_defaults(CONF)
+        CONF.set_override('connection', 'sqlite://', group='database')
+        self.addCleanup(CONF.clear_override, 'connection', group='database')
+        sqlalchemy_api._FACADE = None
+        self.addCleanup(setattr, sqlalchemy_api, '_FACADE', None)
+
+        self.engine = sqlalchemy_api.get_engine()
+        models.Base.metadata.create_all(self.engine)
+        self.context = context.get_admin_context()
+        self.main_uuid = self._seed()
+
+        board_api.cache_agent_ip.clear()
+        self.addCleanup(board_api.cache_agent_ip.clear)
+
+    def _insert(self, model, rows):
+        self.engine.execute(model.__table__.insert(), rows)
+
+    def _seed(self):
+        self._insert(models.WampAgent, [
+            {'hostname': 'agent-0', 'wsurl': 'ws://10.0.0.1:8181/',
+             'online': True, 'ragent': True}])
+
+        boards = [{'id': i + 1,
+                   'uuid': uuidutils.generate_uuid(),
+                   'code': 'code-%d' % i,
+                   'name': 'board-%d' % i,
+                   'type': 'gateway',
+                   'status': 'online',
+                   'agent': 'agent-0',
+                   # half of the boards are not configured yet
+                   'config': {} if i % 2 else {'iotronic': {}}}
+                  for i in range(BOARDS)]
+        self._insert(models.Board, boards)
+        self._insert(models.SessionWP, [
+            {'board_id': b['id'], 'board_uuid': b['uuid'],
+             'session_id': str(b['id']), 'valid': True}
+            for b in boards])
+        self._insert(models.Location, [
+            {'board_id': b['id'], 'latitude': '38.1', 'longitude': '15.5',
+             'altitude': '0'}
+            for b in boards for i in range(2)])
+
+        main_uuid = uuidutils.generate_uuid()
+        requests = [{'uuid': main_uuid, 'status': request_obj.COMPLETED,
+                     'type': request_obj.FLEET, 'action': 'DevicePing'}]
+        results = []
+        for b in boards:
+            uuid = uuidutils.generate_uuid()
+            requests.append({'uuid': uuid, 'main_request_uuid': main_uuid,
+                             'destination_uuid': b['uuid'],
+                             'status': request_obj.COMPLETED,
+                             'type': request_obj.BOARD,
+                             'action': 'DevicePing'})
+            results.append({'board_uuid': b['uuid'], 'request_uuid': uuid,
+                            'result': result_obj.SUCCESS,
+                            'message': 'pong'})
+        self._insert(models.Request, requests)
+        self._insert(models.Result, results)
+        return main_uuid
+
+    @contextlib.contextmanager
+    def _count_statements(self):
+        statements = []
+
+        def count(conn, cursor, statement, parameters, context, many):
+            statements.append(statement)
+
+        event.listen(self.engine, 'before_cursor_execute', count)
+        try:
+            yield statements
+        finally:
+            event.remove(self.engine, 'before_cursor_execute', count)
+
+    def _board_page(self, limit, fields=None):
+        columns = board_api.BoardCollection.get_columns(fields)
+        with self._count_statements() as statements:
+            boards = objects.Board.list(self.context, limit=limit,
+                                        fields=columns)
+            prefetch = board_api.BoardPrefetch(self.context, boards,
+                                               fields=fields)
+            page = [board_api.Board.convert_with_links(
+                b, fields=fields, prefetch=prefetch, url=URL)
+                for b in boards]
+        self.assertEqual(limit, len(page))
+        return len(statements)
+
+    def _result_page(self, limit):
+        with self._count_statements() as statements:
+            results = objects.Result.list(
+                self.context, limit=limit,
+                filters={'request_uuid': self.main_uuid})
+            [r.as_dict() for r in results]
+        self.assertEqual(limit, len(results))
+        return len(statements)
+
+    def test_board_page(self):
+        self.assertEqual(self._board_page(2), self._board_page(BOARDS))
+
+    def test_board_page_with_fields(self):
+        fields = ['uuid', 'name', 'session', 'location', 'wstun_ip']
+        self.assertEqual(self._board_page(2, fields),
+                         self._board_page(BOARDS, fields))
+
+    def test_board_page_with_cached_agents(self):
+        # the agents are cached by the first page
+        self._board_page(1, ['uuid', 'wstun_ip'])
+        self.assertEqual(self._board_page(2, ['uuid', 'wstun_ip']),
+                         self._board_page(BOARDS, ['uuid', 'wstun_ip']))
+
+    def test_result_page(self):
+        self.assertEqual(self._result_page(2), self._result_page(BOARDS))
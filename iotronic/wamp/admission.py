@@ -0,0 +1,125 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import asyncio
+
+from autobahn.wamp.exception import ApplicationError
+from oslo_log import log as logging
+
+LOG = logging.getLogger(__name__)
+
+RETRY_AFTER = u'stack4things.error.retry_after'
+
+
+class AdmissionControl(object):
+    """Bounded admission of the calls of the boards.
+
+    At most `concurrency` calls run at the same time and at most
+    `queue_size` wait for their turn: the others are rejected right away
+    with a RETRY_AFTER error telling the board when to try again.
+    """
+
+    def __init__(self, concurrency, queue_size, retry_after):
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._capacity = concurrency + queue_size
+        self._retry_after = retry_after
+        self._admitted = 0
+
+    def __len__(self):
+        return self._admitted
+
+    async def run(self, coro_fun, *args, **kwargs):
+        if self._admitted >= self._capacity:
+            LOG.debug('%d calls admitted, rejecting', self._admitted)
+            raise ApplicationError(RETRY_AFTER,
+                                   'agent busy, retry later',
+                                   retry_after=self._retry_after)
+
+        self._admitted += 1
+        try:
+            async with self._semaphore:
+                return await coro_fun(*args, **kwargs)
+        finally:
+            self._admitted -= 1
+
+
+class BatchWriter(object):
+    """Group the writes of concurrent callers into a single flush.
+
+    A write waits until its batch has been flushed, which happens when
+    `batch_size` writes are pending or `interval` seconds after the first
+    one. When a batch fails, its items are flushed again one at a time,
+    so only the writes that fail on their own get the error.
+    """
+
+    def __init__(self, loop, flush, batch_size, interval):
+        self._loop = loop
+        self._flush = flush
+        self._batch_size = batch_size
+        self._interval = interval
+        self._pending = []
+        self._timer = None
+
+    async def write(self, item):
+        future = self._loop.create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self._batch_size:
+            self._schedule_flush()
+        elif self._timer is None:
+            self._timer = self._loop.call_later(self._interval,
+                                                self._schedule_flush)
+        return await future
+
+    def _schedule_flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if batch:
+            self._loop.create_task(self._do_flush(batch))
+
+    async def _do_flush(self, batch):
+        try:
+            await self._flush([item for item, future in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                self._set_exception(batch[0][1], e)
+                return
+            LOG.warning('Could not write a batch of %d items, writing them '
+                        'one by one: %s', len(batch), e)
+            for item, future in batch:
+                try:
+                    await self._flush([item])
+                except Exception as e:
+                    self._set_exception(future, e)
+                else:
+                    self._set_result(future)
+            return
+
+        for item, future in batch:
+            self._set_result(future)
+
+    @staticmethod
+    def _set_result(future):
+        if not future.done():
+            future.set_result(None)
+
+    @staticmethod
+    def _set_exception(future, e):
+        LOG.error('Could not write an item: %s', e)
+        if not future.done():
+            future.set_exception(e)
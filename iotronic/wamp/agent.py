@@ -13,6 +13,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 import asyncio
+from concurrent import futures
+import functools
 import json
 import subprocess
 import time
@@ -23,6 +25,9 @@ from iotronic.common.i18n import _
 from iotronic.common.i18n import _LI
 from iotronic.common.i18n import _LW
 from iotronic.db import api as dbapi
+from iotronic.wamp import admission
+from iotronic.wamp import presence
+from iotronic.wamp import wampmessage as wm
 from oslo_config import cfg
 from oslo_log import log as logging
 import oslo_messaging
@@ -73,6 +78,48 @@ wamp_opts = [
     cfg.IntOpt('autoPingTimeout',
                default=2,
                help=('autoPingInterval parameter for wamp')),
+    cfg.IntOpt('heartbeat_interval',
+               default=10,
+               help=('Seconds between wamp agent heart beats')),
+    cfg.IntOpt('handler_workers',
+               default=8,
+               help=('Number of threads running the wamp handlers that '
+                     'access the database, off the event loop')),
+    cfg.IntOpt('connection_concurrency',
+               default=64,
+               help=('Maximum number of board connections and registrations '
+                     'handled at the same time')),
+    cfg.IntOpt('connection_queue_size',
+               default=1024,
+               help=('Maximum number of board connections and registrations '
+                     'waiting to be handled, the others are rejected')),
+    cfg.IntOpt('connection_retry_after',
+               default=5,
+               help=('Seconds after which a rejected board is asked to '
+                     'connect again')),
+    cfg.IntOpt('connection_batch_size',
+               default=64,
+               help=('Maximum number of board connections written to the '
+                     'database in a single transaction')),
+    cfg.FloatOpt('connection_batch_interval',
+                 default=0.05,
+                 help=('Seconds a board connection waits for others to be '
+                       'written along with')),
+    cfg.BoolOpt('session_history',
+                default=False,
+                help=('Keep the past wamp sessions of the boards in the '
+                      'session history table')),
+    cfg.FloatOpt('presence_flush_interval',
+                 default=1.0,
+                 help=('Seconds between two writes of the board status '
+                       'changes to the database')),
+    cfg.FloatOpt('loop_lag_interval',
+                 default=1.0,
+                 help=('Seconds between two samples of the event loop lag')),
+    cfg.FloatOpt('loop_lag_warning',
+                 default=0.5,
+                 help=('Event loop lag, in seconds, above which a warning '
+                       'is logged')),
     cfg.BoolOpt('service_allow_list',
             default=False,
             help='Enable service allow list checks.'),
@@ -98,36 +145,126 @@ txaio.start_logging(level="info")
 wamp_session_caller = None
 AGENT_HOST = None
 LOOP = None
+EXECUTOR = None
+ADMISSION = None
+CONNECTION_WRITER = None
 connected = False
 
+# event loop lag, in seconds: last sample and max since the last report
+LOOP_LAG = {'last': 0.0, 'max': 0.0}
+
+
+def run_in_executor(fun, *args, **kwargs):
+    """Run a blocking function in the handlers executor.
+
+    The wamp handlers doing database work run there, so that the event
+    loop stays free for the wamp traffic and the keepalives.
+    """
+    return LOOP.run_in_executor(EXECUTOR,
+                                functools.partial(fun, *args, **kwargs))
+
+
+def offloaded(fun):
+    """Wrap a blocking wamp handler into a coroutine using the executor."""
+    @functools.wraps(fun)
+    async def handler(*args, **kwargs):
+        return await run_in_executor(fun, *args, **kwargs)
+    return handler
+
+
+def board_procedure(kwarg):
+    if 'wamp_rpc_call' in kwarg:
+        return kwarg['wamp_rpc_call']
+
+    session_id = presence.registry.get(kwarg['board_uuid'])
+    if session_id is None:
+        raise exception.BoardNotConnected(board=kwarg['board_uuid'])
+    return 'iotronic.' + session_id + '.' + kwarg['board_uuid'] + '.' + \
+        kwarg['action']
+
 
 async def wamp_request(kwarg):
+    procedure = board_procedure(kwarg)
+
     # for previous LR version (to be removed asap)
     if 'req' in kwarg:
 
-        LOG.debug("calling: " + kwarg['wamp_rpc_call'] +
+        LOG.debug("calling: " + procedure +
                   " with request id: " + kwarg['req']['uuid'])
-        d = await wamp_session_caller.call(kwarg['wamp_rpc_call'],
+        d = await wamp_session_caller.call(procedure,
                                            kwarg['req'],
                                            *kwarg['data'])
     else:
-        LOG.debug("calling: " + kwarg['wamp_rpc_call'])
-        d = await wamp_session_caller.call(kwarg['wamp_rpc_call'],
+        LOG.debug("calling: " + procedure)
+        d = await wamp_session_caller.call(procedure,
                                            *kwarg['data'])
 
     return d
 
 
+async def wamp_request_async(kwarg):
+    try:
+        response = wm.deserialize(await wamp_request(kwarg))
+    except Exception as e:
+        LOG.error("calling %s on %s failed: %s", kwarg.get('action'),
+                  kwarg['board_uuid'], e)
+        response = wm.WampError(str(e))
+
+    # long running requests are notified later by the board itself
+    if response.result == wm.RUNNING:
+        return
+
+    import iotronic.wamp.functions as fun
+    msg = wm.WampMessage(response.message, response.result,
+                         kwarg['req_uuid'])
+    await run_in_executor(fun.notify_result, kwarg['board_uuid'],
+                          msg.serialize())
+
+
+async def board_connection(uuid, session, info=None):
+    import iotronic.wamp.functions as fun
+    try:
+        conn = await run_in_executor(fun.board_connection, uuid, session,
+                                     info=info, agent=AGENT_HOST)
+        await CONNECTION_WRITER.write(conn)
+    except Exception as exc:
+        msg = str(exc)
+        LOG.error(msg)
+        return wm.WampError(msg).serialize()
+
+    return wm.WampSuccess('').serialize()
+
+
+async def board_registration(code, session):
+    import iotronic.wamp.functions as fun
+    return await run_in_executor(fun.registration, code, session)
+
+
+async def save_connections(connections):
+    import iotronic.wamp.functions as fun
+    await run_in_executor(fun.save_connections, connections)
+
+
 # OSLO ENDPOINT
 class WampEndpoint(object):
 
     def s4t_invoke_wamp(self, ctx, **kwarg):
-        LOG.debug("CONDUCTOR sent me: " + kwarg['wamp_rpc_call'])
+        LOG.debug("CONDUCTOR sent me: %s", kwarg.get('action'))
+
+        try:
+            board_procedure(kwarg)
+        except exception.BoardNotConnected as e:
+            return wm.WampError(str(e)).serialize()
 
         r = asyncio.run_coroutine_threadsafe(wamp_request(kwarg), LOOP)
 
         return r.result()
 
+    def s4t_invoke_wamp_async(self, ctx, **kwarg):
+        LOG.debug("CONDUCTOR casted me: %s", kwarg.get('action'))
+
+        asyncio.run_coroutine_threadsafe(wamp_request_async(kwarg), LOOP)
+
 def read_allowlist():
     try:
 
@@ -150,6 +287,9 @@ class AgentEndpoint(object):
         LOG.debug("ECHO of " + text)
         return text
 
+    def loop_lag(self, ctx):
+        return dict(LOOP_LAG)
+
     def create_tap_interface(self, ctx, port_uuid, tcp_port):
         time.sleep(12)
         LOG.debug('Creating tap interface on the wamp agent host')
@@ -250,8 +390,21 @@ class WampManager(object):
                   CONF.wamp.wamp_transport_url, CONF.wamp.wamp_realm)
 
         self.loop = asyncio.get_event_loop()
-        global LOOP
+        global LOOP, EXECUTOR
         LOOP = self.loop
+        EXECUTOR = futures.ThreadPoolExecutor(
+            max_workers=CONF.wamp.handler_workers)
+
+        # reconnect storms after a restart of the agent or of the router
+        global ADMISSION, CONNECTION_WRITER
+        ADMISSION = admission.AdmissionControl(
+            CONF.wamp.connection_concurrency,
+            CONF.wamp.connection_queue_size,
+            CONF.wamp.connection_retry_after)
+        CONNECTION_WRITER = admission.BatchWriter(
+            self.loop, save_connections,
+            CONF.wamp.connection_batch_size,
+            CONF.wamp.connection_batch_interval)
 
         wamp_transport = CONF.wamp.wamp_transport_url
         wurl_list = wamp_transport.split(':')
@@ -296,17 +449,19 @@ class WampManager(object):
 
             import iotronic.wamp.functions as fun
 
-            session.subscribe(fun.board_on_leave,
+            session.subscribe(offloaded(fun.board_on_leave),
                               'wamp.session.on_leave')
             session.subscribe(fun.board_on_join,
                               'wamp.session.on_join')
 
             try:
                 if CONF.wamp.register_agent:
-                    session.register(fun.registration,
+                    session.register(functools.partial(ADMISSION.run,
+                                                       board_registration),
                                      u'stack4things.register')
                     LOG.info("I have been set as registration agent")
-                session.register(fun.connection,
+                session.register(functools.partial(ADMISSION.run,
+                                                   board_connection),
                                  AGENT_HOST + u'.stack4things.connection')
                 session.register(fun.echo,
                                  AGENT_HOST + u'.stack4things.echo')
@@ -314,7 +469,7 @@ class WampManager(object):
                                  AGENT_HOST + u'.stack4things.alive')
                 session.register(fun.wamp_alive,
                                  AGENT_HOST + u'.stack4things.wamp_alive')
-                session.register(fun.notify_result,
+                session.register(offloaded(fun.notify_result),
                                  AGENT_HOST + u'.stack4things.notify_result')
                 LOG.debug("procedure registered")
 
@@ -325,7 +480,8 @@ class WampManager(object):
 
             session_l = await session.call(u'wamp.session.list')
             session_l.remove(details.session)
-            fun.update_sessions(session_l, AGENT_HOST)
+            await run_in_executor(fun.update_sessions, session_l,
+                                  AGENT_HOST)
 
         @comp.on_leave
         async def onLeave(session, details):
@@ -337,12 +493,59 @@ class WampManager(object):
 
             global connected
             connected = False
+            # the sessions are restored from wamp.session.list on join
+            presence.registry.reset()
             if not connected:
                 comp.start(self.loop)
 
+    async def heartbeat(self):
+        db = dbapi.get_instance()
+        while True:
+            # an agent disconnected from the wamp router cannot reach its
+            # boards: let its heartbeat expire
+            if connected:
+                try:
+                    await run_in_executor(db.touch_wampagent, AGENT_HOST)
+                except Exception as e:
+                    LOG.warning("Wamp agent could not heartbeat: %s", e)
+            await asyncio.sleep(CONF.wamp.heartbeat_interval)
+
+    async def flush_presence(self):
+        import iotronic.wamp.functions as fun
+        while True:
+            await asyncio.sleep(CONF.wamp.presence_flush_interval)
+            if len(presence.buffer):
+                try:
+                    await run_in_executor(fun.flush_presence)
+                except Exception as e:
+                    LOG.warning("Could not write the boards status: %s", e)
+
+    async def monitor_loop_lag(self):
+        interval = CONF.wamp.loop_lag_interval
+        reported = self.loop.time()
+        while True:
+            expected = self.loop.time() + interval
+            await asyncio.sleep(interval)
+            now = self.loop.time()
+            lag = max(now - expected, 0.0)
+            LOOP_LAG['last'] = lag
+            LOOP_LAG['max'] = max(LOOP_LAG['max'], lag)
+
+            if lag > CONF.wamp.loop_lag_warning:
+                LOG.warning("Event loop lagging by %.3f seconds", lag)
+
+            if now - reported >= 60:
+                LOG.debug("Event loop lag: %.3f seconds (max %.3f)",
+                          lag, LOOP_LAG['max'])
+                LOOP_LAG['max'] = lag
+                reported = now
+
     def start(self):
         LOG.info("Starting WAMP server...")
         self.comp.start(self.loop)
+        self.loop.create_task(self.heartbeat())
+        self.loop.create_task(self.monitor_loop_lag())
+        self.loop.create_task(self.flush_presence())
         self.loop.run_forever()
 
     def stop(self):
@@ -352,6 +555,7 @@ class WampManager(object):
         asyncio.gather(*asyncio.Task.all_tasks()).cancel()
         # Stopping the loop
         self.loop.stop()
+        EXECUTOR.shutdown(wait=False)
         LOG.info("WAMP server stopped.")
 
 
@@ -14,13 +14,17 @@
 #    under the License.
 
 from datetime import datetime
+from iotronic.common import exception
+from iotronic.common import request_events
 from iotronic.common import rpc
 from iotronic.common import states
 from iotronic.conductor import rpcapi
 from iotronic import objects
+from iotronic.wamp import presence
 from iotronic.wamp import wampmessage as wm
 from oslo_config import cfg
 from oslo_log import log
+import threading
 
 LOG = log.getLogger(__name__)
 
@@ -31,6 +35,7 @@ rpc.init(CONF)
 
 topic = 'iotronic.conductor_manager'
 c = rpcapi.ConductorAPI(topic)
+events = request_events.RequestEventsAPI()
 
 
 class cont(object):
@@ -40,6 +45,8 @@ class cont(object):
 
 ctxt = cont()
 
+_flush_lock = threading.Lock()
+
 
 def echo(data):
     LOG.info("ECHO: %s" % data)
@@ -66,107 +73,142 @@ def update_sessions(session_list, agent):
     LOG.debug('Wamp session list: %s', session_list)
     LOG.debug('DB session list: %s', list_db)
 
+    presence.registry.reset(
+        dict((x.board_uuid, x.session_id) for x in list_from_db
+             if int(x.session_id) in session_list))
+
     if session_list == list_db:
         LOG.debug('Sessions on the database are updated.')
-        return
 
     # list of board not connected anymore
     old_connected = list_db.difference(session_list)
 
     LOG.debug('no more valid session list: %s', old_connected)
 
-    for elem in old_connected:
-        old_session = objects.SessionWP.get(ctxt, elem)
-        if old_session.valid:
-            old_session.valid = False
-            old_session.save()
-            board = objects.Board.get_by_uuid(ctxt, old_session.board_uuid)
-            board.status = states.OFFLINE
-            board.save()
-            LOG.debug('Session updated. Board %s is now  %s', board.uuid,
-                      states.OFFLINE)
-
     if old_connected:
-        LOG.warning('Some boards have been updated: status offline')
+        offline = objects.SessionWP.invalidate_list(ctxt, old_connected)
+        presence.buffer.mark_all(offline, states.OFFLINE)
+        LOG.warning('%d boards have been updated: status offline',
+                    len(offline))
 
     # list of board still connected
     keep_connected = list_db.intersection(session_list)
     LOG.debug('still valid session list: %s', keep_connected)
 
-    for elem in keep_connected:
-        for x in list_from_db:
-            if x.session_id == str(elem):
-                LOG.debug('%s need to be restored.', x.board_uuid)
-                break
-    if keep_connected:
-        LOG.warning('Some boards need to be restored.')
+    online = [x.board_uuid for x in list_from_db
+              if int(x.session_id) in keep_connected]
+    presence.buffer.mark_all(online, states.ONLINE)
 
 
 def board_on_leave(session_id):
     LOG.debug('A board with %s disconnectd', session_id)
-    try:
-        old_session = objects.SessionWP.get(ctxt, session_id)
-
-        if old_session.valid:
-            old_session.valid = False
-            old_session.save()
-            board = objects.Board.get_by_uuid(ctxt, old_session.board_uuid)
-            board.status = states.OFFLINE
-            board.save()
-            LOG.debug('Session updated. Board %s is now  %s', board.uuid,
-                      states.OFFLINE)
-            return
+    stamp = presence.buffer.stamp()
+    presence.registry.remove_session(session_id)
 
+    # nothing is returned if the session has already been replaced
+    board_uuids = objects.SessionWP.invalidate_list(ctxt, [session_id])
+    if not board_uuids:
         LOG.debug('Session %s already set to not valid', session_id)
-    except Exception:
-        LOG.debug('session %s not found', session_id)
+        return
 
+    presence.buffer.mark_all(board_uuids, states.OFFLINE, stamp)
+    # written now: the conductors must not call a board that left
+    _flush_now()
+    LOG.debug('Session updated. Board %s is now  %s', board_uuids[0],
+              states.OFFLINE)
 
-def connection(uuid, session, info=None):
-    LOG.debug('Received registration from %s with session %s',
-              uuid, session)
+
+def _flush_now():
+    # on failure the changes stay buffered for the periodic flush
     try:
-        board = objects.Board.get_by_uuid(ctxt, uuid)
-    except Exception as exc:
-        msg = exc.message % {'board': uuid}
-        LOG.error(msg)
-        return wm.WampError(msg).serialize()
+        flush_presence()
+    except Exception as e:
+        LOG.warning('Failed to write the board status changes: %s', e)
+
+
+def flush_presence():
+    """Write the pending board status changes."""
+    # one flush at a time: an older change must not be written last
+    with _flush_lock:
+        changes = presence.buffer.drain()
+        try:
+            for status, board_uuids in changes.items():
+                objects.Board.set_status_list(ctxt, board_uuids, status)
+                LOG.debug('%d boards are now %s', len(board_uuids), status)
+        except Exception:
+            presence.buffer.restore(changes)
+            raise
+
+
+def _active_agent(hostname):
+    if not hostname:
+        return None
     try:
-        old_ses = objects.SessionWP(ctxt)
-        old_ses = old_ses.get_session_by_board_uuid(ctxt, board.uuid,
-                                                    valid=True)
-        old_ses.valid = False
-        old_ses.save()
-        LOG.debug('old session for %s found: %s', board.uuid,
-                  old_ses.session_id)
-
-    except Exception:
-        LOG.debug('valid session for %s not found', board.uuid)
-
-    session_data = {'board_id': board.id,
-                    'board_uuid': board.uuid,
-                    'session_id': session}
-    session = objects.SessionWP(ctxt, **session_data)
-    session.create()
-    LOG.debug('new session for %s saved %s', board.uuid,
-              session.session_id)
-    board.status = states.ONLINE
+        agent = objects.WampAgent.get_by_hostname(ctxt, hostname)
+    except exception.WampAgentNotFound:
+        return None
+    if not agent.is_alive(CONF.conductor.agent_heartbeat_timeout):
+        return None
+    return agent
+
+
+def board_connection(uuid, session, info=None, agent=None):
+    """Return the database changes of a board connection.
+
+    They are written by save_connections, possibly along with the ones of
+    other boards.
+    """
+    LOG.debug('Received registration from %s with session %s',
+              uuid, session)
+    stamp = presence.buffer.stamp()
+    board = objects.Board.get_by_uuid(ctxt, uuid)
+
+    # the status is written behind by flush_presence
+    values = {}
+
+    # the board could still use the main agent it had before a rebalance:
+    # it is sent back to the agent it is placed on, unless that one is down
+    if agent and board.agent != agent:
+        placed = _active_agent(board.agent)
+        if placed is not None:
+            LOG.info('Board %s connected to agent %s, redirected to %s',
+                     board.uuid, agent, board.agent)
+            raise exception.BoardRedirected(board=board.uuid,
+                                            agent=placed.hostname,
+                                            url=placed.wsurl)
+        LOG.info('Board %s connected to agent %s instead of %s',
+                 board.uuid, agent, board.agent)
+        values['agent'] = agent
 
     if info:
         LOG.debug('board infos %s', info)
         if 'lr_version' in info:
             if board.lr_version != info['lr_version']:
-                board.lr_version = info['lr_version']
+                values['lr_version'] = info['lr_version']
         if 'connectivity' in info:
-            board.connectivity = info['connectivity']
+            values['connectivity'] = info['connectivity']
         if 'mac_addr' in info:
-            board.connectivity = {"mac_addr": info['mac_addr']}
+            values['connectivity'] = {"mac_addr": info['mac_addr']}
+
+    return {'board_id': board.id,
+            'board_uuid': board.uuid,
+            'session_id': str(session),
+            'board': values,
+            'stamp': stamp}
 
-    board.save()
-    LOG.info('Board %s (%s) is now  %s', board.uuid,
-             board.name, states.ONLINE)
 
-    return wm.WampSuccess('').serialize()
+def save_connections(connections):
+    """Write the changes of a set of board connections at once."""
+    objects.SessionWP.register_list(ctxt, connections,
+                                    history=CONF.wamp.session_history)
+    for conn in connections:
+        presence.registry.add(conn['board_uuid'], conn['session_id'])
+        presence.buffer.mark(conn['board_uuid'], states.ONLINE,
+                             conn['stamp'])
+        LOG.info('Board %s is now  %s with session %s', conn['board_uuid'],
+                 states.ONLINE, conn['session_id'])
+    # written now: the conductors check the status before calling a board
+    _flush_now()
 
 
 def registration(code, session):
@@ -182,25 +224,12 @@ def notify_result(board_uuid, wampmessage):
     LOG.info('Board %s completed the its request %s with result: %s',
              board_uuid, wmsg.req_id, wmsg.result)
 
-    res = objects.Result.get(ctxt, board_uuid, wmsg.req_id)
-    res.result = wmsg.result
-    res.message = wmsg.message
-    res.save()
-
-    filter = {"result": objects.result.RUNNING,
-              "request_uuid": wmsg.req_id}
-
-    list_result = objects.Result.get_results_list(ctxt,
-                                                  filter)
-    if len(list_result) == 0:
-        req = objects.Request.get_by_uuid(ctxt, wmsg.req_id)
-        req.status = objects.request.COMPLETED
-        req.save()
-        if req.main_request_uuid:
-            mreq = objects.Request.get_by_uuid(ctxt, req.main_request_uuid)
-            mreq.pending_requests = mreq.pending_requests - 1
-            if mreq.pending_requests == 0:
-                mreq.status = objects.request.COMPLETED
-            mreq.save()
+    completed = objects.Result.complete(ctxt, board_uuid, wmsg.req_id,
+                                        wmsg.result, wmsg.message)
+    if completed is None:
+        LOG.warning('Result of request %s on board %s already notified',
+                    wmsg.req_id, board_uuid)
+    else:
+        events.requests_completed(ctxt, completed)
 
     return wm.WampSuccess('notification_received').serialize()
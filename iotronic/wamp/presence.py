@@ -0,0 +1,131 @@
+# Copyright 2017 MDSLAB - University of Messina
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import itertools
+import threading
+
+
+class PresenceRegistry(object):
+    """The WAMP sessions of the boards connected to this agent.
+
+    It is updated by the WAMP handlers (on the event loop) and read by the
+    AMQP endpoints (on the RPC server threads).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._boards = {}
+
+    def get(self, board_uuid):
+        """Return the session of a board, None if it is not connected."""
+        return self._sessions.get(board_uuid)
+
+    def add(self, board_uuid, session_id):
+        session_id = str(session_id)
+        with self._lock:
+            old_session = self._sessions.get(board_uuid)
+            if old_session is not None:
+                self._boards.pop(old_session, None)
+            self._sessions[board_uuid] = session_id
+            self._boards[session_id] = board_uuid
+
+    def remove_session(self, session_id):
+        """Forget a session and return the uuid of its board, if any."""
+        with self._lock:
+            board_uuid = self._boards.pop(str(session_id), None)
+            if board_uuid is not None:
+                self._sessions.pop(board_uuid, None)
+            return board_uuid
+
+    def reset(self, sessions=None):
+        """Replace the registry content with a board -> session mapping."""
+        sessions = dict((board_uuid, str(session_id))
+                        for board_uuid, session_id
+                        in (sessions or {}).items())
+        with self._lock:
+            self._sessions = sessions
+            self._boards = dict((session_id, board_uuid)
+                                for board_uuid, session_id
+                                in sessions.items())
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+class PresenceBuffer(object):
+    """Write-behind buffer of the board status changes.
+
+    Only the latest status of each board is kept, so a board flapping
+    between ONLINE and OFFLINE costs at most one write per flush. The
+    changes are ordered by a stamp taken when they happen: a change
+    marked after a newer one of the same board, e.g. by another executor
+    thread, is dropped.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._status = {}
+        # the last stamp of each board, kept across the flushes
+        self._stamps = {}
+        self._seq = itertools.count(1)
+
+    def stamp(self):
+        """Return the stamp of a status change happening now."""
+        with self._lock:
+            return next(self._seq)
+
+    def mark(self, board_uuid, status, stamp=None):
+        with self._lock:
+            self._mark(board_uuid, status, stamp or next(self._seq))
+
+    def mark_all(self, board_uuids, status, stamp=None):
+        with self._lock:
+            stamp = stamp or next(self._seq)
+            for board_uuid in board_uuids:
+                self._mark(board_uuid, status, stamp)
+
+    def _mark(self, board_uuid, status, stamp):
+        if stamp < self._stamps.get(board_uuid, 0):
+            return
+        self._stamps[board_uuid] = stamp
+        self._status[board_uuid] = status
+
+    def drain(self):
+        """Return the pending changes grouped by status, and forget them."""
+        with self._lock:
+            pending, self._status = self._status, {}
+
+        changes = {}
+        for board_uuid, status in pending.items():
+            changes.setdefault(status, []).append(board_uuid)
+        return changes
+
+    def restore(self, changes):
+        """Put back changes that could not be written.
+
+        Newer changes of the same boards win over the restored ones.
+        """
+        with self._lock:
+            for status, board_uuids in changes.items():
+                for board_uuid in board_uuids:
+                    self._status.setdefault(board_uuid, status)
+
+    def __len__(self):
+        return len(self._status)
+
+
+registry = PresenceRegistry()
+buffer = PresenceBuffer()